@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.routes import auth, menu_permission_router,menu_privilege,menu, order_tracking,permission, role_permission, users, roles, company, branch, industry_type, globle_status, country, state, city,parcel_type,service_type,payment_mode,address_book,vehicle,shipment_status, driver,order_item,order
+from app.api.routes import auth, menu_permission_router,menu_privilege,menu, order_tracking,permission, role_permission, users, roles, company, branch, industry_type, globle_status, country, state, city,parcel_type,service_type,payment_mode,address_book,vehicle,shipment_status, driver,order_item,order,track
 
 
 
@@ -24,6 +24,7 @@ routes.include_router(shipment_status.router, prefix="/shipment_status", tags=["
 routes.include_router(order_item.router, prefix="/order_items", tags=["Order Item"])
 routes.include_router(order.router, prefix="/orders", tags=["Order"])
 routes.include_router(order_tracking.router, prefix="/order_tracking", tags=["Order Tracking"])
+routes.include_router(track.router, prefix="/track", tags=["Tracking"])
 routes.include_router(menu.router, prefix="/menu", tags=["Menu"])
 routes.include_router(menu_privilege.router, prefix="/menu_privilege", tags=["Menu Privilege"])
 routes.include_router(role_permission.router, prefix="/role_permission", tags=["Role Permission"])
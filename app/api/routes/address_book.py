@@ -8,6 +8,7 @@ from datetime import datetime
 from app.models.address_book import AddressBookModel
 from app.schemas.address_book import GetAddressBookSchema, CreateAddressBookSchema,UpdateAddressBookSchema,DeleteAddressBookSchema
 from app.services.address_book import get_all_address_books,get_address_book_by_id,create_address_book,update_address_book,delete_address_book
+from app.utils.user_names import resolve_user_names
 
 router = APIRouter()
 
@@ -46,21 +47,13 @@ def get_all_address_books_endpoint(
 @router.get("/{address_book_id}", status_code=status.HTTP_200_OK)
 def get_address_book_endpoint(address_book_id: int, db: Session = Depends(get_db),current_user: User = Depends(get_current_user)):
    
-    all_users = db.query(User).all()
-    user_dict = {user.user_id: user.first_name for user in all_users}
     # Query the database to find the address_book by ID, ensuring it's not marked as deleted
-    address_book = db.query(AddressBookModel).filter(AddressBookModel.address_book_id == address_book_id, AddressBookModel.is_deleted == False).first()
-
-    
-    
-    # Add the created_by_name to the response
-    if address_book:
-        address_book.created_by_name = user_dict.get(address_book.created_by, 'Unknown')
-
-    
     address_book = get_address_book_by_id(db, address_book_id)
     if not address_book:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Address Book not found")
+
+    # Add the created_by_name to the response
+    address_book.created_by_name = resolve_user_names(db, [address_book.created_by]).get(address_book.created_by, 'Unknown')
     return {
         "message": "Address Book retrieved successfully",
         "addressbooks": address_book
@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.utils.auth import get_current_user
-from app.schemas.branch import BranchCreate, BranchUpdate, Branch
-from app.services.branch import create_branch, get_branch, get_branches, update_branch, delete_branch
+from app.schemas.branch import BranchCreate, BranchUpdate, Branch, CreateDocketCounterSchema
+from app.services.branch import create_branch, get_branch, get_branches, update_branch, delete_branch, create_branch_docket_range
 from typing import List
 from app.models.user import User
 
@@ -29,6 +29,21 @@ async def create_new_branch(
     return created_branch
 
 
+@router.post("/{branch_id}/docket-counter", status_code=status.HTTP_201_CREATED)
+def create_branch_docket_counter_endpoint(
+    branch_id: int,
+    counter: CreateDocketCounterSchema,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+    ):
+    """
+    Give a branch its own docket range: its bookings get docket numbers that
+    start with `prefix` instead of the default 20. A branch's range cannot be
+    changed once created, and each prefix belongs to one branch.
+    """
+    return create_branch_docket_range(db=db, branch_id=branch_id, prefix=counter.prefix)
+
+
 @router.get("/{branch_id}", response_model=Branch)
 async def get_single_branch(branch_id: int, db: Session = Depends(get_db)):
     """
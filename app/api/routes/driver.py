@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.services.driver import get_allDriversService, create_driverService, delete_driverService
-from app.schemas.driver import DriverCreate, DriverResponse, DeleteResponse
+from app.services.driver_sync import sync_driver_events
+from app.schemas.driver import DriverCreate, DriverResponse, DeleteResponse, DriverSyncSchema
 from app.utils.auth import get_current_user
 from app.models.user import User
 from app.models.drivers import DriverModel
@@ -59,6 +60,19 @@ def create_driver(
         raise e
 
 
+@router.post("/sync", status_code=status.HTTP_200_OK)
+def sync_driver_events_endpoint(
+    sync: DriverSyncSchema,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Upload the scans and status changes a driver's device queued while offline,
+    and get back what became of each one plus the driver's open tasks.
+    """
+    return sync_driver_events(db, sync, current_user)
+
+
 # @router.get("/{driver_id}", response_model=schemas.DriverResponse)
 # def get_driver(driver_id: int, db: Session = Depends(get_db)):
 #     driver = services.get_driver(db, driver_id)
@@ -1,13 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status,File, UploadFile
+import hashlib
+import asyncio
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status,File, UploadFile, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.utils.auth import get_current_user
 from typing import Optional,List
 from app.models.user import User
 from app.models.order import OrderModel
-from app.services.order import get_all_orders,get_order_by_id,create_order,update_order,delete_order,assign_driver_to_order,confirm_pickup,update_shipment_status,save_pod_upload_file,update_pod_file
-from app.schemas.order import CreateOrderSchema,UpdateOrderSchema,DeleteOrderSchema,AssignDriverVehicleSchema,UpdateShipmentStatusSchema
-from fastapi.responses import Response
+from app.services.order import order_etag,parse_if_match,get_all_orders,search_order_list,get_order_by_id,create_order,update_order,delete_order,assign_driver_to_order,confirm_pickup,update_shipment_status,transition_shipment_status,save_pod_upload_file,update_pod_file
+from app.services.order_listing import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from app.services.order_search import DEFAULT_SEARCH_PAGE_SIZE, MAX_SEARCH_PAGE_SIZE
+from app.schemas.order import CreateOrderSchema,UpdateOrderSchema,DeleteOrderSchema,AssignDriverVehicleSchema,UpdateShipmentStatusSchema,ShipmentStatusTransitionSchema
+from app.services.order_export import EXPORT_FORMATS, stream_orders_csv, stream_orders_ndjson
+from app.services.order_bulk import bulk_create_orders, parse_bulk_csv
+from app.services.order_tracking import get_order_timeline
+from app.utils.tracking_hub import Subscription, subscribe, unsubscribe
+from app.utils.idempotency import get_idempotency_key, request_hash, run_idempotent
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from datetime import datetime
 
 
 router = APIRouter()
@@ -15,33 +27,200 @@ router = APIRouter()
 # BASE_FILE_URL = "http://localhost:8000/uploads/"
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
-def get_all_order_endpoint(db: Session = Depends(get_db),current_user: User = Depends(get_current_user),shipment_status_name: str = None, docket_no: int = None,pincode:int = None ):
+@router.get("/", status_code=status.HTTP_200_OK, response_class=ORJSONResponse)
+def get_all_order_endpoint(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    shipment_status_name: str = None,
+    docket_no: int = None,
+    pincode: Optional[List[str]] = Query(None, description="Pincode to match on sender or receiver address; repeat or comma-separate for several"),
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT, description="Number of orders per page"),
+    after: Optional[str] = Query(None, description="next_cursor returned by the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated order fields to return"),
+    include: Optional[str] = Query(None, description="Comma-separated relations: items,sender_address,receiver_address,tracking"),
+    ):
     
-    order_data = get_all_orders(db=db, current_user=current_user, shipment_status_name = shipment_status_name, docket_no=docket_no, pincode=pincode)
-    return order_data
+    pincodes = [code.strip() for value in pincode or [] for code in value.split(",") if code.strip()]
+
+    order_data = get_all_orders(db=db, current_user=current_user, shipment_status_name = shipment_status_name, docket_no=docket_no, pincode=pincodes, limit=limit, after=after, fields=fields, include=include)
+    # Returned as a response so FastAPI does not run jsonable_encoder over the serialized orders
+    return ORJSONResponse(order_data)
+
+
+@router.get("/search", status_code=status.HTTP_200_OK, response_class=ORJSONResponse)
+def search_orders_endpoint(
+    q: str = Query(..., description="Docket, manual docket, invoice, e-way bill, phone or company name, full or partial"),
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(DEFAULT_SEARCH_PAGE_SIZE, ge=1, le=MAX_SEARCH_PAGE_SIZE, description="Number of records per page"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Search orders by any of their identifiers or party names, best matches first.
+    """
+    return ORJSONResponse(search_order_list(db=db, current_user=current_user, q=q, page=page, page_size=page_size))
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+def export_orders_endpoint(
+    format: str = Query("csv", description="csv or ndjson"),
+    from_date: Optional[datetime] = Query(None, alias="from", description="Include orders created at or after this time"),
+    to_date: Optional[datetime] = Query(None, alias="to", description="Include orders created before this time"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream every order in the date range as CSV or NDJSON.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+    if format == "csv":
+        return StreamingResponse(
+            stream_orders_csv(from_date, to_date),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="orders.csv"'},
+        )
+
+    return StreamingResponse(stream_orders_ndjson(from_date, to_date), media_type="application/x-ndjson")
+
+
+# Seconds between keep-alive messages on an idle stream, so proxies keep it open
+STREAM_KEEPALIVE_SECONDS = 15
+
+
+def _order_subscription(docket, driver_id, branch_id, shipment_status_id) -> Subscription:
+    return subscribe(Subscription(
+        asyncio.get_running_loop(),
+        dockets=[value.strip() for values in docket or [] for value in values.split(",") if value.strip()],
+        driver_ids=driver_id or [],
+        branch_ids=branch_id or [],
+        shipment_status_ids=shipment_status_id or [],
+    ))
+
+
+@router.get("/stream", status_code=status.HTTP_200_OK)
+async def stream_order_changes_endpoint(
+    request: Request,
+    docket: Optional[List[str]] = Query(None, description="Dockets or manual dockets to follow"),
+    driver_id: Optional[List[int]] = Query(None),
+    branch_id: Optional[List[int]] = Query(None, description="Branch where the change was made"),
+    shipment_status_id: Optional[List[int]] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Server-sent events with every change to the matching orders, instead of polling GET /orders/.
+
+    Filters combine with AND, repeated values of one filter with OR; no filters
+    follows every order. A "lagged" event means some changes were dropped
+    because the client read too slowly, so it should reload its list.
+    """
+    # Nothing else needs the database, so its connection is not held for the life of the stream
+    db.close()
+    subscription = _order_subscription(docket, driver_id, branch_id, shipment_status_id)
+
+    async def events():
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.next_event(STREAM_KEEPALIVE_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: {event['type']}\ndata: {orjson.dumps(event).decode()}\n\n"
+        finally:
+            unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/stream/ws")
+async def order_changes_websocket(
+    websocket: WebSocket,
+    token: str = Query(..., description="Access token; browsers cannot set headers on a WebSocket"),
+    docket: Optional[List[str]] = Query(None),
+    driver_id: Optional[List[int]] = Query(None),
+    branch_id: Optional[List[int]] = Query(None),
+    shipment_status_id: Optional[List[int]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    The events of GET /orders/stream over a WebSocket, one JSON message per event.
+    """
+    try:
+        get_current_user(token=token, db=db)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    finally:
+        db.close()
+
+    await websocket.accept()
+    subscription = _order_subscription(docket, driver_id, branch_id, shipment_status_id)
+    try:
+        while True:
+            event = await subscription.next_event(STREAM_KEEPALIVE_SECONDS)
+            await websocket.send_text(orjson.dumps(event or {"type": "keep-alive"}).decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        unsubscribe(subscription)
 
 
 @router.get("/{order_id}",status_code=status.HTTP_200_OK)
-def get_order_by_id_endpoint (order_id:int, db:Session = Depends(get_db),current_user: User = Depends(get_current_user)):
+def get_order_by_id_endpoint (
+    order_id:int,
+    response: Response,
+    db:Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    fields: Optional[str] = Query(None, description="Comma-separated order fields to return"),
+    include: Optional[str] = Query(None, description="Comma-separated relations: items,sender_address,receiver_address,tracking"),
+    ):
+
+    get_Order_data = get_order_by_id(db=db, order_id=order_id,current_user=current_user, fields=fields, include=include)
 
-    get_Order_data = get_order_by_id(db=db, order_id=order_id,current_user=current_user)
+    # Projections without the version column get no ETag
+    order = get_Order_data["order"]
+    version = order.get("version") if isinstance(order, dict) else order.version
+    if version is not None:
+        response.headers["ETag"] = order_etag(version)
 
     return get_Order_data
 
 
+@router.get("/{order_id}/timeline", status_code=status.HTTP_200_OK, response_class=ORJSONResponse)
+def get_order_timeline_endpoint(
+    order_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Full tracking history of an order, oldest event first: status, branch, location, remark and time.
+    """
+    return ORJSONResponse(get_order_timeline(db=db, order_id=order_id))
+
+
 @router.put("/assign-driver", status_code=status.HTTP_200_OK)
 def assign_driver_endpoint(
     order_ids: List[int], 
     request: AssignDriverVehicleSchema, 
     db: Session = Depends(get_db), 
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key)
 ):
     
     responses = []
 
     # for order_id in order_ids: 
-    updated_driverVehicle = assign_driver_to_order(db=db, order_ids=order_ids, assign_driver_vehicle=request, current_user=current_user)
+    updated_driverVehicle = run_idempotent(
+        db, idempotency_key, current_user,
+        request_hash("PUT /orders/assign-driver", order_ids, request.model_dump(mode="json")),
+        lambda: assign_driver_to_order(db=db, order_ids=order_ids, assign_driver_vehicle=request, current_user=current_user)
+    )
         # responses.append(updated_driverVehicle)
 
     return updated_driverVehicle
@@ -51,9 +230,14 @@ def assign_driver_endpoint(
 def confirm_pickup_endpoint(
     docket_no: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key)
 ):
-    return confirm_pickup(db=db, docket_no=docket_no, current_user=current_user)
+    return run_idempotent(
+        db, idempotency_key, current_user,
+        request_hash("GET /orders/confirm-pickup", docket_no),
+        lambda: confirm_pickup(db=db, docket_no=docket_no, current_user=current_user)
+    )
 
 
 @router.put("/{order_id}/update-shipment-status",status_code=status.HTTP_200_OK)
@@ -61,33 +245,116 @@ def update_shipment_status_endpoint(
     order_id: int,
     shipmentStatus: UpdateShipmentStatusSchema,
     db:Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key)
 ):
-    return update_shipment_status(db=db, order_id=order_id, update_shipment_status_data=shipmentStatus,  current_user=current_user)
+    return run_idempotent(
+        db, idempotency_key, current_user,
+        request_hash("PUT /orders/update-shipment-status", order_id, shipmentStatus.model_dump(mode="json")),
+        lambda: update_shipment_status(db=db, order_id=order_id, update_shipment_status_data=shipmentStatus,  current_user=current_user)
+    )
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_new_order_endpoint(
     order:CreateOrderSchema,
     db: Session=Depends(get_db),
-    current_user: User= Depends(get_current_user)
+    current_user: User= Depends(get_current_user),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key)
     
     ):
    
-    new_order = create_order(db=db,order_service_data=order,current_user=current_user)
+    new_order = run_idempotent(
+        db, idempotency_key, current_user,
+        request_hash("POST /orders/", order.model_dump(mode="json")),
+        lambda: create_order(db=db,order_service_data=order,current_user=current_user),
+        status_code=status.HTTP_201_CREATED
+    )
         
     return new_order
 
+@router.post("/bulk", status_code=status.HTTP_200_OK)
+async def bulk_create_orders_endpoint(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key)
+):
+    """
+    Book many orders at once from a JSON array of orders or a CSV upload in the `file` form field.
+
+    Returns the order id and docket of every booked row and the errors of every rejected one.
+    """
+    fingerprint = request_hash("POST /orders/bulk", hashlib.sha256(await request.body()).hexdigest()) if idempotency_key else None
+
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload the CSV in the file field")
+        payloads = parse_bulk_csv(await upload.read())
+    else:
+        try:
+            payloads = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array of orders")
+
+    # The booking itself is blocking database work, keep it off the event loop
+    return await run_in_threadpool(
+        run_idempotent, db, idempotency_key, current_user, fingerprint,
+        lambda: bulk_create_orders(db, payloads, current_user)
+    )
+
+
+@router.post("/status-transitions", status_code=status.HTTP_200_OK)
+def transition_shipment_status_endpoint(
+    transition: ShipmentStatusTransitionSchema,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key)
+):
+    """
+    Move many parcels to one shipment status and report the outcome per docket.
+    """
+    return run_idempotent(
+        db, idempotency_key, current_user,
+        request_hash("POST /orders/status-transitions", transition.model_dump(mode="json")),
+        lambda: transition_shipment_status(db=db, transition=transition, current_user=current_user)
+    )
+
+
 @router.put("/{order_id}", status_code=status.HTTP_200_OK)
 async def update_order_endpoint(
     order_id: int,
     order_update: UpdateOrderSchema,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    if_match: Optional[str] = Header(None, alias="If-Match"),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key)
 ):
-    updated_order = update_order(
-        db=db, order_id=order_id, update_order_service_data=order_update, current_user=current_user
+    """
+    Update an order. Send the ETag from GET /orders/{order_id} as If-Match to
+    have the update refused with 412 when the order changed since it was read.
+    With an Idempotency-Key a retried update, which would add its new items and
+    tracking event again, gets the first response back instead.
+    """
+    expected_version = parse_if_match(if_match)
+    updated_order = run_idempotent(
+        db, idempotency_key, current_user,
+        request_hash(f"PUT /orders/{order_id}", expected_version, order_update.model_dump(mode="json")),
+        lambda: update_order(
+            db=db, order_id=order_id, update_order_service_data=order_update, current_user=current_user,
+            expected_version=expected_version
+        )
     )
+
+    if isinstance(updated_order, Response):
+        # Stored and replayed responses carry the version in their body
+        updated_order.headers["ETag"] = order_etag(orjson.loads(updated_order.body)["order"]["version"])
+        return updated_order
+
+    response.headers["ETag"] = order_etag(updated_order["order"].version)
     
     return updated_order
 
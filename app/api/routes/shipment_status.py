@@ -6,8 +6,8 @@ from typing import Optional, List, Dict
 from app.models.user import User
 from datetime import datetime
 from app.models.shipment_status import ShipmentStatusModel
-from app.services.shipment_status import get_all_shipment_status,get_shipment_status_by_id,create_shipment_status,update_shipment_status,delete_shipment_status
-from app.schemas.shipment_status import CreateShipmentStatusSchema, UpdateShipmentStatusSchema,DeleteResponse
+from app.services.shipment_status import get_all_shipment_status,get_shipment_status_by_id,create_shipment_status,update_shipment_status,delete_shipment_status,get_shipment_status_transitions,update_shipment_status_transitions
+from app.schemas.shipment_status import CreateShipmentStatusSchema, UpdateShipmentStatusSchema,DeleteResponse,UpdateStatusTransitionsSchema
 
 
 router = APIRouter()
@@ -62,6 +62,20 @@ def get_all_shipment_status_endpoint(
         "shipment_status": shipment_status
     }
 
+@router.get("/transitions", status_code=status.HTTP_200_OK)
+def get_shipment_status_transitions_endpoint(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+    ):
+    """
+    List the allowed shipment status transitions, one entry per status an order can leave.
+    """
+    return {
+        "message": "Shipment status transitions retrieved successfully",
+        "transitions": get_shipment_status_transitions(db)
+    }
+
+
 @router.get("/{shipment_status_id}", status_code=status.HTTP_200_OK)
 def get_shipment_status(shipment_status_id: int, db: Session = Depends(get_db),current_user: User = Depends(get_current_user)):
    
@@ -141,6 +155,19 @@ async def update_existing_shipment_status(
     #     } 
 
 
+@router.put("/{shipment_status_id}/transitions")
+def update_shipment_status_transitions_endpoint(
+    shipment_status_id: int,
+    transitions: UpdateStatusTransitionsSchema,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+    ):
+    """
+    Replace the statuses an order in this shipment status may move to.
+    """
+    return update_shipment_status_transitions(db, shipment_status_id, transitions, current_user)
+
+
 @router.delete("/{shipment_status_id}",  response_model= DeleteResponse)
 def delete_shipment_status_endpoint(
     shipment_status_id: int,
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, Header, status
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.db.session import get_db
+from app.services.public_tracking import get_public_tracking
+
+
+router = APIRouter()
+
+
+@router.get("/{docket}", status_code=status.HTTP_200_OK)
+def track_docket_endpoint(
+    docket: str,
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
+):
+    """
+    Public status and history of a parcel by docket number or manual docket. No login needed.
+
+    Send the ETag of the last answer as If-None-Match to get an empty 304 while nothing changed.
+    """
+    snapshot = get_public_tracking(db, docket)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+
+    if if_none_match and snapshot.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
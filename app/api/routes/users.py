@@ -16,11 +16,14 @@ from datetime import datetime
 # from app.core.config import settings
 from app.utils.email import  send_welcome_email
 from app.services.user import  update_user_by_role
+from app.services.order_summary import refresh_summary_name
 # from fastapi.responses import JSONResponse
 from app.services.common_validate_data import  validate_role_dependencies, get_role_name_from_id
 # import uuid
 # import re
 from app.models.drivers import DriverModel
+from app.utils.reference_cache import get_reference_name, GLOBLE_STATUS
+from app.utils.user_names import invalidate_user_name
 
 
 router = APIRouter()
@@ -171,8 +174,7 @@ def get_users_list(
     users = query.offset((page - 1) * page_size).limit(page_size).all()
 
     # Default status if no status found
-    default_status = db.query(GlobleStatus).filter(GlobleStatus.id == 1).first()
-    default_status_name = default_status.name if default_status else "Active"
+    default_status_name = get_reference_name(db, GLOBLE_STATUS, 1) or "Active"
 
     # Create response with users and metadata
     response = {
@@ -270,9 +272,13 @@ def update_profile(
         # Call the role dependency validation
         validate_role_dependencies(new_role_id, company_id, branch_id, db)
 
+    previous_first_name = user.first_name
+
     # Dynamically update the user object
     for key, value in update_data.items():
         setattr(user, key, value)
+    if user.first_name != previous_first_name:
+        refresh_summary_name(db, "customer_name", user.user_id, user.first_name)
 
     # Update last login time
     user.last_login = datetime.now()
@@ -280,6 +286,7 @@ def update_profile(
     # Commit the changes to the database
     db.commit()
     db.refresh(user)
+    invalidate_user_name(user.user_id)
 
     # Return the updated user data with status_id and status_name
     updated_user_data = UserOut.from_orm(user).dict()
@@ -423,6 +430,7 @@ def update_user(
             # Update existing driver
             driver.name = f"{updated_data.first_name} {updated_data.last_name}" if updated_data.first_name or updated_data.last_name else driver.name
             driver.license_no = updated_data.license_no if updated_data.license_no else driver.license_no
+            refresh_summary_name(db, "driver_name", driver.driver_id, driver.name)
             db.commit()
             db.refresh(driver)
         else:
@@ -16,6 +16,19 @@ class Settings(BaseSettings):
     domain_url: str
     email_smtp_server: str
     email_smtp_port: int
+    # Docket numbers each worker reserves per round trip, see app/utils/docket_allocator.py
+    docket_block_size: int = 100
+    # Where responses of requests with an Idempotency-Key are kept: "memory" for a
+    # single worker, "database" when retries may reach another worker
+    idempotency_store: str = "memory"
+    idempotency_ttl_seconds: int = 86400
+    # How long a request still running holds its key; must exceed the slowest request
+    idempotency_lease_seconds: int = 120
+    # Days a closed order stays untouched before its tracking events move to
+    # order_tracking_archive, see app/services/tracking_archive.py
+    tracking_archive_after_days: int = 30
+    # Days the outcome of a synced driver event is kept to answer resent uploads
+    driver_sync_retention_days: int = 14
 
 
     class Config:
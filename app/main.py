@@ -5,6 +5,7 @@ from app.api.routes import routes
 from app.core.config import settings
 from app.schemas.user import UserUpdate
 from app.utils.globle_status import create_default_status
+from app.utils.status_transitions import create_default_status_transitions
 from app.db.session import get_db
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -17,6 +18,7 @@ app = FastAPI(title="FastAPI MySQL App")
 async def on_startup():
     db = next(get_db())
     create_default_status(db)
+    create_default_status_transitions(db)
 
 # Include routers
 app.include_router(routes)
@@ -21,7 +21,13 @@ class AddressBookModel(Base):
     state_id = Column(Integer, ForeignKey("state.id"), nullable=True)
     city_id = Column(Integer, ForeignKey("city.id"), nullable=True)
     
-    pincode = Column(String(10),nullable=True)
+    pincode = Column(String(10),nullable=True,index=True)
+    # sha256 of the normalized address, see app/services/address_book_dedup.py.
+    # create_all does not add it to an existing table; before deploying run
+    #   ALTER TABLE address_book ADD COLUMN address_hash VARCHAR(64) NULL,
+    #     ADD UNIQUE KEY address_hash (address_hash)
+    # and then python -m app.services.address_book_dedup to fill it
+    address_hash = Column(String(64), nullable=True, unique=True)
     is_active = Column(Boolean, default=True)
     is_deleted = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,23 @@
+from datetime import datetime
+from app.db.base import Base
+from sqlalchemy import  Column, Integer, BigInteger, String, DateTime, ForeignKey
+
+
+
+class DocketCounterModel(Base):
+    """
+    Next unreserved docket number of one numbering range.
+
+    A range covers every docket that starts with `prefix`, see
+    `app.utils.docket_allocator`. Workers move `next_value` forward a whole block
+    at a time and hand the numbers out from memory.
+    """
+    __tablename__ = "docket_counter"
+
+    counter_key = Column(String(50), primary_key=True)
+    branch_id = Column(Integer, ForeignKey("branch.id"), nullable=True, unique=True)
+    prefix = Column(Integer, nullable=False, unique=True)
+    next_value = Column(BigInteger, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
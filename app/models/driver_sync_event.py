@@ -0,0 +1,27 @@
+from datetime import datetime
+from app.db.base import Base
+from sqlalchemy import  Column, Integer, String, DateTime
+
+
+
+class DriverSyncEventModel(Base):
+    """
+    An event a driver's device uploaded through POST /driver/sync, and what came of it.
+
+    Keyed by the id the device gave the event, so an upload retried after a lost
+    response is answered from here instead of being applied again. Rows older
+    than `settings.driver_sync_retention_days` are purged by
+    `app.services.driver_sync`.
+    """
+    __tablename__ = "driver_sync_event"
+
+    driver_id = Column(Integer, primary_key=True, autoincrement=False)
+    client_event_id = Column(String(100), primary_key=True)
+
+    order_id = Column(Integer, nullable=True)
+    # applied, recorded, unchanged, rejected or not_found
+    result = Column(String(20), nullable=False)
+    detail = Column(String(255), nullable=True)
+    event_time = Column(DateTime, nullable=True)
+
+    synced_at = Column(DateTime, default=datetime.utcnow, index=True)
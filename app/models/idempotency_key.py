@@ -0,0 +1,29 @@
+from datetime import datetime
+from app.db.base import Base
+from sqlalchemy import  Column, Integer, String, Text, DateTime
+
+
+
+class IdempotencyKeyModel(Base):
+    """
+    Stored response of a write request made with an `Idempotency-Key` header.
+
+    Only used when `settings.idempotency_store` is "database", so that retries
+    reaching another worker still find the first response, see
+    `app.utils.idempotency`. A row without a status code is a request still
+    being processed, or, with committed_at set, one whose changes were
+    committed but whose response was never stored.
+    """
+    __tablename__ = "idempotency_key"
+
+    # "<user id>:<Idempotency-Key header>"
+    idempotency_key = Column(String(300), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    # Up to 16 MB, enough for the response of a full bulk booking
+    response_body = Column(Text(16777215), nullable=True)
+
+    # Set in the request's own transaction by its first commit
+    committed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -1,6 +1,6 @@
 from datetime import datetime
 from app.db.base import Base
-from sqlalchemy import  Column, Integer,Float,Enum, String, Boolean,DateTime, ForeignKey,DefaultClause
+from sqlalchemy import  Column, Integer,Float,Enum, String, Boolean,DateTime, ForeignKey,DefaultClause,Index
 import enum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -20,6 +20,11 @@ class DimensionTypeEnum(enum.Enum):
 
 class OrderModel(Base):
     __tablename__ = "order"
+    __table_args__ = (
+        # Keyset pagination of the order list seeks on (created_at, order_id)
+        Index("ix_order_is_deleted_created_at_order_id", "is_deleted", "created_at", "order_id"),
+        Index("ix_order_shipment_status_created_at_order_id", "shipment_status_id", "is_deleted", "created_at", "order_id"),
+    )
 
     order_id = Column(Integer,primary_key=True,index=True)
     docket_no = Column(Integer(),unique=True,index=True)
@@ -46,8 +51,8 @@ class OrderModel(Base):
 
     gst_number = Column(Integer, nullable=True)
     # address_book_id = Column(Integer, ForeignKey("address_book.address_book_id"))
-    receiver_address_book_id = Column(Integer, ForeignKey("address_book.address_book_id"),nullable=True,default=None)
-    sender_address_book_id = Column(Integer, ForeignKey("address_book.address_book_id"),nullable=True,default=None)
+    receiver_address_book_id = Column(Integer, ForeignKey("address_book.address_book_id"),nullable=True,default=None,index=True)
+    sender_address_book_id = Column(Integer, ForeignKey("address_book.address_book_id"),nullable=True,default=None,index=True)
 
     parcel_type_id = Column(Integer, ForeignKey("parcel_type.parcel_id"))
     shipment_value = Column(Integer, nullable=True)
@@ -66,6 +71,15 @@ class OrderModel(Base):
     shipment_status_id = Column(Integer, ForeignKey("shipment_status.shipment_status_id"),nullable=False)
     pod = Column(String, nullable=True)
 
+    # Bumped by every write; ORM flushes update with WHERE version = <loaded version>
+    # and bulk updates compare it themselves, so concurrent writers cannot lose each
+    # other's changes. create_all does not add it to an existing table; run
+    #   ALTER TABLE `order` ADD COLUMN version INT NOT NULL DEFAULT 1
+    # before deploying, or every ORM read and write of an order fails
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+
     
 
 
@@ -0,0 +1,50 @@
+from datetime import datetime
+from app.db.base import Base
+from sqlalchemy import  Column, Integer, String, Text, Boolean,DateTime, ForeignKey, Index
+
+
+
+class OrderSummaryModel(Base):
+    """
+    Read model with the display fields of an order.
+
+    Maintained by the order services in the same transaction as the order row
+    itself, and regenerated from scratch by `app.services.order_summary`.
+    """
+    __tablename__ = "order_summary"
+    __table_args__ = (
+        Index("ix_order_summary_is_deleted_created_at_order_id", "is_deleted", "created_at", "order_id"),
+        # Task list of a driver, see app/services/driver_sync.py
+        Index("ix_order_summary_driver_id_is_deleted", "driver_id", "is_deleted"),
+        # ngram tokens let /orders/search match partial dockets and phone numbers
+        Index("ft_order_summary_search_text", "search_text", mysql_prefix="FULLTEXT", mysql_with_parser="ngram"),
+    )
+
+    order_id = Column(Integer, ForeignKey("order.order_id"), primary_key=True)
+    docket_no = Column(Integer, nullable=True, index=True)
+    manual_docket = Column(String(255), nullable=True, index=True)
+    display_docket = Column(String(255), nullable=True)
+
+    customer_id = Column(Integer, nullable=True)
+    customer_name = Column(String(255), nullable=True)
+    sender_company_name = Column(String(255), nullable=True)
+    receiver_company_name = Column(String(255), nullable=True)
+    sender_pincode = Column(String(10), nullable=True)
+    receiver_pincode = Column(String(10), nullable=True)
+
+    service_type_name = Column(String(255), nullable=True)
+    payment_mode_name = Column(String(255), nullable=True)
+    parcel_type_name = Column(String(255), nullable=True)
+    shipment_status_id = Column(Integer, nullable=True)
+    shipment_status_name = Column(String(255), nullable=True)
+    driver_id = Column(Integer, nullable=True)
+    driver_name = Column(String(255), nullable=True)
+    vehicle_id = Column(Integer, nullable=True)
+    vehicle_name = Column(String(255), nullable=True)
+
+    # Dockets, invoice, e-way bill, phone numbers and party names, space separated
+    search_text = Column(Text, nullable=True)
+
+    is_deleted = Column(Boolean, default=False)
+    created_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
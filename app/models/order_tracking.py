@@ -1,6 +1,6 @@
 from datetime import datetime
 from app.db.base import Base
-from sqlalchemy import  Column, Integer,Enum, String, Boolean,DateTime, ForeignKey,DefaultClause
+from sqlalchemy import  Column, Integer,Enum, String, Boolean,DateTime, ForeignKey,DefaultClause,Index
 import enum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -10,10 +10,24 @@ from sqlalchemy.sql import func
 
 
 class OrderTrackingModel(Base):
+    """
+    One event in the history of an order: the status it reached, where and when.
+    """
     __tablename__ = "order_tracking"
+    __table_args__ = (
+        # The timeline of an order is read in event order
+        Index("ix_order_tracking_order_id_event_time", "order_id", "event_time"),
+    )
 
     order_tracking_id = Column(Integer,primary_key=True,index=True)
     order_id = Column(Integer, ForeignKey("order.order_id"),nullable=True)
+
+    shipment_status_id = Column(Integer, ForeignKey("shipment_status.shipment_status_id"), nullable=True)
+    branch_id = Column(Integer, ForeignKey("branch.id"), nullable=True)
+    location = Column(String(255), nullable=True)
+    remark = Column(String(500), nullable=True)
+    # When the event happened, which for scans synced later is before created_at
+    event_time = Column(DateTime, default=datetime.utcnow, nullable=False)
    
 
     is_active = Column(Boolean, default=True)
@@ -0,0 +1,36 @@
+from datetime import datetime
+from app.db.base import Base
+from sqlalchemy import  Column, Integer, Text, DateTime, Index
+
+
+
+class OrderTrackingArchiveModel(Base):
+    """
+    Tracking events of a closed order, compacted into one row.
+
+    Written by `app.services.tracking_archive`, which moves the events out of
+    `order_tracking` once the shipment is closed. On MySQL the table is RANGE
+    partitioned by the month the order was booked, so reading one order's
+    history only opens that month's partition. Partitioned InnoDB tables cannot
+    have foreign keys, hence none here.
+    """
+    __tablename__ = "order_tracking_archive"
+    __table_args__ = (
+        # Lookups that do not know the booking month, such as the order list
+        Index("ix_order_tracking_archive_order_id", "order_id"),
+        # Monthly partitions are split off pmax by ensure_tracking_archive_partitions
+        {"mysql_partition_by": "RANGE (order_month) (PARTITION pmax VALUES LESS THAN MAXVALUE)"},
+    )
+
+    # yyyymm of order.created_at; part of the key because MySQL requires the
+    # partition column in every unique key
+    order_month = Column(Integer, primary_key=True, autoincrement=False)
+    order_id = Column(Integer, primary_key=True, autoincrement=False)
+
+    event_count = Column(Integer, nullable=False)
+    first_event_time = Column(DateTime, nullable=True)
+    last_event_time = Column(DateTime, nullable=True)
+    # JSON list of events, each a list in ARCHIVED_EVENT_FIELDS order
+    events = Column(Text(16777215), nullable=False)
+
+    archived_at = Column(DateTime, default=datetime.utcnow)
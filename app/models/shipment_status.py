@@ -1,5 +1,5 @@
 from app.db.base import Base
-from sqlalchemy import  Column, Integer, String, Boolean,DateTime ,ForeignKey
+from sqlalchemy import  Column, Integer, String, Boolean,DateTime ,ForeignKey, UniqueConstraint
 from datetime import datetime
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -21,3 +21,22 @@ class ShipmentStatusModel(Base):
     updated_by = Column(Integer)
 
     orders = relationship("OrderModel", back_populates="shipmentStatus")
+
+
+class ShipmentStatusTransitionModel(Base):
+    """
+    One allowed move of an order from `from_status_id` to `to_status_id`.
+
+    Compiled into an in-memory map by `app.utils.status_transitions`.
+    """
+    __tablename__ = 'shipment_status_transition'
+    __table_args__ = (
+        UniqueConstraint("from_status_id", "to_status_id", name="uq_shipment_status_transition"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    from_status_id = Column(Integer, ForeignKey("shipment_status.shipment_status_id"), nullable=False)
+    to_status_id = Column(Integer, ForeignKey("shipment_status.shipment_status_id"), nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    created_by = Column(Integer)
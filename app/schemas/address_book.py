@@ -4,35 +4,37 @@ from typing import Optional
 
 
 class GetAddressBookSchema(BaseModel):
-    address_book_id : Optional[int]
+    address_book_id : Optional[int] = None
     # customer_id : Optional[int]
     # user_name: Optional[str] = None
 
     # name : Optional[str]
-    company_name : Optional[str]
-    contact_name : Optional[str]
-    email: Optional[str]
-    phone_number: Optional[str]
+    company_name : Optional[str] = None
+    contact_name : Optional[str] = None
+    email: Optional[str] = None
+    phone_number: Optional[str] = None
     
     
-    address : Optional[str]
+    address : Optional[str] = None
 
-    country_id: Optional[int]
+    country_id: Optional[int] = None
     country_name: Optional[str] = None
-    state_id : Optional[int]
+    state_id : Optional[int] = None
     state_name: Optional[str] = None
-    city_id : Optional[int] 
+    city_id : Optional[int] = None
     city_name: Optional[str] = None   
-    pincode  : Optional[str]
-    is_active: Optional[bool]
-    is_deleted: Optional[bool]
-    created_at: Optional[datetime]
-    updated_at: Optional[datetime]
-    created_by_name: Optional[str]
-    created_by: Optional[int]
-    updated_by: Optional[int]
-    is_manual_generate: Optional[bool]
+    pincode  : Optional[str] = None
+    is_active: Optional[bool] = None
+    is_deleted: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    created_by_name: Optional[str] = None
+    created_by: Optional[int] = None
+    updated_by: Optional[int] = None
+    is_manual_generate: Optional[bool] = None
 
+    class Config:
+        from_attributes = True
 
 
 class CreateAddressBookSchema(BaseModel):
@@ -60,3 +60,8 @@ class Branch(BranchBase):
 
     class Config:
         orm_mode = True
+
+
+# Own docket range of a branch, see app.utils.docket_allocator
+class CreateDocketCounterSchema(BaseModel):
+    prefix: int
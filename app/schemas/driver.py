@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional, Union
 
 class DriverBase(BaseModel):
     user_id: int
@@ -36,3 +36,21 @@ class DeleteResponse(BaseModel):
 
 class Config:
     orm_mode = True
+
+
+class DriverSyncEventSchema(BaseModel):
+    # Id the device gave the event, unique per driver; a resent event is not applied twice
+    client_event_id: str = Field(..., min_length=1, max_length=100)
+    # docket_no or manual docket of the parcel
+    docket: Union[int, str]
+    # "scan" records where the parcel was seen, "status" also moves it to shipment_status_id
+    type: Literal["scan", "status"]
+    shipment_status_id: Optional[int] = None
+    # When the device recorded the event, which may be long before it synced
+    event_time: datetime
+    location: Optional[str] = Field(None, max_length=255)
+    remark: Optional[str] = Field(None, max_length=500)
+
+
+class DriverSyncSchema(BaseModel):
+    events: List[DriverSyncEventSchema] = []
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional ,List
+from pydantic import BaseModel, TypeAdapter
+from typing import Optional ,List, Union
 from datetime import datetime
 from app.models.order import PaymentTypeEnum ,DimensionTypeEnum
 from app.schemas.order_item import CreateOrderItemSchmea,GetOrderItemSchema,UpdateCreateOrderItemSchema
@@ -8,24 +8,24 @@ from app.schemas.order_tracking import CreateOrderTrackingSchema, GetOrderTracki
 
 
 class GetOrderSchema(BaseModel):
-    order_id: Optional[int]
-    docket_no: Optional[int]
-    manual_docket: Optional[str]
-    payment_type: Optional[PaymentTypeEnum]
-    cod_amount: Optional[int]
-    service_type_id: Optional[int]
+    order_id: Optional[int] = None
+    docket_no: Optional[int] = None
+    manual_docket: Optional[str] = None
+    payment_type: Optional[PaymentTypeEnum] = None
+    cod_amount: Optional[int] = None
+    service_type_id: Optional[int] = None
     service_type_name: Optional[str] = None
 
-    payment_mode_id: Optional[int]
+    payment_mode_id: Optional[int] = None
     payment_mode_name: Optional[str] = None
 
-    customer_id: Optional[int]
+    customer_id: Optional[int] = None
     customer_name: Optional[str] = None
 
-    gst_number: Optional[int]
+    gst_number: Optional[int] = None
     # address_book_id: Optional[int]
-    receiver_address_book_id: Optional[int]
-    sender_address_book_id: Optional[int]
+    receiver_address_book_id: Optional[int] = None
+    sender_address_book_id: Optional[int] = None
 
     # receiver_address_book: Optional[str] = None
     # sender_address_book : Optional[str] = None
@@ -33,52 +33,53 @@ class GetOrderSchema(BaseModel):
     receiver_company_name: Optional[str] = None
     sender_company_name : Optional[str] = None
 
-    parcel_type_id: Optional[int]
+    parcel_type_id: Optional[int] = None
     parcel_type_name: Optional[str] = None
 
-    shipment_status_id:Optional[int]
+    shipment_status_id:Optional[int] = None
     shipment_status_name:Optional[str]=None
 
-    driver_id:Optional[int]
+    driver_id:Optional[int] = None
     driver_name:Optional[str] = None
 
-    vehicle_id:Optional[int]
+    vehicle_id:Optional[int] = None
     vehicle_name:Optional[str] = None
     
     comment:Optional[str] = None
     appointment_date_time: Optional[datetime] = None
-    shipment_value: Optional[int]
-    invoice_no: Optional[int]
-    e_way_bill: Optional[int]
-    forwarding: Optional[int]
-    booking_instruction: Optional[str]
-    is_active: Optional[bool]
-    is_deleted: Optional[bool]
-    created_at: Optional[datetime]
-    updated_at: Optional[datetime]
-    created_by_name: Optional[str]
-    updated_by_name: Optional[str]
-    created_by: Optional[int]
-    updated_by: Optional[int]
-    order_items: Optional[List[GetOrderItemSchema]]
+    shipment_value: Optional[int] = None
+    invoice_no: Optional[int] = None
+    e_way_bill: Optional[int] = None
+    forwarding: Optional[int] = None
+    booking_instruction: Optional[str] = None
+    is_active: Optional[bool] = None
+    is_deleted: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    created_by_name: Optional[str] = None
+    updated_by_name: Optional[str] = None
+    created_by: Optional[int] = None
+    updated_by: Optional[int] = None
+    version: Optional[int] = None
+    order_items: Optional[List[GetOrderItemSchema]] = None
     # address_books: Optional[List[GetAddressBookSchema]]
-    receiver_address: Optional[GetAddressBookSchema]
-    sender_address: Optional[GetAddressBookSchema]
-    order_trackings:Optional[GetOrderTrackingSchema]
-
-
-    total_box_size : Optional[int]
-    total_no_of_box: Optional[int]
-    dimension_type : Optional[DimensionTypeEnum]
-    total_volume : Optional[float]
-    parcel_weight : Optional[int]
-    is_fragile : Optional[bool]
-    is_docket_auto: Optional[bool]
-    pod:Optional[str]
-    display_docket: Optional[str]
+    receiver_address: Optional[GetAddressBookSchema] = None
+    sender_address: Optional[GetAddressBookSchema] = None
+    order_trackings:Optional[GetOrderTrackingSchema] = None
 
 
+    total_box_size : Optional[int] = None
+    total_no_of_box: Optional[int] = None
+    dimension_type : Optional[DimensionTypeEnum] = None
+    total_volume : Optional[float] = None
+    parcel_weight : Optional[int] = None
+    is_fragile : Optional[bool] = None
+    is_docket_auto: Optional[bool] = None
+    pod:Optional[str] = None
+    display_docket: Optional[str] = None
 
+    class Config:
+        from_attributes = True
 
 
 class CreateOrderSchema(BaseModel):
@@ -174,6 +175,12 @@ class UpdateShipmentStatusSchema(BaseModel):
     comment:Optional[str] = None
     order_trackings:Optional[CreateOrderTrackingSchema]
 
+class ShipmentStatusTransitionSchema(BaseModel):
+    # docket_no or manual docket of each parcel
+    dockets: List[Union[int, str]]
+    shipment_status_id: int
+    comment: Optional[str] = None
+
 class DeleteOrderSchema(BaseModel):
     message : str
 
@@ -182,5 +189,6 @@ class Config:
     from_attributes = True
 
 
-
-
+# Built once at import, so responses skip schema compilation and the
+# jsonable_encoder walk; see app.services.order_listing.serialize_orders
+ORDER_LIST_ADAPTER = TypeAdapter(List[GetOrderSchema])
@@ -12,6 +12,14 @@ class GetOrderTrackingSchema(BaseModel):
     docket: Optional[int] = None
     pod:Optional[str] = None
 
+    shipment_status_id: Optional[int] = None
+    shipment_status_name: Optional[str] = None
+    branch_id: Optional[int] = None
+    branch_name: Optional[str] = None
+    location: Optional[str] = None
+    remark: Optional[str] = None
+    event_time: Optional[datetime] = None
+
     is_active: Optional[bool] = None
     is_deleted: Optional[bool] = None
     created_at: Optional[datetime] = None
@@ -28,6 +36,12 @@ class GetOrderTrackingSchema(BaseModel):
 class CreateOrderTrackingSchema(BaseModel):
     order_id: Optional[int] = Field(None, description="Required when creating order tracking from API")
     is_active: Optional[bool]
+    # Status changes record the order's new status themselves; only POST /order_tracking/ uses this
+    shipment_status_id: Optional[int] = None
+    branch_id: Optional[int] = Field(None, description="Defaults to the branch of the user recording the event")
+    location: Optional[str] = Field(None, max_length=255)
+    remark: Optional[str] = Field(None, max_length=500)
+    event_time: Optional[datetime] = Field(None, description="Defaults to the time the event is recorded")
 
     @classmethod
     def validate_order_id(cls, values):
@@ -47,6 +61,19 @@ class UpdateOrderTrackingSchema(BaseModel):
 class DeleteOrderTrackingSchema(BaseModel):
     message : str
 
+
+class TimelineEventSchema(BaseModel):
+    order_tracking_id: int
+    shipment_status_id: Optional[int] = None
+    shipment_status_name: Optional[str] = None
+    branch_id: Optional[int] = None
+    branch_name: Optional[str] = None
+    location: Optional[str] = None
+    remark: Optional[str] = None
+    event_time: Optional[datetime] = None
+    created_by: Optional[int] = None
+    created_by_name: Optional[str] = None
+
     
 
 class Config:
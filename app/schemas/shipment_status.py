@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 
 
 class GetShipmentStatusSchema(BaseModel):
@@ -27,6 +27,10 @@ class UpdateShipmentStatusSchema(BaseModel):
     description: Optional[str]
     is_active: Optional[bool]
     
+class UpdateStatusTransitionsSchema(BaseModel):
+    # Every status an order in this status may move to; replaces the current list
+    to_status_ids: List[int]
+
 class DeleteResponse(BaseModel):
     message: str
     
@@ -10,6 +10,8 @@ from app.models.country import Country
 from app.models.address_book import AddressBookModel
 from app.schemas.address_book import GetAddressBookSchema,CreateAddressBookSchema, UpdateAddressBookSchema
 from sqlalchemy.orm import joinedload
+from app.services.order_summary import refresh_summaries_for_address_book
+from app.services.address_book_dedup import free_address_hash
 from sqlalchemy.sql import text
 
 
@@ -78,6 +80,8 @@ def create_address_book(db: Session, address_book_service: CreateAddressBookSche
         address_book_data["created_by"] = current_user.user_id  # Add created_by manually
 
         new_address_book = AddressBookModel(**address_book_data)
+        # Only the first copy of an address is the one bookings resolve to
+        new_address_book.address_hash = free_address_hash(db, new_address_book)
 
         # Add the new address_book to the database session and commit the changes
         db.add(new_address_book)
@@ -109,6 +113,8 @@ def update_address_book(db: Session, address_book_id: int,update_address_book_se
         # Use company.dict() to get only the fields that were updated (exclude_unset=True)
         for key, value in update_address_book_service.dict(exclude_unset=True).items():
             setattr(db_address_book, key, value)
+        db_address_book.address_hash = free_address_hash(db, db_address_book)
+        refresh_summaries_for_address_book(db, db_address_book.address_book_id)
         db.commit()  # Commit the changes
         db.refresh(db_address_book)  # Refresh to reflect the updates
         return db_address_book
@@ -131,6 +137,8 @@ def delete_address_book(db: Session, address_book_id: int):
     
     db_address_book.is_deleted = True  # Mark as deleted (soft delete)
     db_address_book.is_active = False
+    # Bookings must not resolve to a deleted address
+    db_address_book.address_hash = None
     db.commit()  # Commit the changes
     db.refresh(db_address_book)  # Refresh to update the state
     
@@ -0,0 +1,209 @@
+import hashlib
+import re
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import case, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.order import OrderModel
+from app.models.address_book import AddressBookModel
+from app.schemas.address_book import CreateAddressBookSchema
+from app.services.order_summary import refresh_order_summary
+
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Two addresses with the same normalized values for these fields are the same place
+FINGERPRINT_FIELDS = ("company_name", "contact_name", "phone_number", "address", "pincode", "city_id")
+
+_WHITESPACE = re.compile(r"\s+")
+_NON_DIGITS = re.compile(r"\D")
+
+
+def _normalize(field: str, value) -> str:
+    if value is None:
+        return ""
+    if field == "phone_number":
+        return _NON_DIGITS.sub("", str(value))
+    return _WHITESPACE.sub(" ", str(value)).strip().casefold()
+
+
+def address_fingerprint(address) -> str:
+    """
+    sha256 of the normalized fingerprint fields of an address.
+
+    `address` may be a dict, a schema or an AddressBookModel. Case, repeated
+    whitespace and phone number punctuation do not change the fingerprint.
+    """
+    get = address.get if isinstance(address, dict) else lambda field: getattr(address, field, None)
+    normalized = "\x1f".join(_normalize(field, get(field)) for field in FINGERPRINT_FIELDS)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def free_address_hash(db: Session, address_book: AddressBookModel):
+    """The fingerprint of `address_book`, or None when another address already holds it."""
+    address_hash = address_fingerprint(address_book)
+    holder = db.query(AddressBookModel.address_book_id).filter(
+        AddressBookModel.address_hash == address_hash,
+        AddressBookModel.address_book_id != address_book.address_book_id,
+    ).first()
+    return None if holder else address_hash
+
+
+def find_or_create_address_book(db: Session, address: CreateAddressBookSchema) -> int:
+    """
+    Id of the stored address matching `address`, inserting it if there is none.
+
+    One indexed lookup on address_hash. The insert runs in a savepoint, so losing
+    a race with a concurrent booking of the same address falls back to the
+    winner's row instead of failing. Nothing is committed.
+    """
+    values = address.dict()
+    address_hash = address_fingerprint(values)
+
+    existing_id = db.query(AddressBookModel.address_book_id).filter(AddressBookModel.address_hash == address_hash).scalar()
+    if existing_id:
+        return existing_id
+
+    new_address_book = AddressBookModel(**values, address_hash=address_hash)
+    try:
+        with db.begin_nested():
+            db.add(new_address_book)
+    except IntegrityError:
+        return db.query(AddressBookModel.address_book_id).filter(AddressBookModel.address_hash == address_hash).scalar()
+
+    return new_address_book.address_book_id
+
+
+def find_or_create_address_books(db: Session, addresses: Iterable[CreateAddressBookSchema], created_by: int = None) -> Dict[str, int]:
+    """
+    Resolve many addresses at once and return their ids by fingerprint.
+
+    One select finds the stored ones, the rest go in as one multi-row INSERT and a
+    second select reads their ids back. On MySQL the insert skips fingerprints a
+    concurrent writer stored in the meantime.
+    """
+    new_addresses = {}
+    for address in addresses:
+        new_addresses.setdefault(address_fingerprint(address.dict()), address)
+    if not new_addresses:
+        return {}
+
+    def lookup():
+        return dict(
+            db.execute(
+                select(AddressBookModel.address_hash, AddressBookModel.address_book_id).where(
+                    AddressBookModel.address_hash.in_(new_addresses)
+                )
+            ).all()
+        )
+
+    ids = lookup()
+    missing = [address_hash for address_hash in new_addresses if address_hash not in ids]
+    if missing:
+        db.execute(
+            insert(AddressBookModel).prefix_with("IGNORE", dialect="mysql"),
+            [
+                dict(new_addresses[address_hash].dict(), address_hash=address_hash, created_by=created_by)
+                for address_hash in missing
+            ],
+        )
+        ids = lookup()
+
+    return ids
+
+
+def merge_duplicates(db: Session, duplicates: Dict[int, int]):
+    """Point the orders of every duplicate address at its kept copy and soft delete the duplicates."""
+    duplicate_ids = list(duplicates)
+
+    order_ids = db.execute(
+        select(OrderModel.order_id).where(
+            or_(
+                OrderModel.sender_address_book_id.in_(duplicate_ids),
+                OrderModel.receiver_address_book_id.in_(duplicate_ids),
+            )
+        )
+    ).scalars().all()
+
+    for column in (OrderModel.sender_address_book_id, OrderModel.receiver_address_book_id):
+        db.execute(
+            update(OrderModel)
+            .where(column.in_(duplicate_ids))
+            .values({column.key: case(duplicates, value=column), "version": OrderModel.version + 1})
+            .execution_options(synchronize_session=False)
+        )
+
+    db.execute(
+        update(AddressBookModel)
+        .where(AddressBookModel.address_book_id.in_(duplicate_ids))
+        .values(is_deleted=True, is_active=False)
+        .execution_options(synchronize_session=False)
+    )
+
+    refresh_order_summary(db, order_ids)
+
+
+def backfill_address_hashes(db: Session, batch_size: int = BACKFILL_BATCH_SIZE) -> Tuple[int, int]:
+    """
+    Fingerprint existing addresses and merge the duplicates.
+
+    Walks address_book in primary key order, one committed batch at a time. The
+    first address with a fingerprint keeps it; later ones with the same
+    fingerprint have their orders repointed to it and are soft deleted.
+    Returns the number of addresses fingerprinted and merged.
+    """
+    hashed = 0
+    merged = 0
+    last_address_book_id = 0
+
+    while True:
+        rows = db.query(AddressBookModel).filter(
+            AddressBookModel.address_book_id > last_address_book_id,
+            AddressBookModel.is_deleted == False,
+            AddressBookModel.address_hash.is_(None),
+        ).order_by(AddressBookModel.address_book_id).limit(batch_size).all()
+        if not rows:
+            break
+
+        hashes = {row.address_book_id: address_fingerprint(row) for row in rows}
+        holders = dict(
+            db.execute(
+                select(AddressBookModel.address_hash, AddressBookModel.address_book_id).where(
+                    AddressBookModel.address_hash.in_(set(hashes.values()))
+                )
+            ).all()
+        )
+
+        duplicates = {}
+        for row in rows:
+            address_hash = hashes[row.address_book_id]
+            if address_hash in holders:
+                duplicates[row.address_book_id] = holders[address_hash]
+            else:
+                holders[address_hash] = row.address_book_id
+                row.address_hash = address_hash
+                hashed += 1
+
+        db.flush()
+        if duplicates:
+            merge_duplicates(db, duplicates)
+            merged += len(duplicates)
+        db.commit()
+
+        last_address_book_id = rows[-1].address_book_id
+
+    return hashed, merged
+
+
+if __name__ == "__main__":
+    # python -m app.services.address_book_dedup
+    from app.db.session import SessionLocal
+
+    session = SessionLocal()
+    try:
+        hashed, merged = backfill_address_hashes(session)
+        print(f"Fingerprinted {hashed} addresses and merged {merged} duplicates")
+    finally:
+        session.close()
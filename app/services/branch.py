@@ -7,6 +7,9 @@ from fastapi import HTTPException, Depends
 from app.utils.auth import get_current_user
 from app.models.user import User
 from app.services.common_validate_data import get_globle_status_name, validate_contact_number, get_user_name, validate_branch_name
+from app.utils.user_names import attach_user_names
+from app.utils.docket_allocator import create_branch_docket_counter
+from sqlalchemy.exc import IntegrityError
 import re
 
 # Helper function to fetch globle_status_name
@@ -86,10 +89,9 @@ def get_branches(db: Session, skip: int = 0, limit: int = 100):
     branches = db.query(BranchModel).filter(BranchModel.is_deleted == False).offset(skip).limit(limit).all()
 
     # Fetch globle_status_name and user names for each branch
+    attach_user_names(db, branches)
     for branch in branches:
         branch.globle_status_name = get_globle_status_name(db, branch.globle_status_id)
-        branch.created_by_name = get_user_name(db, branch.created_by)
-        branch.updated_by_name = get_user_name(db, branch.updated_by)
 
     return branches
 
@@ -147,3 +149,25 @@ def delete_branch(db: Session, branch_id: int):
     db_branch.updated_by_name = get_user_name(db, db_branch.updated_by)
 
     return db_branch
+
+
+def create_branch_docket_range(db: Session, branch_id: int, prefix: int):
+    """Give a branch its own docket range; later bookings from that branch are numbered from it."""
+    db_branch = db.query(BranchModel).filter(BranchModel.id == branch_id, BranchModel.is_deleted == False).first()
+    if not db_branch:
+        raise HTTPException(status_code=404, detail="Branch not found")
+
+    try:
+        counter = create_branch_docket_counter(db, branch_id, prefix)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="The branch already has a docket range or the prefix is taken")
+
+    return {
+        "message": "Docket range created successfully",
+        "branch_id": branch_id,
+        "prefix": counter.prefix,
+        "first_docket_no": counter.next_value,
+    }
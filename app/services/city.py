@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from app.models.city import City
 from app.schemas.city import CityCreate, CityUpdate, CityResponse, PaginatedCityResponse
 from app.services.common_validate_data import get_user_name
+from app.utils.user_names import attach_user_names
 from typing import Optional
 from app.models.state import State
 from sqlalchemy import func
@@ -52,9 +53,8 @@ async def get_city_list(db: Session, skip: int, limit: int, state_id: Optional[i
     cities = query.offset(skip).limit(limit).all()  # Pagination query
     
     # Enrich cities with created_by_name and updated_by_name
+    attach_user_names(db, cities)
     for city in cities:
-        city.created_by_name = get_user_name(db, city.created_by) if city.created_by else None
-        city.updated_by_name = get_user_name(db, city.updated_by) if city.updated_by else None
         city.state_name = city.state.name if city.state else None
     
     return total, cities
@@ -10,6 +10,8 @@ from app.models.branch import Branch
 from app.models.company import Company
 from typing import Optional
 from app.models.payment_mode import PaymentMode as PaymentModel
+from app.utils.reference_cache import get_reference_name, GLOBLE_STATUS
+from app.utils.user_names import resolve_user_names
 
 
 
@@ -60,8 +62,7 @@ def get_globle_status_name(db: Session, globle_status_id: int) -> str:
     """
     Fetch `globle_status_name` from the Status model based on `globle_status_id`.
     """
-    globle_status = db.query(StatusModel).filter(StatusModel.id == globle_status_id).first()
-    return globle_status.name if globle_status else None
+    return get_reference_name(db, GLOBLE_STATUS, globle_status_id)
 
 
 
@@ -70,8 +71,7 @@ def get_status_name(db: Session, status_id: int) -> str:
     """
     Fetch `globle_status_name` from the GlobleStatus model based on `status_id`.
     """
-    globle_status = db.query(StatusModel).filter(StatusModel.id == status_id).first()
-    return globle_status.name if globle_status else None
+    return get_reference_name(db, GLOBLE_STATUS, status_id)
 
 
 
@@ -80,8 +80,7 @@ def get_user_name(db: Session, user_id: int) -> str:
     """
     Fetch the user's first name by `user_id`.
     """
-    user = db.query(User).filter(User.user_id == user_id).first()
-    return user.first_name if user else None
+    return resolve_user_names(db, [user_id]).get(user_id)
 
 
 # Function to validate branch name uniqueness
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from app.models.country import Country
 from app.schemas.country import CountryCreate, CountryUpdate
 from app.services.common_validate_data import get_user_name
+from app.utils.user_names import attach_user_names
 
 
 def get_countries(db: Session, page: int = 1, page_size: int = 10):
@@ -14,9 +15,7 @@ def get_countries(db: Session, page: int = 1, page_size: int = 10):
     countries = db.query(Country).filter(Country.is_deleted == False).offset(skip).limit(page_size).all()
 
     # Fetch created_by_name and updated_by_name for each country
-    for country in countries:
-        country.created_by_name = get_user_name(db, country.created_by) if country.created_by else None
-        country.updated_by_name = get_user_name(db, country.updated_by) if country.updated_by else None
+    attach_user_names(db, countries)
 
     return countries
 
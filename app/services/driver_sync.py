@@ -0,0 +1,276 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User
+from app.models.drivers import DriverModel
+from app.models.order import OrderModel
+from app.models.order_summary import OrderSummaryModel
+from app.models.order_tracking import OrderTrackingModel
+from app.models.driver_sync_event import DriverSyncEventModel
+from app.schemas.driver import DriverSyncSchema
+from app.services.order import bump_order_versions
+from app.services.order_events import order_changes_committed
+from app.services.order_summary import refresh_order_summary
+from app.services.order_tracking import tracking_event_values
+from app.utils.reference_cache import get_reference_by_id, get_reference_name, SHIPMENT_STATUS
+from app.utils.status_transitions import closed_status_ids, is_transition_allowed
+
+
+# Most events one upload may carry; a device with more sends them in several
+MAX_DRIVER_SYNC_EVENTS = 1000
+
+
+def _server_time(event_time: datetime) -> datetime:
+    """`event_time` as naive UTC like the rest of the database, and never in the future of a drifting device clock."""
+    if event_time.tzinfo is not None:
+        event_time = event_time.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(event_time, datetime.utcnow())
+
+
+def get_driver_for_user(db: Session, current_user: User) -> DriverModel:
+    driver = db.query(DriverModel).filter(
+        DriverModel.user_id == current_user.user_id, DriverModel.is_deleted == False
+    ).first()
+    if not driver:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only drivers can sync events")
+    return driver
+
+
+def load_driver_tasks(db: Session, driver_id: int) -> List[dict]:
+    """Open orders assigned to `driver_id`, oldest booking first, from one query on order_summary."""
+    closed = closed_status_ids(db)
+    rows = db.execute(
+        select(
+            OrderSummaryModel.order_id,
+            OrderSummaryModel.docket_no,
+            OrderSummaryModel.display_docket,
+            OrderSummaryModel.sender_company_name,
+            OrderSummaryModel.sender_pincode,
+            OrderSummaryModel.receiver_company_name,
+            OrderSummaryModel.receiver_pincode,
+            OrderSummaryModel.shipment_status_id,
+            OrderSummaryModel.shipment_status_name,
+            OrderSummaryModel.updated_at,
+        )
+        .where(
+            OrderSummaryModel.driver_id == driver_id,
+            OrderSummaryModel.is_deleted == False,
+            or_(OrderSummaryModel.shipment_status_id.is_(None), OrderSummaryModel.shipment_status_id.not_in(closed)),
+        )
+        .order_by(OrderSummaryModel.created_at, OrderSummaryModel.order_id)
+    ).all()
+    return [dict(row._mapping) for row in rows]
+
+
+def _apply_driver_events(db: Session, driver: DriverModel, sync: DriverSyncSchema, current_user: User):
+    """Apply the events of one upload in one transaction and build the answer; see sync_driver_events."""
+    events = {}
+    for event in sync.events:
+        events.setdefault(event.client_event_id, event)
+
+    stored = {
+        row.client_event_id: row
+        for row in db.execute(
+            select(
+                DriverSyncEventModel.client_event_id,
+                DriverSyncEventModel.order_id,
+                DriverSyncEventModel.result,
+                DriverSyncEventModel.detail,
+            ).where(
+                DriverSyncEventModel.driver_id == driver.driver_id,
+                DriverSyncEventModel.client_event_id.in_(list(events)),
+            )
+        ).all()
+    } if events else {}
+
+    new_events = sorted(
+        (event for client_event_id, event in events.items() if client_event_id not in stored),
+        key=lambda event: _server_time(event.event_time),
+    )
+
+    dockets = list({str(event.docket).strip() for event in new_events})
+    docket_nos = [int(docket) for docket in dockets if docket.isdecimal() and docket.isascii()]
+    rows = db.execute(
+        select(OrderModel.order_id, OrderModel.docket_no, OrderModel.manual_docket, OrderModel.driver_id, OrderModel.shipment_status_id, OrderModel.version).where(
+            or_(OrderModel.docket_no.in_(docket_nos), OrderModel.manual_docket.in_(dockets)),
+            OrderModel.is_deleted == False,
+        )
+    ).all() if dockets else []
+
+    orders_by_docket = {}
+    for row in rows:
+        if row.manual_docket:
+            orders_by_docket[row.manual_docket] = row
+        if row.docket_no is not None:
+            orders_by_docket[str(row.docket_no)] = row
+
+    # Status of each order as the events applied so far left it
+    current_status = {row.order_id: row.shipment_status_id for row in rows}
+    outcomes = {}
+    tracking_rows = []
+    for event in new_events:
+        event_time = _server_time(event.event_time)
+        order = orders_by_docket.get(str(event.docket).strip())
+        outcome = {"result": "applied", "order_id": order.order_id if order else None, "detail": None, "event_time": event_time}
+        outcomes[event.client_event_id] = outcome
+
+        if order is None:
+            outcome["result"] = "not_found"
+            continue
+        if order.driver_id != driver.driver_id:
+            outcome.update(result="rejected", detail="Order is not assigned to this driver")
+            continue
+
+        from_status_id = current_status[order.order_id]
+        to_status_id = from_status_id
+        if event.type == "status":
+            target_status = get_reference_by_id(db, SHIPMENT_STATUS, event.shipment_status_id) if event.shipment_status_id else None
+            if not target_status or target_status.is_deleted:
+                outcome.update(result="rejected", detail="Shipment status not found")
+                continue
+            if target_status.id == from_status_id:
+                outcome["result"] = "unchanged"
+                continue
+            if not is_transition_allowed(db, from_status_id, target_status.id):
+                outcome.update(
+                    result="rejected",
+                    detail=f"Cannot move from '{get_reference_name(db, SHIPMENT_STATUS, from_status_id)}' "
+                           f"to '{target_status.name}'"
+                )
+                continue
+            to_status_id = current_status[order.order_id] = target_status.id
+        else:
+            outcome["result"] = "recorded"
+
+        tracking_rows.append(dict(
+            tracking_event_values(None, to_status_id, current_user, remark=event.remark),
+            order_id=order.order_id,
+            location=event.location,
+            event_time=event_time,
+        ))
+
+    versions_by_status = defaultdict(dict)
+    for row in rows:
+        if current_status[row.order_id] != row.shipment_status_id:
+            versions_by_status[current_status[row.order_id]][row.order_id] = row.version
+    changed_order_ids = [order_id for versions in versions_by_status.values() for order_id in versions]
+
+    for status_id, versions in versions_by_status.items():
+        bump_order_versions(db, versions, {"shipment_status_id": status_id, "updated_by": current_user.user_id})
+    # render_nulls keeps rows with and without a location in one executemany
+    if tracking_rows:
+        db.execute(insert(OrderTrackingModel).execution_options(render_nulls=True), tracking_rows)
+    if outcomes:
+        db.execute(insert(DriverSyncEventModel).execution_options(render_nulls=True), [
+            dict(outcome, driver_id=driver.driver_id, client_event_id=client_event_id)
+            for client_event_id, outcome in outcomes.items()
+        ])
+    refresh_order_summary(db, changed_order_ids)
+    db.commit()
+
+    touched_order_ids = list(dict.fromkeys(row["order_id"] for row in tracking_rows))
+    if touched_order_ids:
+        order_changes_committed(db, touched_order_ids, current_user)
+
+    results = []
+    answered = set()
+    for event in sync.events:
+        outcome = outcomes.get(event.client_event_id)
+        # Events synced before, and second copies within this upload, are duplicates
+        duplicate = outcome is None or event.client_event_id in answered
+        answered.add(event.client_event_id)
+        if outcome is None:
+            row = stored[event.client_event_id]
+            outcome = {"order_id": row.order_id, "result": row.result, "detail": row.detail}
+        results.append({
+            "client_event_id": event.client_event_id,
+            "order_id": outcome["order_id"],
+            "result": outcome["result"],
+            "detail": outcome["detail"],
+            "duplicate": duplicate,
+        })
+
+    return {
+        "message": "Driver events synced successfully",
+        "driver_id": driver.driver_id,
+        "applied": len(tracking_rows),
+        "duplicates": sum(result["duplicate"] for result in results),
+        "results": results,
+        "tasks": load_driver_tasks(db, driver.driver_id),
+    }
+
+
+def sync_driver_events(db: Session, sync: DriverSyncSchema, current_user: User):
+    """
+    Apply a batch of scans and status changes a driver's device recorded offline.
+
+    Events are de-duplicated by client_event_id, within the upload and against
+    earlier uploads, then applied in event time order. Status changes go through
+    the transition rules against the status the earlier events of the batch
+    left the order in. The orders are read with one SELECT and every write is
+    an executemany or one UPDATE per target status, all in one transaction; if
+    an order is changed by another request meanwhile nothing is applied and the
+    answer is 409, so the device simply uploads again. An upload racing another
+    one with the same events is redone once, answering those from the events
+    the other stored. Returns the outcome of every event and the driver's open
+    tasks.
+    """
+    driver = get_driver_for_user(db, current_user)
+    if len(sync.events) > MAX_DRIVER_SYNC_EVENTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_DRIVER_SYNC_EVENTS} events can be synced at once"
+        )
+
+    try:
+        try:
+            return _apply_driver_events(db, driver, sync, current_user)
+        except IntegrityError:
+            # A concurrent upload stored some of these events first; they now
+            # count as duplicates and are answered from its stored outcomes
+            db.rollback()
+            return _apply_driver_events(db, driver, sync, current_user)
+
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="These events are being synced by another upload, send them again"
+        )
+
+    except HTTPException:
+        db.rollback()
+        raise
+
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+def purge_driver_sync_events(db: Session, older_than_days: int = None) -> int:
+    """Delete the outcomes of events synced more than `older_than_days` ago; returns how many were removed."""
+    if older_than_days is None:
+        older_than_days = settings.driver_sync_retention_days
+    result = db.execute(delete(DriverSyncEventModel).where(
+        DriverSyncEventModel.synced_at < datetime.utcnow() - timedelta(days=older_than_days)
+    ))
+    db.commit()
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    # python -m app.services.driver_sync
+    from app.db.session import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(f"Removed {purge_driver_sync_events(session)} synced driver events")
+    finally:
+        session.close()
@@ -4,6 +4,8 @@ from app.schemas.globle_status import GlobleStatusCreate, GlobleStatusUpdate
 from app.utils.auth import get_current_user
 from fastapi import HTTPException
 from app.models.user import User
+from app.utils.user_names import resolve_user_names
+from app.utils.reference_cache import invalidate_reference_cache, GLOBLE_STATUS
 
 
 # Helper function to fetch user name by user_id
@@ -12,8 +14,7 @@ def get_user_name(db: Session, user_id: int) -> str:
     Fetch user's first name by user_id.
     This function queries the User model to get the user's first name using their user_id.
     """
-    user = db.query(User).filter(User.user_id == user_id).first()
-    return user.first_name if user else None
+    return resolve_user_names(db, [user_id]).get(user_id)
 
 # Create a new GlobleStatus
 def create_globle_status(db: Session, globle_status: GlobleStatusCreate, current_user: User):
@@ -30,6 +31,7 @@ def create_globle_status(db: Session, globle_status: GlobleStatusCreate, current
     db.add(db_globle_status)  # Add the new GlobleStatus to the session
     db.commit()  # Commit the transaction
     db.refresh(db_globle_status)  # Refresh to get the latest data (e.g., auto-generated fields)
+    invalidate_reference_cache(GLOBLE_STATUS)
     
     # Fetch created_by_name after commit to populate the field
     db_globle_status.created_by_name = get_user_name(db, db_globle_status.created_by)
@@ -45,8 +47,9 @@ def get_globle_statuses(db: Session, skip: int = 0, limit: int = 100):
     globle_statuses = db.query(GlobleStatus).filter(GlobleStatus.is_deleted == False).offset(skip).limit(limit).all()
     
     # Populate created_by_name for each GlobleStatus
+    user_names = resolve_user_names(db, [globle_status.created_by for globle_status in globle_statuses])
     for globle_status in globle_statuses:
-        globle_status.created_by_name = get_user_name(db, globle_status.created_by)
+        globle_status.created_by_name = user_names.get(globle_status.created_by)
     
     return globle_statuses  # Return the list of GlobleStatuses
 
@@ -83,6 +86,7 @@ def update_globle_status(db: Session, globle_status_id: int, globle_status_updat
             db_globle_status.is_active = globle_status_update.is_active
         db.commit()  # Commit the changes to the database
         db.refresh(db_globle_status)  # Refresh to get the latest data
+        invalidate_reference_cache(GLOBLE_STATUS)
         return db_globle_status  # Return the updated GlobleStatus object
     return None  # Return None if the GlobleStatus was not found
 
@@ -98,5 +102,6 @@ def soft_delete_globle_status(db: Session, globle_status_id: int):
         db_globle_status.is_deleted = True  # Mark as deleted
         db.commit()  # Commit the change
         db.refresh(db_globle_status)  # Refresh to get the latest data
+        invalidate_reference_cache(GLOBLE_STATUS)
         return db_globle_status  # Return the updated object
     return None
\ No newline at end of file
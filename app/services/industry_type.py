@@ -5,6 +5,7 @@ from app.utils.auth import get_current_user
 from fastapi import Depends
 from app.models.user import User
 from app.services.common_validate_data import get_user_name
+from app.utils.user_names import resolve_user_names
 
 
 
@@ -38,8 +39,9 @@ def get_industry_types(db: Session, skip: int = 0, limit: int = 100):
     industry_types = db.query(IndustryType).filter(IndustryType.is_deleted == False).offset(skip).limit(limit).all()
 
     # Populate created_by_name for each IndustryType
+    user_names = resolve_user_names(db, [industry_type.created_by for industry_type in industry_types])
     for industry_type in industry_types:
-        industry_type.created_by_name = get_user_name(db, industry_type.created_by)
+        industry_type.created_by_name = user_names.get(industry_type.created_by)
 
     # Return the list of IndustryTypes as IndustryTypeResponse
     return [IndustryTypeResponse.from_orm(industry_type) for industry_type in industry_types]
@@ -2,10 +2,11 @@ from sqlalchemy.orm import Session
 import json
 
 from typing import Optional,List
+from datetime import datetime
 from fastapi import HTTPException,status,UploadFile
 from app.models.user import User
 from app.models.order import OrderModel,PaymentTypeEnum,DimensionTypeEnum
-from app.schemas.order import CreateOrderSchema,UpdateOrderSchema, AssignDriverVehicleSchema,UpdateShipmentStatusSchema
+from app.schemas.order import CreateOrderSchema,UpdateOrderSchema, AssignDriverVehicleSchema,UpdateShipmentStatusSchema,ShipmentStatusTransitionSchema
 from app.models.order_item import OrderItemModel
 from app.schemas.order_item import GetOrderItemSchema
 from app.models.order_tracking import OrderTrackingModel
@@ -18,7 +19,19 @@ from app.models.parcel_type import ParcelType
 from app.models.shipment_status import ShipmentStatusModel
 from app.models.drivers import DriverModel
 from app.models.vehicle import VehicleModel
+from sqlalchemy import insert, or_, select, tuple_, update
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm.exc import StaleDataError
+from app.services.order_summary import refresh_order_summary
+from app.services.order_tracking import tracking_event_values
+from app.services.order_events import order_changes_committed
+from app.services.address_book_dedup import find_or_create_address_book
+from app.services.order_search import DEFAULT_SEARCH_PAGE_SIZE, parse_search_terms, search_orders
+from app.utils.reference_cache import get_reference_by_id, get_reference_by_name, get_reference_name, SHIPMENT_STATUS
+from app.utils.user_names import attach_user_names
+from app.utils.docket_allocator import allocate_docket_no
+from app.utils.status_transitions import INITIAL_SHIPMENT_STATUS_ID, is_transition_allowed
+from app.services.order_listing import list_orders, serialize_orders, loaded_values, decode_order_cursor, parse_order_fields, parse_order_includes, DEFAULT_PAGE_LIMIT
 import os
 import shutil
 
@@ -30,57 +43,43 @@ import shutil
 def get_all_orders(db: Session , current_user:User, 
     shipment_status_name: str = None,
     docket_no: int = None,
-    pincode:int = None
+    pincode: Optional[List[str]] = None,
+    limit: int = DEFAULT_PAGE_LIMIT,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None
     ):
 
     try:
-        query = db.query(OrderModel).filter(OrderModel.is_deleted == False)
+        after_key = decode_order_cursor(after) if after else None
+        field_list = parse_order_fields(fields)
+        include_set = parse_order_includes(include)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-        if shipment_status_name:
-            query = query.join(ShipmentStatusModel, OrderModel.shipment_status_id == ShipmentStatusModel.shipment_status_id)\
-                         .filter(ShipmentStatusModel.shipment_status_name == shipment_status_name)
-       
-        if docket_no:
-            query = query.filter(OrderModel.docket_no == docket_no)
-
-        if pincode:
-            query = query.join(AddressBookModel, (OrderModel.receiver_address_book_id == AddressBookModel.address_book_id) | 
-                        (OrderModel.sender_address_book_id == AddressBookModel.address_book_id))\
-                        .filter(AddressBookModel.pincode == pincode)
-
-        orders_data = query.all()
+    try:
+        orders_data, next_cursor = list_orders(
+            db,
+            shipment_status_name=shipment_status_name,
+            docket_no=docket_no,
+            pincodes=pincode,
+            limit=limit,
+            after=after_key,
+            fields=field_list,
+            include=include_set,
+        )
 
-        if not orders_data:
+        if not orders_data and not after:
             raise HTTPException(
                 status_code = status.HTTP_404_NOT_FOUND ,
                 detail = "No Order found"
             )
-        
-        for order in orders_data:
-            order.customer_name = db.query(User.first_name).filter(User.user_id == order.customer_id).scalar()  
-            order.service_type_name = db.query(ServiceType.name).filter(ServiceType.service_id == order.service_type_id).scalar()
-            order.payment_mode_name = db.query(PaymentMode.payment_name).filter(PaymentMode.payment_id == order.payment_mode_id).scalar()
-            # order.receiver_address_book = db.query(AddressBookModel.address).filter(AddressBookModel.address_book_id == order.receiver_address_book_id).scalar()
-            order.receiver_company_name = db.query(AddressBookModel.company_name).filter(AddressBookModel.address_book_id == order.receiver_address_book_id).scalar()
-            
-            # order.sender_address_book = db.query(AddressBookModel.address).filter(AddressBookModel.address_book_id == order.sender_address_book_id).scalar()
-            order.sender_company_name = db.query(AddressBookModel.company_name).filter(AddressBookModel.address_book_id == order.sender_address_book_id).scalar()
-            order.parcel_type_name = db.query(ParcelType.parcel_name).filter(ParcelType.parcel_id == order.parcel_type_id).scalar()
-            order.shipment_status_name = db.query(ShipmentStatusModel.shipment_status_name).filter(ShipmentStatusModel.shipment_status_id == order.shipment_status_id).scalar()
-            order.driver_name = db.query(DriverModel.name).filter(DriverModel.driver_id == order.driver_id).scalar()
-            order.vehicle_name = db.query(VehicleModel.name).filter(VehicleModel.id == order.vehicle_id).scalar()
-            order.display_docket = order.manual_docket if order.is_docket_auto else order.docket_no
-
-            order.order_items = db.query(OrderItemModel).filter(OrderItemModel.order_id == order.order_id).all()
-            order.sender_address = db.query(AddressBookModel).filter(AddressBookModel.address_book_id == order.sender_address_book_id).first()
-            order.receiver_address = db.query(AddressBookModel).filter(AddressBookModel.address_book_id == order.receiver_address_book_id).first()
-            order.order_trackings = db.query(OrderTrackingModel).filter(OrderTrackingModel.order_id == order.order_id).first()
-
 
         return {
         "message": "Orders retrieved successfully",
         "total": len(orders_data),
-        "orders": orders_data
+        "next_cursor": next_cursor,
+        "orders": serialize_orders(orders_data)
         }
     
     except Exception as e:
@@ -88,7 +87,33 @@ def get_all_orders(db: Session , current_user:User,
     
 
 
-def get_order_by_id(db: Session, order_id: int, current_user: User):
+def search_order_list(db: Session, current_user: User, q: str, page: int = 1, page_size: int = DEFAULT_SEARCH_PAGE_SIZE):
+
+    try:
+        terms = parse_search_terms(q)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    try:
+        hits, has_more = search_orders(db, terms, page=page, page_size=page_size)
+
+        return {
+        "message": "Orders retrieved successfully",
+        "page": page,
+        "page_size": page_size,
+        "has_more": has_more,
+        "orders": hits
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+
+def get_order_by_id(db: Session, order_id: int, current_user: User, fields: Optional[str] = None, include: Optional[str] = None):
+
+    if fields or include is not None:
+        return get_projected_order_by_id(db, order_id, fields, include)
    
     get_order = db.query(OrderModel).filter(OrderModel.order_id == order_id, OrderModel.is_deleted == False).first()
 
@@ -104,9 +129,7 @@ def get_order_by_id(db: Session, order_id: int, current_user: User):
     sender_address = db.query(AddressBookModel).filter(AddressBookModel.address_book_id == get_order.sender_address_book_id).first()
     receiver_address = db.query(AddressBookModel).filter(AddressBookModel.address_book_id == get_order.receiver_address_book_id).first()
     
-    user_dict = {user.user_id: user.first_name for user in db.query(User).all()}
-    get_order.created_by_name = user_dict.get(get_order.created_by, 'Unknown')
-    get_order.updated_by_name = user_dict.get(get_order.updated_by, 'Unknown')
+    attach_user_names(db, [get_order], default='Unknown')
     get_order.order_item = order_item
     get_order.sender_address = sender_address
     get_order.receiver_address = receiver_address
@@ -117,65 +140,68 @@ def get_order_by_id(db: Session, order_id: int, current_user: User):
         "order": get_order
     }
 
+def get_projected_order_by_id(db: Session, order_id: int, fields: Optional[str], include: Optional[str]):
+    """
+    Fetch one order restricted to the requested fields and relations.
+    """
+    try:
+        field_list = parse_order_fields(fields)
+        include_set = parse_order_includes(include)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    orders, _ = list_orders(db, order_id=order_id, limit=1, fields=field_list, include=include_set)
+
+    if not orders:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+
+    return {
+        "message": "Order retrieved successfully",
+        "order": serialize_orders(orders)[0]
+    }
+
 def create_order(db: Session, order_service_data: CreateOrderSchema, current_user: User):
-    
+    """
+    Create an order with its addresses, items and tracking row in one transaction.
+
+    New rows are only flushed to obtain their ids, the items go in as a single
+    executemany, and everything is committed once at the end, so a failure at
+    any step leaves nothing behind.
+    """
     try:
             
-            docket_no = None
-            
-
-       
-            latest_order = db.query(OrderModel).order_by(OrderModel.docket_no.desc()).first()
-            docket_no = 202100000 if not latest_order else latest_order.docket_no + 1
+            docket_no = allocate_docket_no(db, current_user.branch_id)
 
             # Check if docket_no should be auto-generated
             manual_docket = order_service_data.manual_docket if order_service_data.is_docket_auto else None
-            
-            # new_sender_address = None
-            if order_service_data.sender_address:
 
-                # address_book_dict = order_service_data.dict(exclude_unset=True)
-                sender_address_book_id = None
+            sender_address_book_id = None
+            receiver_address_book_id = None
 
-                if order_service_data.sender_address_book_id and order_service_data.sender_address_book_id > 0:   #address_book_dict.get("sender_address_book_id"):
-                        existing_sender_address =  db.query(AddressBookModel).filter_by(address_book_id=order_service_data.sender_address_book_id).first() #db.query(AddressBookModel).get(order_service_data.sender_address_book_id)
+            if order_service_data.sender_address:
+
+                if order_service_data.sender_address_book_id and order_service_data.sender_address_book_id > 0:
+                        existing_sender_address =  db.query(AddressBookModel).filter_by(address_book_id=order_service_data.sender_address_book_id).first()
 
                         if  existing_sender_address:
                             sender_address_book_id = existing_sender_address.address_book_id
-                            new_sender_address = existing_sender_address
-                            
-                    # else:
-                    #     sender_address_book_id = None
                         
-                if sender_address_book_id is None and order_service_data.sender_address:
-                    # if not address_book_dict.get("sender_address_book_id"):
-                        new_sender_address = AddressBookModel(**order_service_data.sender_address.dict())
-                        db.add(new_sender_address)
-                        db.commit()
-                        db.refresh(new_sender_address)
-                        sender_address_book_id = new_sender_address.address_book_id 
-
-            # new_order.sender_address_book_id = sender_address_book_id 
+                if sender_address_book_id is None:
+                        sender_address_book_id = find_or_create_address_book(db, order_service_data.sender_address)
 
             if order_service_data.receiver_address:
-                receiver_address_book_id= None
 
-                if order_service_data.receiver_address_book_id and order_service_data.receiver_address_book_id > 0:   #address_book_dict.get("sender_address_book_id"):
-                        existing_receiver_address =  db.query(AddressBookModel).filter_by(address_book_id=order_service_data.receiver_address_book_id).first() #db.query(AddressBookModel).get(order_service_data.sender_address_book_id)
+                if order_service_data.receiver_address_book_id and order_service_data.receiver_address_book_id > 0:
+                        existing_receiver_address =  db.query(AddressBookModel).filter_by(address_book_id=order_service_data.receiver_address_book_id).first()
 
                         if  existing_receiver_address:
                             receiver_address_book_id = existing_receiver_address.address_book_id
 
-
-                if receiver_address_book_id is None and order_service_data.receiver_address:
-                    # if not address_book_dict.get("sender_address_book_id"):
-                        new_receiver_address = AddressBookModel(**order_service_data.receiver_address.dict())
-                        db.add(new_receiver_address)
-                        db.commit()
-                        db.refresh(new_receiver_address)
-                        receiver_address_book_id = new_receiver_address.address_book_id 
-            
-
+                if receiver_address_book_id is None:
+                        receiver_address_book_id = find_or_create_address_book(db, order_service_data.receiver_address)
 
 
             order_dict = order_service_data.dict(exclude={"order_items","sender_address","receiver_address","order_trackings"}, exclude_unset=True)
@@ -183,80 +209,46 @@ def create_order(db: Session, order_service_data: CreateOrderSchema, current_use
             order_dict["docket_no"] = docket_no
             order_dict["sender_address_book_id"] = sender_address_book_id
             order_dict["receiver_address_book_id"] = receiver_address_book_id
-            order_dict["shipment_status_id"] = 1
+            order_dict["shipment_status_id"] = INITIAL_SHIPMENT_STATUS_ID
             order_dict["manual_docket"] = manual_docket
 
-
-
             new_order = OrderModel(**order_dict)
             db.add(new_order)
-            db.commit()
-            
-            db.refresh(new_order)
-            
+            db.flush()
            
 
             order_items_list = []
-            new_order_item = None
 
-            if order_service_data.order_items:  # Assuming order_items are part of the request
+            if order_service_data.order_items:
+                order_item_rows = []
                 for order_item_data in order_service_data.order_items:
-                    # for order_item_data in order_service_data.order_item:
-                    # order_item_dict = order_item_data.dict(exclude_unset=True)
                     order_item_dict = order_item_data.dict(exclude_unset=True)
                     order_item_dict["created_by"] = current_user.user_id
-                    order_item_dict["order_id"] = new_order.order_id  
-                    
-                    
-                    # Create the new OrderItem and add it to the session
-                    new_order_item = OrderItemModel(**order_item_dict)
-                    db.add(new_order_item)
-                    db.commit()
-                    db.refresh(new_order_item)
-
-
-                    # order_items_list.append(new_order_item)
-
-                # Commit the order items to the database
-                # db.commit()
-
-
-                    order_items_list.append(
-                        # new_order_item
-                        GetOrderItemSchema.from_orm(new_order_item).dict() if new_order_item else None
-                        # "order_item_id": new_order_item.order_item_id,
-                        # "order_id": new_order_item.order_id,
-                        # "number_of_box": new_order_item.number_of_box,
-                        # "parcel_hight": new_order_item.parcel_hight,
-                        # "parcel_width": new_order_item.parcel_width,
-                        # "parcel_breadth": new_order_item.parcel_breadth,
-                        # "volume": new_order_item.volume,
-                        # "is_active": new_order_item.is_active
-                    )
+                    order_item_dict["order_id"] = new_order.order_id
+                    order_item_rows.append(order_item_dict)
+
+                # One executemany for all items, then one select for their generated ids
+                db.execute(insert(OrderItemModel), order_item_rows)
+                new_order_items = db.query(OrderItemModel).filter(
+                    OrderItemModel.order_id == new_order.order_id
+                ).order_by(OrderItemModel.order_item_id).all()
 
+                order_items_list = [GetOrderItemSchema.from_orm(new_order_item).dict() for new_order_item in new_order_items]
 
-            if order_service_data.order_trackings:  # Assuming order_trackings are part of the request
-                # for order_tracking_data  in order_service_data.order_trackings:
 
-                    # order_tracking_dict = order_tracking_data.dict(exclude_unset=True)
-                    order_tracking_dict = order_service_data.order_trackings.dict(exclude_unset=True)
-                    order_tracking_dict["created_by"] = current_user.user_id
+            new_order_tracking = None
+
+            if order_service_data.order_trackings:
+                    order_tracking_dict = tracking_event_values(order_service_data.order_trackings, new_order.shipment_status_id, current_user)
                     order_tracking_dict["order_id"] = new_order.order_id  
                     
                     new_order_tracking = OrderTrackingModel(**order_tracking_dict)
                     db.add(new_order_tracking)
-                    db.commit()
-                    db.refresh(new_order_tracking)
-
 
-                   
+            refresh_order_summary(db, [new_order.order_id])
 
-            
-            # Return the newly created order
-            return {
-                "message": "Order created successfully",            
-                # "order": new_order
-                "order": {
+            # Captured before the commit expires the instances, which would cost a reload each
+            order_response = {
                     "order_id": new_order.order_id,
                     "docket_no": new_order.docket_no,
                     "manual_docket": new_order.manual_docket,
@@ -286,11 +278,15 @@ def create_order(db: Session, order_service_data: CreateOrderSchema, current_use
                     "shipment_status_id":new_order.shipment_status_id,
 
                     "order_items": order_items_list,
-                    "order_tracking": new_order_tracking,
-                    # "sender_address":new_sender_address,
-                    # "receiver_address": new_receiver_address,
-                     
-                }
+                    "order_tracking": loaded_values(new_order_tracking),
+            }
+
+            db.commit()
+            order_changes_committed(db, [order_response["order_id"]], current_user)
+
+            return {
+                "message": "Order created successfully",            
+                "order": order_response
             }
     
     except SQLAlchemyError as e:
@@ -302,9 +298,139 @@ def create_order(db: Session, order_service_data: CreateOrderSchema, current_use
         raise HTTPException(status_code=400, detail=f"Error creating order: {str(e)}")
 
 
+ORDER_CONFLICT_DETAIL = "Order was changed by another request, reload it and try again"
+
+
+def order_etag(version: int) -> str:
+    """ETag of an order representation, derived from its version."""
+    return f'"{version}"'
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """The order version an If-Match header asks for; None for a missing header or "*"."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.split(",")[0].strip()
+    if tag.startswith("W/"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="If-Match needs a strong ETag")
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="If-Match must be an ETag returned for this order")
+
+
+def bump_order_versions(db: Session, versions: dict, values: dict):
+    """
+    Apply `values` to the orders in `versions` (order id -> version read earlier) with
+    one UPDATE that only matches rows still at that version, and raise 409 if any
+    of them moved on in the meantime. The caller rolls back on the exception.
+    """
+    updated = db.execute(
+        update(OrderModel)
+        .where(tuple_(OrderModel.order_id, OrderModel.version).in_(list(versions.items())))
+        .values(**values, version=OrderModel.version + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if updated != len(versions):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=ORDER_CONFLICT_DETAIL)
+
+
+# Item columns a client may set through update_order
+ORDER_ITEM_FIELDS = ("number_of_box", "parcel_hight", "parcel_width", "parcel_breadth", "volume", "is_active")
+
+
+def sync_order_items(db: Session, order_id: int, order_items, current_user: User) -> dict:
+    """
+    Make the live items of `order_id` match `order_items`.
+
+    Items without an order_item_id are inserted, items with one get the fields
+    they set, and live items missing from the list are soft deleted. The diff is
+    computed against one SELECT of the current items, and each kind of change is
+    written with a single statement, whatever the number of items. Ids that do
+    not belong to the order are ignored. Nothing is committed.
+    """
+    existing = {
+        row.order_item_id: row
+        for row in db.execute(
+            select(OrderItemModel.order_item_id, *[getattr(OrderItemModel, field) for field in ORDER_ITEM_FIELDS]).where(
+                OrderItemModel.order_id == order_id, OrderItemModel.is_deleted == False
+            )
+        ).all()
+    }
+
+    new_rows = []
+    changed_rows = {}
+    kept_ids = set()
+    ignored_ids = []
+    now = datetime.utcnow()
+
+    for order_item_data in order_items:
+        values = order_item_data.dict(exclude_unset=True)
+        values.pop("order_id", None)
+        order_item_id = values.pop("order_item_id", None)
+
+        if not order_item_id:
+            row = {field: values.get(field) for field in ORDER_ITEM_FIELDS}
+            if row["is_active"] is None:
+                row["is_active"] = True
+            new_rows.append(dict(row, order_id=order_id, created_by=current_user.user_id))
+            continue
+
+        current = existing.get(order_item_id)
+        if current is None:
+            ignored_ids.append(order_item_id)
+            continue
+
+        kept_ids.add(order_item_id)
+        if any(getattr(current, field) != value for field, value in values.items()):
+            # Every changed row carries every field, so all of them go out as one executemany
+            row = changed_rows.get(order_item_id) or {field: getattr(current, field) for field in ORDER_ITEM_FIELDS}
+            row.update(values)
+            changed_rows[order_item_id] = dict(row, order_item_id=order_item_id, updated_by=current_user.user_id, updated_at=now)
+
+    deleted_ids = [order_item_id for order_item_id in existing if order_item_id not in kept_ids]
+
+    if new_rows:
+        db.execute(insert(OrderItemModel), new_rows)
+    if changed_rows:
+        db.execute(update(OrderItemModel), list(changed_rows.values()))
+    if deleted_ids:
+        db.execute(
+            update(OrderItemModel)
+            .where(OrderItemModel.order_item_id.in_(deleted_ids))
+            .values(is_deleted=True, is_active=False, updated_by=current_user.user_id, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+    return {
+        "inserted": len(new_rows),
+        "updated": list(changed_rows),
+        "deleted": deleted_ids,
+        "ignored": ignored_ids,
+    }
+
+
+def check_status_transition(db: Session, from_status_id: Optional[int], to_status_id: int):
+    """Raise 400 unless an order in `from_status_id` may move to `to_status_id`."""
+    if not is_transition_allowed(db, from_status_id, to_status_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot move an order from '{get_reference_name(db, SHIPMENT_STATUS, from_status_id)}' "
+                   f"to '{get_reference_name(db, SHIPMENT_STATUS, to_status_id)}'"
+        )
+
+
 def update_order(
-    db: Session, order_id: int, update_order_service_data: UpdateOrderSchema, current_user: User
+    db: Session, order_id: int, update_order_service_data: UpdateOrderSchema, current_user: User,
+    expected_version: Optional[int] = None
 ):
+    """
+    Update an order, its items and addresses in one transaction.
+
+    The order row is written with WHERE version = <version read here>, so a
+    concurrent update makes this one fail with 409 instead of being overwritten.
+    `expected_version` comes from If-Match; a different current version is a 412.
+    """
     try:
         # Fetch existing order
         order_update = db.query(OrderModel).filter(
@@ -314,7 +440,15 @@ def update_order(
         if not order_update:
             raise HTTPException(status_code=404, detail="Order not found")
 
-        
+        if expected_version is not None and order_update.version != expected_version:
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=ORDER_CONFLICT_DETAIL)
+
+        if update_order_service_data.shipment_status_id is not None:
+            check_status_transition(db, order_update.shipment_status_id, update_order_service_data.shipment_status_id)
+
+        sender_address_book_id = order_update.sender_address_book_id
+        receiver_address_book_id = order_update.receiver_address_book_id
+
         if update_order_service_data.sender_address:
 
                 # address_book_dict = order_service_data.dict(exclude_unset=True)
@@ -332,11 +466,7 @@ def update_order(
                         
                 if sender_address_book_id is None and update_order_service_data.sender_address:
                     # if not address_book_dict.get("sender_address_book_id"):
-                        new_sender_address = AddressBookModel(**update_order_service_data.sender_address.dict())
-                        db.add(new_sender_address)
-                        db.commit()
-                        db.refresh(new_sender_address)
-                        sender_address_book_id = new_sender_address.address_book_id 
+                        sender_address_book_id = find_or_create_address_book(db, update_order_service_data.sender_address)
 
 
         
@@ -352,57 +482,28 @@ def update_order(
 
                 if receiver_address_book_id is None and update_order_service_data.receiver_address:
                     # if not address_book_dict.get("sender_address_book_id"):
-                        new_receiver_address = AddressBookModel(**update_order_service_data.receiver_address.dict())
-                        db.add(new_receiver_address)
-                        db.commit()
-                        db.refresh(new_receiver_address)
-                        receiver_address_book_id = new_receiver_address.address_book_id 
+                        receiver_address_book_id = find_or_create_address_book(db, update_order_service_data.receiver_address)
         
         
 
-        existing_order_items = {item.order_item_id: item for item in db.query(OrderItemModel).filter(OrderItemModel.order_id == order_id).all()}
-        new_order_items = []
-
-        for order_item_data in update_order_service_data.order_items or []:
-            order_item_dict = order_item_data.dict(exclude_unset=True)
-            order_item_id = order_item_dict.get("order_item_id")
-
-            if order_item_id and order_item_id != 0 and order_item_id in existing_order_items:
-                existing_item = existing_order_items[order_item_id]
-                updated = False  # Track if any update is made
-
-                for key, value in order_item_dict.items():
-                    if key != "order_item_id" and getattr(existing_item, key) != value:
-                        setattr(existing_item, key, value)
-                        updated = True
-
-                if updated:  # Commit changes only if an update occurred
-                    existing_item.updated_by = current_user.user_id  # Track who updated it
-                    db.add(existing_item)
-
-            elif not order_item_id or order_item_id == 0:
-                order_item_dict.pop("order_id", None)  # Prevent duplicate order_id assignment
-                new_order_item = OrderItemModel(**order_item_dict)
-                new_order_item.created_by = current_user.user_id
-                new_order_item.order_id = order_update.order_id
-
-                db.add(new_order_item)
-                new_order_items.append(new_order_item)
-
-        db.commit()
+        # Leaving order_items out keeps the items as they are; an empty list removes them all
+        item_changes = None
+        if update_order_service_data.order_items is not None:
+            item_changes = sync_order_items(db, order_update.order_id, update_order_service_data.order_items, current_user)
 
 
 
         if update_order_service_data.order_trackings:  
                
-                    order_tracking_dict = update_order_service_data.order_trackings.dict(exclude_unset=True)
-                    order_tracking_dict["created_by"] = current_user.user_id
+                    order_tracking_dict = tracking_event_values(
+                        update_order_service_data.order_trackings,
+                        update_order_service_data.shipment_status_id or order_update.shipment_status_id,
+                        current_user
+                    )
                     order_tracking_dict["order_id"] = order_update.order_id  
                     
                     new_order_tracking = OrderTrackingModel(**order_tracking_dict)
                     db.add(new_order_tracking)
-                    db.commit()
-                    db.refresh(new_order_tracking)
         
 
 
@@ -425,82 +526,130 @@ def update_order(
                     value = DimensionTypeEnum(value)  
                 setattr(order_update, key, value)
 
+        # Always write the order row, so its version moves even when only items changed
+        order_update.updated_at = datetime.utcnow()
+        db.flush()
+        refresh_order_summary(db, [order_update.order_id])
+
         # Commit changes to the database
         db.commit()
+        order_changes_committed(db, [order_id], current_user)
         db.refresh(order_update)
 
         return {
         "message": "Order updated successfully",
         "order": order_update,
+        "order_items": item_changes,
 
 
     }
 
+    except HTTPException:
+        db.rollback()
+        raise
+
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=ORDER_CONFLICT_DETAIL)
+
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail=f"Error updating order: {str(e)}")
 
+DISPATCH_CHUNK_SIZE = 1000
+
+
 def assign_driver_to_order(db: Session, order_ids: List[int], assign_driver_vehicle : AssignDriverVehicleSchema, current_user: User):
-        
+    """
+    Assign a driver and vehicle to many orders and move them to "Pending Pickup".
+
+    Works on chunks of DISPATCH_CHUNK_SIZE ids: one bulk UPDATE of the orders and
+    one multi-row INSERT of their tracking rows per chunk, all committed together.
+    Orders whose status may not move to "Pending Pickup" are left alone and
+    listed under rejected_orders. An order changed by another request after it
+    was read fails the whole assignment with 409.
+    """
     try:
-        # order = db.query(OrderModel).filter(OrderModel.order_id == order_id).first()
-        orders = db.query(OrderModel).filter(OrderModel.order_id.in_(order_ids)).all()
         driver = db.query(DriverModel).filter(DriverModel.driver_id == assign_driver_vehicle.driver_id).first()
         vehicle = db.query(VehicleModel).filter(VehicleModel.id == assign_driver_vehicle.vehicle_id).first()
-        shipment_status = db.query(ShipmentStatusModel).filter(ShipmentStatusModel.is_deleted==False).all()
 
         shipment_status_name = "Pending Pickup"
-        # matched_status = next((status for status in shipment_status if status.shipment_status_name.lower() == shipment_status_name.lower()), None)
-        matched_status = next(
-            (status for status in shipment_status if status.shipment_status_name.lower() == shipment_status_name.lower()), 
-            None
-        )
+        matched_status = get_reference_by_name(db, SHIPMENT_STATUS, shipment_status_name)
 
-        if not orders:
-            raise HTTPException(status_code=404, detail="Order not found")
         if not driver:
             raise HTTPException(status_code=400, detail="Driver not found")
         if not vehicle:
             raise HTTPException(status_code=400, detail="Vehicle not found")
         if not matched_status:
             raise HTTPException(status_code=404, detail=f"Shipment status '{shipment_status_name}' not found")
-        
-        created_order_trackings = []
 
-        for order in orders:
-            order.driver_id = driver.driver_id
-            order.vehicle_id = vehicle.id
-            order.shipment_status_id = matched_status.shipment_status_id
-            order.updated_by = current_user.user_id
-            order.appointment_date_time = assign_driver_vehicle.appointment_date_time
-            db.add(order)
-
-
-            if assign_driver_vehicle.order_trackings:  
-               
-                    order_tracking_dict = assign_driver_vehicle.order_trackings.dict(exclude_unset=True)
-                    order_tracking_dict["created_by"] = current_user.user_id
-                    order_tracking_dict["order_id"] = order.order_id  
-                    
-                    new_order_tracking = OrderTrackingModel(**order_tracking_dict)
-                    db.add(new_order_tracking)
-                    db.commit()
-                    db.refresh(new_order_tracking)
-
-                    created_order_trackings.append(new_order_tracking)
+        tracking_values = None
+        if assign_driver_vehicle.order_trackings:
+            tracking_values = tracking_event_values(assign_driver_vehicle.order_trackings, matched_status.id, current_user)
+
+        unique_order_ids = list(dict.fromkeys(order_ids))
+        assigned_order_ids = []
+        rejected_orders = []
+
+        for start in range(0, len(unique_order_ids), DISPATCH_CHUNK_SIZE):
+            chunk = unique_order_ids[start:start + DISPATCH_CHUNK_SIZE]
+            found = db.execute(
+                select(OrderModel.order_id, OrderModel.shipment_status_id, OrderModel.version).where(
+                    OrderModel.order_id.in_(chunk), OrderModel.is_deleted == False
+                )
+            ).all()
+
+            versions = {}
+            for order_id, shipment_status_id, version in found:
+                if is_transition_allowed(db, shipment_status_id, matched_status.id):
+                    versions[order_id] = version
+                else:
+                    rejected_orders.append({
+                        "order_id": order_id,
+                        "shipment_status": get_reference_name(db, SHIPMENT_STATUS, shipment_status_id)
+                    })
+            if not versions:
+                continue
+            found_ids = list(versions)
+
+            bump_order_versions(db, versions, {
+                "driver_id": driver.driver_id,
+                "vehicle_id": vehicle.id,
+                "shipment_status_id": matched_status.id,
+                "updated_by": current_user.user_id,
+                "appointment_date_time": assign_driver_vehicle.appointment_date_time,
+            })
+
+            if tracking_values is not None:
+                db.execute(insert(OrderTrackingModel), [dict(tracking_values, order_id=order_id) for order_id in found_ids])
+
+            refresh_order_summary(db, found_ids)
+            assigned_order_ids.extend(found_ids)
+
+        if not assigned_order_ids:
+            if rejected_orders:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"None of the orders can be moved to '{shipment_status_name}'"
+                )
+            raise HTTPException(status_code=404, detail="Order not found")
 
-        
-    
         db.commit()
-        # db.refresh(order)
+        order_changes_committed(db, assigned_order_ids, current_user)
+
         return {"message": "Driver and Vehicle assigned successfully",
                 "assigned_orders": [
-                {"order_id": order.order_id, "shipment_status": matched_status.shipment_status_name, "appointment_date_time": order.appointment_date_time} for order in orders
+                {"order_id": order_id, "shipment_status": matched_status.name, "appointment_date_time": assign_driver_vehicle.appointment_date_time} for order_id in assigned_order_ids
             ],
-            "order_trackings": [tracking.order_id for tracking in created_order_trackings]
+            "order_trackings": assigned_order_ids if tracking_values is not None else [],
+            "rejected_orders": rejected_orders
         }
     
+    except HTTPException:
+        db.rollback()
+        raise
+
     except Exception as e:
         db.rollback()  # Rollback in case of an error
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
@@ -522,6 +671,9 @@ def update_shipment_status(db: Session, order_id: int, update_shipment_status_da
                 detail="Order not found or has been deleted"
             )
 
+        if update_shipment_status_data.shipment_status_id is not None:
+            check_status_transition(db, order_update.shipment_status_id, update_shipment_status_data.shipment_status_id)
+
         update_data = update_shipment_status_data.dict(exclude_unset=True)
         update_data["updated_by"] = current_user.user_id
         # update_data.shipment_status_id = shipment_status.shipment_status_id
@@ -530,19 +682,24 @@ def update_shipment_status(db: Session, order_id: int, update_shipment_status_da
         
         if update_shipment_status_data.order_trackings:  
                
-                    order_tracking_dict = update_shipment_status_data.order_trackings.dict(exclude_unset=True)
-                    order_tracking_dict["created_by"] = current_user.user_id
+                    order_tracking_dict = tracking_event_values(
+                        update_shipment_status_data.order_trackings,
+                        update_shipment_status_data.shipment_status_id or order_update.shipment_status_id,
+                        current_user,
+                        remark=update_shipment_status_data.comment
+                    )
                     order_tracking_dict["order_id"] = order_update.order_id  
                     
                     new_order_tracking = OrderTrackingModel(**order_tracking_dict)
                     db.add(new_order_tracking)
-                    db.commit()
-                    db.refresh(new_order_tracking)
 
 
         for key, value in update_data.items():
             
             setattr(order_update, key, value)
+
+        db.flush()
+        refresh_order_summary(db, [order_update.order_id])
         # Update shipment status & comment if provided
         # if update_shipment_status_data.shipment_status_id is not None:
         #     order_update.shipment_status_id = update_shipment_status_data.shipment_status_id
@@ -552,16 +709,120 @@ def update_shipment_status(db: Session, order_id: int, update_shipment_status_da
 
         # Commit changes
         db.commit()
+        order_changes_committed(db, [order_id], current_user)
         db.refresh(order_update)
 
         return {"message": "Shipment status updated successfully", "order_id": order_id, "order_trackings": GetOrderTrackingSchema.from_orm(new_order_tracking) if new_order_tracking else None}
          
+    except HTTPException:
+        db.rollback()
+        raise
+
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=ORDER_CONFLICT_DETAIL)
+
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail=f"Error updating order: {str(e)}")
     
 
+MAX_STATUS_TRANSITION_DOCKETS = 5000
+
+
+def transition_shipment_status(db: Session, transition: ShipmentStatusTransitionSchema, current_user: User):
+    """
+    Move many parcels, given by docket, to one shipment status.
+
+    The orders are looked up with one SELECT, updated with one bulk UPDATE and
+    get their tracking rows from one multi-row INSERT, in a single transaction.
+    Returns the outcome of every docket: updated, unchanged, rejected (the move
+    is not an allowed transition) or not_found. If one of the orders is changed
+    by another request in the meantime nothing is moved and the answer is 409.
+    """
+    dockets = list(dict.fromkeys(str(docket).strip() for docket in transition.dockets if str(docket).strip()))
+    if not dockets:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No dockets given")
+    if len(dockets) > MAX_STATUS_TRANSITION_DOCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_STATUS_TRANSITION_DOCKETS} dockets can be moved at once"
+        )
+
+    target_status = get_reference_by_id(db, SHIPMENT_STATUS, transition.shipment_status_id)
+    if not target_status or target_status.is_deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Shipment status not found")
+
+    try:
+        docket_nos = [int(docket) for docket in dockets if docket.isdecimal() and docket.isascii()]
+        rows = db.execute(
+            select(OrderModel.order_id, OrderModel.docket_no, OrderModel.manual_docket, OrderModel.shipment_status_id, OrderModel.version).where(
+                or_(OrderModel.docket_no.in_(docket_nos), OrderModel.manual_docket.in_(dockets)),
+                OrderModel.is_deleted == False,
+            )
+        ).all()
+
+        orders_by_docket = {}
+        for row in rows:
+            if row.manual_docket:
+                orders_by_docket[row.manual_docket] = row
+            if row.docket_no is not None:
+                orders_by_docket[str(row.docket_no)] = row
+
+        results = []
+        moved_order_ids = []
+        versions = {}
+        for docket in dockets:
+            order = orders_by_docket.get(docket)
+            if order is None:
+                results.append({"docket": docket, "result": "not_found"})
+            elif order.shipment_status_id == target_status.id or order.order_id in moved_order_ids:
+                results.append({"docket": docket, "order_id": order.order_id, "result": "unchanged"})
+            elif not is_transition_allowed(db, order.shipment_status_id, target_status.id):
+                results.append({
+                    "docket": docket,
+                    "order_id": order.order_id,
+                    "result": "rejected",
+                    "detail": f"Cannot move from '{get_reference_name(db, SHIPMENT_STATUS, order.shipment_status_id)}'"
+                })
+            else:
+                moved_order_ids.append(order.order_id)
+                versions[order.order_id] = order.version
+                results.append({"docket": docket, "order_id": order.order_id, "result": "updated"})
+
+        if moved_order_ids:
+            order_values = {"shipment_status_id": target_status.id, "updated_by": current_user.user_id}
+            if transition.comment is not None:
+                order_values["comment"] = transition.comment
+
+            bump_order_versions(db, versions, order_values)
+            tracking_values = tracking_event_values(None, target_status.id, current_user, remark=transition.comment)
+            db.execute(
+                insert(OrderTrackingModel),
+                [dict(tracking_values, order_id=order_id) for order_id in moved_order_ids],
+            )
+            refresh_order_summary(db, moved_order_ids)
+            db.commit()
+            order_changes_committed(db, moved_order_ids, current_user)
+
+        return {
+            "message": "Shipment status updated successfully",
+            "shipment_status_id": target_status.id,
+            "shipment_status": target_status.name,
+            "updated": len(moved_order_ids),
+            "results": results
+        }
+
+    except HTTPException:
+        db.rollback()
+        raise
+
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
 def confirm_pickup(db: Session, docket_no: int,current_user: User):
     try:
          # Fetch order using order_id
@@ -573,31 +834,17 @@ def confirm_pickup(db: Session, docket_no: int,current_user: User):
             raise HTTPException(status_code=404, detail="Order not found")
 
        
-       # Ensure order is in 'Pending Pickup' status
-        pending_pickup_status = db.query(ShipmentStatusModel).filter(
-            ShipmentStatusModel.shipment_status_name.ilike("Pending Pickup"),
-            ShipmentStatusModel.is_deleted == False
-        ).first()
-
-
-        if not pending_pickup_status:
-            raise HTTPException(status_code=404, detail="Shipment status not found")
-
-
-        if order.shipment_status_id != pending_pickup_status.shipment_status_id:
-            raise HTTPException(status_code=400, detail="Order is not in 'Pending Pickup' status")
-
-
-        in_transit_status = db.query(ShipmentStatusModel).filter(
-            ShipmentStatusModel.shipment_status_name.ilike("In Transit"),
-            ShipmentStatusModel.is_deleted == False
-        ).first()
+        in_transit_status = get_reference_by_name(db, SHIPMENT_STATUS, "In Transit")
 
         if not in_transit_status:
             raise HTTPException(status_code=404, detail="In Transit status not found")
+
+        # Ensure the order's status may move to 'In Transit'
+        if order.shipment_status_id == in_transit_status.id or not is_transition_allowed(db, order.shipment_status_id, in_transit_status.id):
+            raise HTTPException(status_code=400, detail="Order cannot be picked up in its current status")
         
         # Update order status to "InTransit"
-        order.shipment_status_id = in_transit_status.shipment_status_id
+        order.shipment_status_id = in_transit_status.id
         order.updated_by = current_user.user_id
 
         new_order_tracking = None
@@ -605,12 +852,13 @@ def confirm_pickup(db: Session, docket_no: int,current_user: User):
         # Create order tracking entry
         new_order_tracking = OrderTrackingModel(
             order_id=order.order_id,
-            # status=in_transit_status.shipment_status_name,
-            created_by=current_user.user_id
+            **tracking_event_values(None, in_transit_status.id, current_user, remark="Pickup confirmed")
         )
         db.add(new_order_tracking)
+        refresh_order_summary(db, [order.order_id])
 
         db.commit()
+        order_changes_committed(db, [order.order_id], current_user)
         db.refresh(order)
         db.refresh(new_order_tracking)
 
@@ -619,12 +867,20 @@ def confirm_pickup(db: Session, docket_no: int,current_user: User):
             "message": "Pickup confirmed and status updated to InTransit",
             "docket_no": docket_no,
             "order_id": order.order_id,
-            "shipment_status": in_transit_status.shipment_status_name,
-            "shipment_status_id": in_transit_status.shipment_status_id,
+            "shipment_status": in_transit_status.name,
+            "shipment_status_id": in_transit_status.id,
             "confirmed_by_user_id": current_user.user_id,
             "order_trackings":GetOrderTrackingSchema.from_orm(new_order_tracking) if new_order_tracking else None
         }
 
+    except HTTPException:
+        db.rollback()
+        raise
+
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=ORDER_CONFLICT_DETAIL)
+
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
@@ -654,10 +910,12 @@ def delete_order(db: Session, order_id: int,current_user: User):
     
     new_order_tracking = OrderTrackingModel(
             order_id=delete_order_data.order_id,
-            created_by=current_user.user_id
+            **tracking_event_values(None, delete_order_data.shipment_status_id, current_user, remark="Order deleted")
         )
     db.add(new_order_tracking)
+    refresh_order_summary(db, [delete_order_data.order_id])
     db.commit()
+    order_changes_committed(db, [order_id], current_user)
     
 
     db.commit()  # Commit the changes
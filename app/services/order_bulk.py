@@ -0,0 +1,287 @@
+import csv
+import io
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.order import OrderModel
+from app.models.order_item import OrderItemModel
+from app.models.order_tracking import OrderTrackingModel
+from app.models.address_book import AddressBookModel
+from app.schemas.order import CreateOrderSchema
+from app.schemas.order_item import CreateOrderItemSchmea
+from app.schemas.address_book import CreateAddressBookSchema
+from app.services.order_summary import refresh_order_summary
+from app.services.order_tracking import tracking_event_values
+from app.services.order_events import publish_order_changes
+from app.services.address_book_dedup import address_fingerprint, find_or_create_address_books
+from app.utils.docket_allocator import allocate_docket_nos
+from app.utils.reference_cache import get_reference_by_id, SERVICE_TYPE, PAYMENT_MODE, PARCEL_TYPE
+from app.utils.status_transitions import INITIAL_SHIPMENT_STATUS_ID
+
+
+MAX_BULK_ORDERS = 20000
+BULK_CHUNK_SIZE = 1000
+
+NESTED_ORDER_FIELDS = ("order_items", "sender_address", "receiver_address", "order_trackings")
+
+# CSV layout: one order per line with the CreateOrderSchema fields as columns,
+# addresses as sender_<field>/receiver_<field> and at most one item as item_<field>
+ORDER_CSV_FIELDS = [field for field in CreateOrderSchema.model_fields if field not in NESTED_ORDER_FIELDS + ("docket_no",)]
+
+# (field, reference table) pairs checked against the reference cache
+REFERENCE_FIELDS = (
+    ("service_type_id", SERVICE_TYPE),
+    ("payment_mode_id", PAYMENT_MODE),
+    ("parcel_type_id", PARCEL_TYPE),
+)
+
+
+def _schema_values(schema, values: dict, prefix: str = "") -> Optional[dict]:
+    """Pick the columns of `schema` from a CSV line, leaving out empty optional ones; None if all are empty."""
+    picked = {field: values.get(prefix + field) for field in schema.model_fields}
+    if all(value is None for value in picked.values()):
+        return None
+    return {
+        field: value for field, value in picked.items()
+        if value is not None or schema.model_fields[field].is_required()
+    }
+
+
+def csv_row_to_payload(row: dict) -> dict:
+    """Turn one CSV line into a CreateOrderSchema payload. Every CSV order gets its first tracking row."""
+    values = {
+        key.strip(): value.strip()
+        for key, value in row.items()
+        if key and isinstance(value, str) and value.strip()
+    }
+
+    payload = {
+        field: values.get(field) for field in ORDER_CSV_FIELDS
+        if values.get(field) is not None or CreateOrderSchema.model_fields[field].is_required()
+    }
+    payload["docket_no"] = None
+    payload["sender_address"] = _schema_values(CreateAddressBookSchema, values, "sender_")
+    payload["receiver_address"] = _schema_values(CreateAddressBookSchema, values, "receiver_")
+    item = _schema_values(CreateOrderItemSchmea, values, "item_")
+    payload["order_items"] = [item] if item else None
+    payload["order_trackings"] = {"is_active": True}
+    return payload
+
+
+def parse_bulk_csv(content: bytes) -> List[dict]:
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="CSV file must be UTF-8 encoded")
+
+    return [csv_row_to_payload(row) for row in csv.DictReader(io.StringIO(text))]
+
+
+def _error_messages(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()]
+
+
+def validate_bulk_orders(db: Session, payloads: List[dict]) -> Tuple[Dict[int, CreateOrderSchema], Dict[int, List[str]]]:
+    """
+    Validate every row before anything is written.
+
+    Besides the schema this checks the reference ids against the reference
+    cache, the customer and address book ids with one query each, and that no
+    manual docket is used twice in the upload or by an existing order, with one
+    more. A duplicate would otherwise fail the INSERT of its whole chunk.
+    Returns the valid orders and the errors, both keyed by row number.
+    """
+    orders = {}
+    errors = {}
+
+    for row_number, payload in enumerate(payloads, start=1):
+        try:
+            orders[row_number] = CreateOrderSchema.model_validate(payload)
+        except ValidationError as e:
+            errors[row_number] = _error_messages(e)
+        except (TypeError, ValueError) as e:
+            errors[row_number] = [str(e)]
+
+    customer_ids = {order.customer_id for order in orders.values() if order.customer_id}
+    known_customers = set(
+        db.execute(select(User.user_id).where(User.user_id.in_(customer_ids))).scalars()
+    ) if customer_ids else set()
+
+    address_book_ids = {
+        address_book_id
+        for order in orders.values()
+        for address_book_id in (order.sender_address_book_id, order.receiver_address_book_id)
+        if address_book_id and address_book_id > 0
+    }
+    known_address_books = set(
+        db.execute(
+            select(AddressBookModel.address_book_id).where(AddressBookModel.address_book_id.in_(address_book_ids))
+        ).scalars()
+    ) if address_book_ids else set()
+
+    # Only orders with is_docket_auto keep their manual docket, see book_chunk
+    manual_dockets = {order.manual_docket for order in orders.values() if order.is_docket_auto and order.manual_docket}
+    taken_manual_dockets = set(
+        db.execute(select(OrderModel.manual_docket).where(OrderModel.manual_docket.in_(manual_dockets))).scalars()
+    ) if manual_dockets else set()
+    manual_docket_rows = {}
+
+    for row_number, order in list(orders.items()):
+        row_errors = []
+        if order.is_docket_auto and order.manual_docket:
+            if order.manual_docket in taken_manual_dockets:
+                row_errors.append(f"manual_docket: {order.manual_docket} is already used by another order")
+            elif order.manual_docket in manual_docket_rows:
+                row_errors.append(f"manual_docket: {order.manual_docket} is also used by row {manual_docket_rows[order.manual_docket]}")
+            else:
+                manual_docket_rows[order.manual_docket] = row_number
+        for field, table in REFERENCE_FIELDS:
+            value = getattr(order, field)
+            if value is not None and get_reference_by_id(db, table, value) is None:
+                row_errors.append(f"{field}: {value} does not exist")
+        if order.customer_id and order.customer_id not in known_customers:
+            row_errors.append(f"customer_id: {order.customer_id} does not exist")
+
+        for side in ("sender", "receiver"):
+            address_book_id = getattr(order, f"{side}_address_book_id")
+            known = address_book_id and address_book_id > 0 and address_book_id in known_address_books
+            if not known and getattr(order, f"{side}_address") is None and address_book_id and address_book_id > 0:
+                row_errors.append(f"{side}_address_book_id: {address_book_id} does not exist")
+
+        if row_errors:
+            errors[row_number] = row_errors
+            del orders[row_number]
+
+    # Known ids are resolved once here so the insert step needs no lookups
+    for order in orders.values():
+        for side in ("sender", "receiver"):
+            if getattr(order, f"{side}_address_book_id") not in known_address_books:
+                setattr(order, f"{side}_address_book_id", None)
+
+    return orders, errors
+
+
+class BulkChunkError(Exception):
+    """A chunk that cannot be written for a reason other than the database refusing it."""
+
+
+def book_chunk(db: Session, chunk: List[Tuple[int, CreateOrderSchema]], docket_nos: List[int], current_user: User) -> List[dict]:
+    """Insert one chunk of validated orders in the caller's transaction and return their results."""
+    new_addresses = [
+        getattr(order, f"{side}_address")
+        for _, order in chunk
+        for side in ("sender", "receiver")
+        if getattr(order, f"{side}_address_book_id") is None and getattr(order, f"{side}_address") is not None
+    ]
+    address_ids = find_or_create_address_books(db, new_addresses, current_user.user_id)
+
+    order_rows = []
+    for (_, order), docket_no in zip(chunk, docket_nos):
+        # Every row carries every schema field, so the orders go in as one executemany
+        order_dict = order.dict(exclude=set(NESTED_ORDER_FIELDS))
+        for side in ("sender", "receiver"):
+            address = getattr(order, f"{side}_address")
+            address_book_id = getattr(order, f"{side}_address_book_id")
+            if address_book_id is None and address is not None:
+                address_book_id = address_ids.get(address_fingerprint(address.dict()))
+                if address_book_id is None:
+                    raise BulkChunkError(f"{side}_address could not be stored")
+            order_dict[f"{side}_address_book_id"] = address_book_id
+        order_dict["created_by"] = current_user.user_id
+        order_dict["docket_no"] = docket_no
+        order_dict["shipment_status_id"] = INITIAL_SHIPMENT_STATUS_ID
+        order_dict["manual_docket"] = order.manual_docket if order.is_docket_auto else None
+        order_rows.append(order_dict)
+
+    db.execute(insert(OrderModel), order_rows)
+
+    order_ids = dict(
+        db.execute(select(OrderModel.docket_no, OrderModel.order_id).where(OrderModel.docket_no.in_(docket_nos))).all()
+    )
+
+    item_rows = []
+    tracking_rows = []
+    for (_, order), docket_no in zip(chunk, docket_nos):
+        order_id = order_ids[docket_no]
+        for item in order.order_items or []:
+            item_rows.append(dict(item.dict(), created_by=current_user.user_id, order_id=order_id))
+        if order.order_trackings:
+            tracking_rows.append(dict(tracking_event_values(order.order_trackings, INITIAL_SHIPMENT_STATUS_ID, current_user), order_id=order_id))
+
+    if item_rows:
+        db.execute(insert(OrderItemModel), item_rows)
+    if tracking_rows:
+        db.execute(insert(OrderTrackingModel), tracking_rows)
+
+    refresh_order_summary(db, order_ids.values())
+
+    return [
+        {"row": row_number, "order_id": order_ids[docket_no], "docket_no": docket_no}
+        for (row_number, _), docket_no in zip(chunk, docket_nos)
+    ]
+
+
+def bulk_create_orders(db: Session, payloads: List[dict], current_user: User):
+    """
+    Book many orders at once.
+
+    All rows are validated first. The valid ones get their dockets from one
+    reserved block and are written in chunks of BULK_CHUNK_SIZE, each chunk in
+    its own transaction with multi-row INSERTs for addresses, orders, items and
+    tracking rows. Addresses resolve to stored copies by fingerprint. A chunk that
+    fails is rolled back and reported without stopping the others.
+    """
+    if not isinstance(payloads, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array of orders or a CSV file")
+    if not payloads:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No orders to create")
+    if len(payloads) > MAX_BULK_ORDERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BULK_ORDERS} orders can be created at once"
+        )
+
+    orders, errors = validate_bulk_orders(db, payloads)
+    results = [{"row": row_number, "errors": row_errors} for row_number, row_errors in errors.items()]
+
+    valid = sorted(orders.items())
+    if valid:
+        try:
+            docket_nos = allocate_docket_nos(db, len(valid), current_user.branch_id)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+        for start in range(0, len(valid), BULK_CHUNK_SIZE):
+            chunk = valid[start:start + BULK_CHUNK_SIZE]
+            try:
+                chunk_results = book_chunk(db, chunk, docket_nos[start:start + BULK_CHUNK_SIZE], current_user)
+                db.commit()
+                results.extend(chunk_results)
+                publish_order_changes(db, [result["order_id"] for result in chunk_results], current_user)
+            except BulkChunkError as e:
+                db.rollback()
+                results.extend({"row": row_number, "errors": [f"Error creating order: {e}"]} for row_number, _ in chunk)
+            except SQLAlchemyError:
+                # The statement text would leak the schema; the rows can be sent again
+                db.rollback()
+                results.extend(
+                    {"row": row_number, "errors": ["Error creating order: the database refused this chunk, nothing in it was saved"]}
+                    for row_number, _ in chunk
+                )
+
+    results.sort(key=lambda result: result["row"])
+    created = sum(1 for result in results if "order_id" in result)
+
+    return {
+        "message": "Orders created successfully" if created == len(payloads) else "Orders created with errors",
+        "total": len(payloads),
+        "created": created,
+        "failed": len(payloads) - created,
+        "results": results
+    }
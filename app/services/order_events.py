@@ -0,0 +1,67 @@
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.order import OrderModel
+from app.services.public_tracking import refresh_tracking_cache
+from app.utils.reference_cache import get_reference_name, SHIPMENT_STATUS
+from app.utils.tracking_hub import has_subscribers, publish
+
+
+def publish_order_changes(db: Session, order_ids: Iterable[int], current_user: Optional[User] = None):
+    """
+    Push the current state of `order_ids` to the subscribers of the tracking hub.
+
+    One query reads the orders, and only when someone is subscribed. The event
+    carries the branch of `current_user`, where the change was made. Deleted
+    orders are published with "deleted": true so dashboards can drop them.
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    if not order_ids or not has_subscribers():
+        return
+
+    try:
+        branch_id = current_user.branch_id if current_user is not None else None
+        rows = db.execute(
+            select(
+                OrderModel.order_id,
+                OrderModel.docket_no,
+                OrderModel.manual_docket,
+                OrderModel.shipment_status_id,
+                OrderModel.driver_id,
+                OrderModel.version,
+                OrderModel.is_deleted,
+            ).where(OrderModel.order_id.in_(order_ids))
+        ).all()
+    except SQLAlchemyError:
+        # The change is committed either way; subscribers see it with the next one
+        return
+
+    changed_at = datetime.utcnow().isoformat()
+    publish(
+        {
+            "type": "order.changed",
+            "order_id": row.order_id,
+            "docket_no": row.docket_no,
+            "manual_docket": row.manual_docket,
+            "shipment_status_id": row.shipment_status_id,
+            "shipment_status": get_reference_name(db, SHIPMENT_STATUS, row.shipment_status_id),
+            "driver_id": row.driver_id,
+            "branch_id": branch_id,
+            "version": row.version,
+            "deleted": bool(row.is_deleted),
+            "changed_at": changed_at,
+        }
+        for row in rows
+    )
+
+
+def order_changes_committed(db: Session, order_ids: Iterable[int], current_user: Optional[User] = None):
+    """Tell the public tracking cache and the live subscribers about committed changes to `order_ids`."""
+    order_ids = list(order_ids)
+    refresh_tracking_cache(db, order_ids)
+    publish_order_changes(db, order_ids, current_user)
@@ -0,0 +1,192 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased
+
+from app.db.session import SessionLocal
+from app.models.user import User
+from app.models.order import OrderModel
+from app.models.order_item import OrderItemModel
+from app.models.service_type import ServiceType
+from app.models.payment_mode import PaymentMode
+from app.models.address_book import AddressBookModel
+from app.models.parcel_type import ParcelType
+from app.models.shipment_status import ShipmentStatusModel
+from app.models.drivers import DriverModel
+from app.models.vehicle import VehicleModel
+
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    "order_id",
+    "docket_no",
+    "manual_docket",
+    "display_docket",
+    "created_at",
+    "customer_name",
+    "service_type_name",
+    "payment_mode_name",
+    "payment_type",
+    "cod_amount",
+    "parcel_type_name",
+    "shipment_status_name",
+    "driver_name",
+    "vehicle_name",
+    "sender_company_name",
+    "sender_phone_number",
+    "sender_pincode",
+    "receiver_company_name",
+    "receiver_phone_number",
+    "receiver_pincode",
+    "total_no_of_box",
+    "parcel_weight",
+    "total_volume",
+    "shipment_value",
+    "invoice_no",
+    "e_way_bill",
+    "item_count",
+    "item_box_count",
+]
+
+
+def build_export_statement(from_date: Optional[datetime] = None, to_date: Optional[datetime] = None):
+    """
+    Column-only select for the export.
+
+    No ORM entities are built, so nothing accumulates in a session identity map
+    while the rows stream through.
+    """
+    sender = aliased(AddressBookModel)
+    receiver = aliased(AddressBookModel)
+
+    stmt = (
+        select(
+            OrderModel.order_id,
+            OrderModel.docket_no,
+            OrderModel.manual_docket,
+            OrderModel.is_docket_auto,
+            OrderModel.created_at,
+            User.first_name.label("customer_name"),
+            ServiceType.name.label("service_type_name"),
+            PaymentMode.payment_name.label("payment_mode_name"),
+            OrderModel.payment_type,
+            OrderModel.cod_amount,
+            ParcelType.parcel_name.label("parcel_type_name"),
+            ShipmentStatusModel.shipment_status_name.label("shipment_status_name"),
+            DriverModel.name.label("driver_name"),
+            VehicleModel.name.label("vehicle_name"),
+            sender.company_name.label("sender_company_name"),
+            sender.phone_number.label("sender_phone_number"),
+            sender.pincode.label("sender_pincode"),
+            receiver.company_name.label("receiver_company_name"),
+            receiver.phone_number.label("receiver_phone_number"),
+            receiver.pincode.label("receiver_pincode"),
+            OrderModel.total_no_of_box,
+            OrderModel.parcel_weight,
+            OrderModel.total_volume,
+            OrderModel.shipment_value,
+            OrderModel.invoice_no,
+            OrderModel.e_way_bill,
+        )
+        .outerjoin(User, User.user_id == OrderModel.customer_id)
+        .outerjoin(ServiceType, ServiceType.service_id == OrderModel.service_type_id)
+        .outerjoin(PaymentMode, PaymentMode.payment_id == OrderModel.payment_mode_id)
+        .outerjoin(ParcelType, ParcelType.parcel_id == OrderModel.parcel_type_id)
+        .outerjoin(ShipmentStatusModel, ShipmentStatusModel.shipment_status_id == OrderModel.shipment_status_id)
+        .outerjoin(DriverModel, DriverModel.driver_id == OrderModel.driver_id)
+        .outerjoin(VehicleModel, VehicleModel.id == OrderModel.vehicle_id)
+        .outerjoin(sender, sender.address_book_id == OrderModel.sender_address_book_id)
+        .outerjoin(receiver, receiver.address_book_id == OrderModel.receiver_address_book_id)
+        .where(OrderModel.is_deleted == False)
+    )
+
+    if from_date:
+        stmt = stmt.where(OrderModel.created_at >= from_date)
+    if to_date:
+        stmt = stmt.where(OrderModel.created_at < to_date)
+
+    return stmt.order_by(OrderModel.created_at, OrderModel.order_id)
+
+
+def get_item_totals(db: Session, order_ids: List[int]) -> dict:
+    """Item count and box count per order for one chunk, in a single grouped query."""
+    totals = defaultdict(lambda: (0, 0))
+
+    rows = (
+        db.query(
+            OrderItemModel.order_id,
+            func.count(OrderItemModel.order_item_id),
+            func.coalesce(func.sum(OrderItemModel.number_of_box), 0),
+        )
+        .filter(OrderItemModel.order_id.in_(order_ids), OrderItemModel.is_deleted == False)
+        .group_by(OrderItemModel.order_id)
+        .all()
+    )
+    for order_id, item_count, box_count in rows:
+        totals[order_id] = (item_count, int(box_count))
+
+    return totals
+
+
+def export_row(row, totals) -> dict:
+    data = dict(row._mapping)
+    is_docket_auto = data.pop("is_docket_auto")
+    data["display_docket"] = data["manual_docket"] if is_docket_auto else data["docket_no"]
+    data["payment_type"] = data["payment_type"].value if data["payment_type"] else None
+    data["created_at"] = data["created_at"].isoformat() if data["created_at"] else None
+    data["item_count"], data["item_box_count"] = totals[data["order_id"]]
+    return {column: data[column] for column in EXPORT_COLUMNS}
+
+
+def iter_export_chunks(from_date: Optional[datetime] = None, to_date: Optional[datetime] = None) -> Iterator[List[dict]]:
+    """
+    Yield export rows in chunks of EXPORT_CHUNK_SIZE.
+
+    Orders are read through a server-side cursor on a dedicated connection, so
+    memory stays bounded by one chunk whatever the date range. Item totals are
+    resolved per chunk from a second session, because an unbuffered MySQL cursor
+    blocks its own connection until it is drained.
+    """
+    lookup_db = SessionLocal()
+    stream_db = SessionLocal()
+
+    try:
+        result = stream_db.execute(
+            build_export_statement(from_date, to_date).execution_options(
+                stream_results=True, yield_per=EXPORT_CHUNK_SIZE
+            )
+        )
+        for chunk in result.partitions():
+            totals = get_item_totals(lookup_db, [row.order_id for row in chunk])
+            yield [export_row(row, totals) for row in chunk]
+            lookup_db.expunge_all()
+    finally:
+        stream_db.close()
+        lookup_db.close()
+
+
+def stream_orders_csv(from_date: Optional[datetime] = None, to_date: Optional[datetime] = None) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+
+    for chunk in iter_export_chunks(from_date, to_date):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_orders_ndjson(from_date: Optional[datetime] = None, to_date: Optional[datetime] = None) -> Iterator[str]:
+    for chunk in iter_export_chunks(from_date, to_date):
+        yield "".join(json.dumps(row, default=str) + "\n" for row in chunk)
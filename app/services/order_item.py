@@ -5,6 +5,7 @@ from fastapi import HTTPException,status
 from app.models.user import User
 from app.models.order_item import OrderItemModel #,DimentionTypeEnum
 from app.schemas.order_item import CreateOrderItemSchmea, UpdateOrderItemSchema
+from app.utils.user_names import attach_user_names
 
 
 
@@ -42,9 +43,7 @@ def get_order_item_by_id(db: Session, order_item_id: int, current_user: User):
             detail="Order item not found"
         )
     
-    user_dict = {user.user_id: user.first_name for user in db.query(User).all()}
-    get_orderItem.created_by_name = user_dict.get(get_orderItem.created_by, 'Unknown')
-    get_orderItem.updated_by_name = user_dict.get(get_orderItem.updated_by, 'Unknown')
+    attach_user_names(db, [get_orderItem], default='Unknown')
 
 
     return {
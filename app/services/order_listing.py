@@ -0,0 +1,425 @@
+import base64
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, false, func, or_, select, union
+from sqlalchemy.orm import Session, aliased, contains_eager
+
+from app.models.order import OrderModel
+from app.models.order_summary import OrderSummaryModel
+from app.models.order_item import OrderItemModel
+from app.models.order_tracking import OrderTrackingModel
+from app.models.address_book import AddressBookModel
+from app.schemas.order import ORDER_LIST_ADAPTER
+from app.services.tracking_archive import ARCHIVED_EVENT_FIELDS, load_archived_events
+from app.utils.reference_cache import get_reference_by_name, SHIPMENT_STATUS
+from app.utils.user_names import resolve_user_names
+
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 500
+
+ORDER_INCLUDES = ("items", "sender_address", "receiver_address", "tracking")
+
+# Display names served from the order_summary read model
+SUMMARY_FIELDS = (
+    "customer_name",
+    "service_type_name",
+    "payment_mode_name",
+    "parcel_type_name",
+    "shipment_status_name",
+    "driver_name",
+    "vehicle_name",
+    "sender_company_name",
+    "receiver_company_name",
+)
+
+ORDER_FIELDS = {column.key: getattr(OrderModel, column.key) for column in OrderModel.__table__.columns}
+
+# Derived fields and the order columns they are computed from
+COMPUTED_FIELDS = {
+    "display_docket": ("docket_no", "manual_docket", "is_docket_auto"),
+    "created_by_name": ("created_by",),
+    "updated_by_name": ("updated_by",),
+}
+
+SELECTABLE_FIELDS = set(ORDER_FIELDS) | set(SUMMARY_FIELDS) | set(COMPUTED_FIELDS)
+
+
+def parse_order_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Split a `fields=` parameter, raising ValueError on unknown names. None means every field."""
+    if not fields:
+        return None
+
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in SELECTABLE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    return requested
+
+
+def parse_order_includes(include: Optional[str]) -> Optional[Set[str]]:
+    """Split an `include=` parameter, raising ValueError on unknown relations. None means not given."""
+    if include is None:
+        return None
+
+    requested = {name.strip() for name in include.split(",") if name.strip()}
+    unknown = requested - set(ORDER_INCLUDES)
+    if unknown:
+        raise ValueError(f"Unknown include: {', '.join(sorted(unknown))}")
+
+    return requested
+
+
+def build_order_list_query(db: Session, columns=None, eager_addresses: Set[str] = frozenset()):
+    """
+    Base query for order listings.
+
+    With `columns` left out the query yields full OrderModel rows plus their
+    display names; otherwise it selects only `columns`. Display names come from
+    the order_summary read model through a single outer join. Addresses are only
+    joined for `eager_addresses`, which loads them into the orders from the same
+    statement, so the row count never changes the number of round trips.
+    """
+    sender = aliased(AddressBookModel)
+    receiver = aliased(AddressBookModel)
+
+    if columns is None:
+        columns = [OrderModel] + [getattr(OrderSummaryModel, field) for field in SUMMARY_FIELDS]
+
+    query = (
+        db.query(*columns)
+        .select_from(OrderModel)
+        .outerjoin(OrderSummaryModel, OrderSummaryModel.order_id == OrderModel.order_id)
+        .filter(OrderModel.is_deleted == False)
+    )
+
+    if eager_addresses:
+        query = (
+            query.outerjoin(sender, sender.address_book_id == OrderModel.sender_address_book_id)
+            .outerjoin(receiver, receiver.address_book_id == OrderModel.receiver_address_book_id)
+        )
+
+    options = []
+    if "sender_address" in eager_addresses:
+        options.append(contains_eager(OrderModel.sender_address.of_type(sender)))
+    if "receiver_address" in eager_addresses:
+        options.append(contains_eager(OrderModel.receiver_address.of_type(receiver)))
+    if options:
+        query = query.options(*options)
+
+    return query, sender, receiver
+
+
+def pincode_order_ids(pincodes: List[str]):
+    """
+    Ids of orders shipping from or to any of `pincodes`.
+
+    Two lookups, each driven by the address_book.pincode index and the matching
+    order FK index, combined with UNION. An OR join across both FK columns cannot
+    use either index, and UNION also drops the duplicate row of an order whose
+    sender and receiver share a pincode.
+    """
+    by_sender = (
+        select(OrderModel.order_id)
+        .join(AddressBookModel, AddressBookModel.address_book_id == OrderModel.sender_address_book_id)
+        .where(AddressBookModel.pincode.in_(pincodes))
+    )
+    by_receiver = (
+        select(OrderModel.order_id)
+        .join(AddressBookModel, AddressBookModel.address_book_id == OrderModel.receiver_address_book_id)
+        .where(AddressBookModel.pincode.in_(pincodes))
+    )
+
+    return union(by_sender, by_receiver).subquery("pincode_orders")
+
+
+def format_display_docket(is_docket_auto, manual_docket, docket_no) -> Optional[str]:
+    display_docket = manual_docket if is_docket_auto else docket_no
+    return str(display_docket) if display_docket is not None else None
+
+
+def attach_order_rows(rows) -> List[OrderModel]:
+    """Copy the joined display names onto their orders and return the orders."""
+    orders = []
+
+    for row in rows:
+        order = row.OrderModel
+        for field in SUMMARY_FIELDS:
+            setattr(order, field, getattr(row, field))
+        order.display_docket = format_display_docket(order.is_docket_auto, order.manual_docket, order.docket_no)
+        orders.append(order)
+
+    return orders
+
+
+def load_order_items(db: Session, order_ids: List[int]) -> Dict[int, List[OrderItemModel]]:
+    """Items of every order in `order_ids`, from a single IN query."""
+    items_by_order = defaultdict(list)
+
+    if order_ids:
+        for item in db.query(OrderItemModel).filter(OrderItemModel.order_id.in_(order_ids), OrderItemModel.is_deleted == False).all():
+            items_by_order[item.order_id].append(item)
+
+    return items_by_order
+
+
+def load_first_trackings(db: Session, order_ids: List[int]) -> Dict[int, OrderTrackingModel]:
+    """
+    First tracking row of every order in `order_ids`, from a single query.
+
+    Orders whose events were archived get their first archived event instead,
+    as an unsaved row, from one more query.
+    """
+    if not order_ids:
+        return {}
+
+    first_tracking = (
+        db.query(func.min(OrderTrackingModel.order_tracking_id).label("order_tracking_id"))
+        .filter(OrderTrackingModel.order_id.in_(order_ids))
+        .group_by(OrderTrackingModel.order_id)
+        .subquery()
+    )
+    trackings = (
+        db.query(OrderTrackingModel)
+        .join(first_tracking, first_tracking.c.order_tracking_id == OrderTrackingModel.order_tracking_id)
+        .all()
+    )
+
+    first_trackings = {tracking.order_id: tracking for tracking in trackings}
+
+    archived = load_archived_events(db, [order_id for order_id in order_ids if order_id not in first_trackings])
+    for order_id, events in archived.items():
+        if events:
+            first = min(events, key=lambda event: event["order_tracking_id"])
+            first_trackings[order_id] = OrderTrackingModel(
+                order_id=order_id,
+                is_active=True,
+                is_deleted=False,
+                **{field: first[field] for field in ARCHIVED_EVENT_FIELDS},
+            )
+
+    return first_trackings
+
+
+def load_addresses(db: Session, address_book_ids: List[int]) -> Dict[int, AddressBookModel]:
+    """Address book rows by id, from a single IN query."""
+    address_book_ids = {address_book_id for address_book_id in address_book_ids if address_book_id}
+    if not address_book_ids:
+        return {}
+
+    addresses = db.query(AddressBookModel).filter(AddressBookModel.address_book_id.in_(address_book_ids)).all()
+    return {address.address_book_id: address for address in addresses}
+
+
+def attach_order_items(db: Session, orders: List[OrderModel]):
+    """Load the items of every order with a single IN query."""
+    items_by_order = load_order_items(db, [order.order_id for order in orders])
+
+    for order in orders:
+        order.order_items = items_by_order.get(order.order_id, [])
+
+
+def attach_first_trackings(db: Session, orders: List[OrderModel]):
+    """Load the first tracking row of every order with a single query."""
+    trackings_by_order = load_first_trackings(db, [order.order_id for order in orders])
+
+    for order in orders:
+        order.order_trackings = trackings_by_order.get(order.order_id)
+
+
+def encode_order_cursor(order) -> str:
+    """Opaque cursor pointing just past `order` in the (created_at, order_id) sort."""
+    raw = f"{order.created_at.isoformat()}|{order.order_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_order_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor from `encode_order_cursor`, raising ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, order_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(order_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def apply_order_keyset(query, limit: int, after: Optional[Tuple[datetime, int]] = None):
+    """
+    Order newest first on (created_at, order_id) and seek past `after`.
+
+    Seeking instead of OFFSET keeps every page as cheap as the first one, as long
+    as the composite indexes on the order table cover the sort. One extra row is
+    fetched so the caller can tell whether another page exists.
+    """
+    if after:
+        created_at, order_id = after
+        query = query.filter(
+            or_(
+                OrderModel.created_at < created_at,
+                and_(OrderModel.created_at == created_at, OrderModel.order_id < order_id),
+            )
+        )
+
+    return query.order_by(OrderModel.created_at.desc(), OrderModel.order_id.desc()).limit(limit + 1)
+
+
+def projected_columns(fields: List[str]):
+    """Column list for a `fields=` projection, always carrying the keyset columns."""
+    names = ["order_id", "created_at"]
+    for field in fields:
+        names.extend(COMPUTED_FIELDS.get(field, (field,)))
+
+    columns = []
+    for name in dict.fromkeys(names):
+        if name in ORDER_FIELDS:
+            columns.append(ORDER_FIELDS[name])
+        elif name in SUMMARY_FIELDS:
+            columns.append(getattr(OrderSummaryModel, name))
+
+    return columns
+
+
+def build_projected_rows(db: Session, rows, fields: List[str]) -> List[dict]:
+    """Turn narrow rows into response dicts holding exactly `fields` plus order_id."""
+    user_names = {}
+    if "created_by_name" in fields or "updated_by_name" in fields:
+        user_names = resolve_user_names(
+            db, [getattr(row, "created_by", None) for row in rows] + [getattr(row, "updated_by", None) for row in rows]
+        )
+
+    orders = []
+    for row in rows:
+        values = row._mapping
+        order = {"order_id": values["order_id"]}
+        for field in fields:
+            if field == "display_docket":
+                order[field] = format_display_docket(values["is_docket_auto"], values["manual_docket"], values["docket_no"])
+            elif field in ("created_by_name", "updated_by_name"):
+                order[field] = user_names.get(values[COMPUTED_FIELDS[field][0]])
+            else:
+                order[field] = values[field]
+        orders.append(order)
+
+    return orders
+
+
+def attach_projected_relations(db: Session, orders: List[dict], rows, include: Set[str]):
+    """Load only the requested relations of projected orders, one query per relation."""
+    order_ids = [order["order_id"] for order in orders]
+
+    if "items" in include:
+        items_by_order = load_order_items(db, order_ids)
+        for order in orders:
+            order["order_items"] = items_by_order.get(order["order_id"], [])
+
+    if "tracking" in include:
+        trackings_by_order = load_first_trackings(db, order_ids)
+        for order in orders:
+            order["order_trackings"] = trackings_by_order.get(order["order_id"])
+
+    address_fields = [name for name in ("sender_address", "receiver_address") if name in include]
+    if address_fields:
+        addresses = load_addresses(
+            db, [getattr(row, f"{name}_book_id") for row in rows for name in address_fields]
+        )
+        for order, row in zip(orders, rows):
+            for name in address_fields:
+                order[name] = addresses.get(getattr(row, f"{name}_book_id"))
+
+
+def list_orders(
+    db: Session,
+    shipment_status_name: str = None,
+    docket_no: int = None,
+    pincodes: Optional[List[str]] = None,
+    limit: int = DEFAULT_PAGE_LIMIT,
+    after: Optional[Tuple[datetime, int]] = None,
+    fields: Optional[List[str]] = None,
+    include: Optional[Set[str]] = None,
+    order_id: Optional[int] = None,
+) -> Tuple[list, Optional[str]]:
+    """
+    Fetch one page of orders.
+
+    Without `fields` every order field is returned as an OrderModel; with it, only
+    those columns are selected and each order is a plain dict. `include` picks the
+    relations to load and defaults to all of them when neither parameter is given.
+    Every relation costs one extra statement regardless of the page size.
+    Returns the page and the cursor of the next page, or None on the last page.
+    """
+    if include is None:
+        include = set(ORDER_INCLUDES) if fields is None else set()
+
+    if fields is None:
+        eager_addresses = {name for name in ("sender_address", "receiver_address") if name in include}
+        query, sender, receiver = build_order_list_query(db, eager_addresses=eager_addresses)
+    else:
+        columns = projected_columns(fields)
+        address_fields = [name for name in ("sender_address", "receiver_address") if name in include]
+        columns += [ORDER_FIELDS[f"{name}_book_id"] for name in address_fields]
+        query, sender, receiver = build_order_list_query(db, columns=columns)
+
+    if order_id:
+        query = query.filter(OrderModel.order_id == order_id)
+
+    if shipment_status_name:
+        # By the id on order, so the filter neither depends on the name copied into
+        # order_summary nor drops orders whose summary is not built yet
+        shipment_status = get_reference_by_name(db, SHIPMENT_STATUS, shipment_status_name)
+        query = query.filter(OrderModel.shipment_status_id == shipment_status.id if shipment_status else false())
+
+    if docket_no:
+        query = query.filter(OrderModel.docket_no == docket_no)
+
+    if pincodes:
+        matched = pincode_order_ids(pincodes)
+        query = query.join(matched, matched.c.order_id == OrderModel.order_id)
+
+    rows = apply_order_keyset(query, limit, after).all()
+    next_cursor = None
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_order_cursor(rows[-1].OrderModel if fields is None else rows[-1])
+
+    if fields is None:
+        orders = attach_order_rows(rows)
+        if "items" in include:
+            attach_order_items(db, orders)
+        if "tracking" in include:
+            attach_first_trackings(db, orders)
+    else:
+        orders = build_projected_rows(db, rows, fields)
+        attach_projected_relations(db, orders, rows, include)
+
+    return orders, next_cursor
+
+
+def loaded_values(value):
+    """
+    Plain dicts of the attributes already loaded on ORM objects, recursing into lists.
+
+    Reading vars() instead of attributes never lazy-loads a relationship and is
+    much cheaper than validating ORM objects with from_attributes.
+    """
+    if isinstance(value, list):
+        return [loaded_values(item) for item in value]
+    if isinstance(value, dict):
+        return {key: loaded_values(item) for key, item in value.items()}
+    if hasattr(value, "_sa_instance_state"):
+        return {key: loaded_values(item) for key, item in vars(value).items() if not key.startswith("_sa_")}
+    return value
+
+
+def serialize_orders(orders: list) -> List[dict]:
+    """
+    Turn orders from `list_orders` into plain dicts through the precompiled GetOrderSchema adapter.
+
+    Fields an order does not carry, such as columns left out by `fields`, stay out
+    of the output. Datetimes and enums are left for orjson to render.
+    """
+    models = ORDER_LIST_ADAPTER.validate_python(loaded_values(orders))
+    return ORDER_LIST_ADAPTER.dump_python(models, exclude_unset=True)
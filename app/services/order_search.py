@@ -0,0 +1,75 @@
+import re
+from typing import List
+
+from sqlalchemy import and_, literal, select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session
+
+from app.models.order_summary import OrderSummaryModel
+
+
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+
+# Matches the default ngram_token_size; shorter terms never hit the index
+MIN_SEARCH_TERM_LENGTH = 2
+
+# Characters with a meaning in FULLTEXT boolean mode, treated as separators
+_TERM_SEPARATORS = re.compile(r'[\s"+\-<>()~*@]+')
+
+SEARCH_RESULT_COLUMNS = (
+    OrderSummaryModel.order_id,
+    OrderSummaryModel.display_docket,
+    OrderSummaryModel.docket_no,
+    OrderSummaryModel.manual_docket,
+    OrderSummaryModel.customer_name,
+    OrderSummaryModel.sender_company_name,
+    OrderSummaryModel.receiver_company_name,
+    OrderSummaryModel.sender_pincode,
+    OrderSummaryModel.receiver_pincode,
+    OrderSummaryModel.shipment_status_name,
+    OrderSummaryModel.created_at,
+)
+
+
+def parse_search_terms(q: str) -> List[str]:
+    """Split a search string into terms, raising ValueError when nothing searchable is left."""
+    terms = [term for term in _TERM_SEPARATORS.split(q or "") if len(term) >= MIN_SEARCH_TERM_LENGTH]
+    if not terms:
+        raise ValueError(f"q must contain at least one term of {MIN_SEARCH_TERM_LENGTH} or more characters")
+    return terms
+
+
+def search_orders(db: Session, terms: List[str], page: int = 1, page_size: int = DEFAULT_SEARCH_PAGE_SIZE):
+    """
+    Find orders whose dockets, invoice, e-way bill, phone numbers or party names contain every term.
+
+    On MySQL the terms are matched against the ngram FULLTEXT index of
+    order_summary.search_text and hits are ranked by relevance. Other databases
+    fall back to substring matching, newest first. Returns (hits, has_more).
+    """
+    if db.get_bind().dialect.name == "mysql":
+        # Quoted terms are ngram phrase searches, so partial dockets and numbers match
+        score = match(
+            OrderSummaryModel.search_text,
+            against=" ".join(f'+"{term}"' for term in terms),
+        ).in_boolean_mode()
+        statement = (
+            select(*SEARCH_RESULT_COLUMNS, score.label("score"))
+            .where(score)
+            .order_by(score.desc(), OrderSummaryModel.order_id.desc())
+        )
+    else:
+        statement = (
+            select(*SEARCH_RESULT_COLUMNS, literal(None).label("score"))
+            .where(and_(*(OrderSummaryModel.search_text.contains(term, autoescape=True) for term in terms)))
+            .order_by(OrderSummaryModel.created_at.desc(), OrderSummaryModel.order_id.desc())
+        )
+
+    rows = db.execute(
+        statement.where(OrderSummaryModel.is_deleted == False)
+        .offset((page - 1) * page_size)
+        .limit(page_size + 1)
+    ).all()
+
+    return [dict(row._mapping) for row in rows[:page_size]], len(rows) > page_size
@@ -0,0 +1,232 @@
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import delete, exists, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+
+from app.models.user import User
+from app.models.order import OrderModel
+from app.models.order_summary import OrderSummaryModel
+from app.models.service_type import ServiceType
+from app.models.payment_mode import PaymentMode
+from app.models.address_book import AddressBookModel
+from app.models.parcel_type import ParcelType
+from app.models.shipment_status import ShipmentStatusModel
+from app.models.drivers import DriverModel
+from app.models.vehicle import VehicleModel
+
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def build_summary_statement():
+    """Select the order_summary columns for orders, joined from their source tables."""
+    sender = aliased(AddressBookModel)
+    receiver = aliased(AddressBookModel)
+
+    return (
+        select(
+            OrderModel.order_id,
+            OrderModel.docket_no,
+            OrderModel.manual_docket,
+            OrderModel.is_docket_auto,
+            OrderModel.customer_id,
+            User.first_name.label("customer_name"),
+            sender.company_name.label("sender_company_name"),
+            receiver.company_name.label("receiver_company_name"),
+            sender.pincode.label("sender_pincode"),
+            receiver.pincode.label("receiver_pincode"),
+            ServiceType.name.label("service_type_name"),
+            PaymentMode.payment_name.label("payment_mode_name"),
+            ParcelType.parcel_name.label("parcel_type_name"),
+            OrderModel.shipment_status_id,
+            ShipmentStatusModel.shipment_status_name.label("shipment_status_name"),
+            OrderModel.driver_id,
+            DriverModel.name.label("driver_name"),
+            OrderModel.vehicle_id,
+            VehicleModel.name.label("vehicle_name"),
+            OrderModel.is_deleted,
+            OrderModel.created_at,
+            # Only feed search_text, see summary_values
+            OrderModel.invoice_no,
+            OrderModel.e_way_bill,
+            sender.phone_number.label("sender_phone_number"),
+            receiver.phone_number.label("receiver_phone_number"),
+        )
+        .outerjoin(User, User.user_id == OrderModel.customer_id)
+        .outerjoin(ServiceType, ServiceType.service_id == OrderModel.service_type_id)
+        .outerjoin(PaymentMode, PaymentMode.payment_id == OrderModel.payment_mode_id)
+        .outerjoin(ParcelType, ParcelType.parcel_id == OrderModel.parcel_type_id)
+        .outerjoin(ShipmentStatusModel, ShipmentStatusModel.shipment_status_id == OrderModel.shipment_status_id)
+        .outerjoin(DriverModel, DriverModel.driver_id == OrderModel.driver_id)
+        .outerjoin(VehicleModel, VehicleModel.id == OrderModel.vehicle_id)
+        .outerjoin(sender, sender.address_book_id == OrderModel.sender_address_book_id)
+        .outerjoin(receiver, receiver.address_book_id == OrderModel.receiver_address_book_id)
+    )
+
+
+SEARCH_ONLY_FIELDS = ("invoice_no", "e_way_bill", "sender_phone_number", "receiver_phone_number")
+
+SEARCH_TEXT_FIELDS = (
+    "docket_no",
+    "manual_docket",
+    "invoice_no",
+    "e_way_bill",
+    "sender_phone_number",
+    "receiver_phone_number",
+    "sender_company_name",
+    "receiver_company_name",
+    "customer_name",
+)
+
+
+def build_search_text(values: dict) -> str:
+    """Join the searchable fields of a summary row into the text behind the FULLTEXT index."""
+    return " ".join(str(values[field]) for field in SEARCH_TEXT_FIELDS if values.get(field) not in (None, ""))
+
+
+def summary_values(row) -> dict:
+    values = dict(row._mapping)
+    is_docket_auto = values.pop("is_docket_auto")
+    display_docket = values["manual_docket"] if is_docket_auto else values["docket_no"]
+    values["display_docket"] = str(display_docket) if display_docket is not None else None
+    values["search_text"] = build_search_text(values)
+    for field in SEARCH_ONLY_FIELDS:
+        values.pop(field)
+    values["updated_at"] = datetime.utcnow()
+    return values
+
+
+# Display name columns of order_summary and the order column pointing at the row they come from
+SUMMARY_NAME_SOURCES = {
+    "customer_name": OrderModel.customer_id,
+    "service_type_name": OrderModel.service_type_id,
+    "payment_mode_name": OrderModel.payment_mode_id,
+    "parcel_type_name": OrderModel.parcel_type_id,
+    "shipment_status_name": OrderModel.shipment_status_id,
+    "driver_name": OrderModel.driver_id,
+    "vehicle_name": OrderModel.vehicle_id,
+}
+
+
+def write_summary_rows(db: Session, rows: list):
+    """Update the summary rows that exist and insert the others, one executemany each."""
+    existing_ids = set(
+        db.execute(
+            select(OrderSummaryModel.order_id).where(OrderSummaryModel.order_id.in_([values["order_id"] for values in rows]))
+        ).scalars()
+    ) if rows else set()
+
+    updates = [values for values in rows if values["order_id"] in existing_ids]
+    inserts = [values for values in rows if values["order_id"] not in existing_ids]
+
+    if updates:
+        db.execute(update(OrderSummaryModel), updates)
+    if inserts:
+        db.execute(insert(OrderSummaryModel), inserts)
+
+
+def refresh_order_summary(db: Session, order_ids: Iterable[int]):
+    """
+    Recompute the order_summary rows of `order_ids` inside the caller's transaction.
+
+    Pending changes are flushed first so the projection sees them. The caller
+    commits; a rollback discards the summary change together with the order change.
+    """
+    order_ids = [order_id for order_id in set(order_ids) if order_id]
+    if not order_ids:
+        return
+
+    db.flush()
+
+    rows = [summary_values(row) for row in db.execute(build_summary_statement().where(OrderModel.order_id.in_(order_ids)))]
+    write_summary_rows(db, rows)
+
+
+def refresh_summaries_for_address_book(db: Session, address_book_id: int):
+    """Recompute the summaries of every order that ships from or to `address_book_id`."""
+    order_ids = db.execute(
+        select(OrderModel.order_id).where(
+            (OrderModel.sender_address_book_id == address_book_id)
+            | (OrderModel.receiver_address_book_id == address_book_id)
+        )
+    ).scalars().all()
+    refresh_order_summary(db, order_ids)
+
+
+def refresh_summary_name(db: Session, name_field: str, source_id: int, name: str):
+    """
+    Carry a renamed customer, reference row, driver or vehicle into order_summary.
+
+    `name_field` is a key of SUMMARY_NAME_SOURCES and `source_id` the id of the
+    renamed row. Runs in the caller's transaction as one UPDATE over the orders
+    pointing at it; a customer name is also part of search_text, so those
+    summaries are recomputed instead.
+    """
+    order_ids = select(OrderModel.order_id).where(SUMMARY_NAME_SOURCES[name_field] == source_id)
+    if name_field in SEARCH_TEXT_FIELDS:
+        refresh_order_summary(db, db.execute(order_ids).scalars().all())
+        return
+
+    db.execute(
+        update(OrderSummaryModel)
+        .where(OrderSummaryModel.order_id.in_(order_ids))
+        .values({name_field: name, "updated_at": datetime.utcnow()})
+        .execution_options(synchronize_session=False)
+    )
+
+
+def rebuild_order_summary(db: Session, batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """
+    Regenerate order_summary from the source tables.
+
+    Walks the order table in primary key batches and upserts each batch in its
+    own transaction, so readers keep seeing every row while it runs and the
+    rebuild never holds more than one batch in memory. Summaries of orders that
+    no longer exist are deleted at the end. A batch that collides with a
+    booking writing its own summary is redone once, then finds that row.
+    Returns the number of rows written.
+    """
+    written = 0
+    last_order_id = 0
+
+    while True:
+        rows = db.execute(
+            build_summary_statement()
+            .where(OrderModel.order_id > last_order_id)
+            .order_by(OrderModel.order_id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        values = [summary_values(row) for row in rows]
+        try:
+            write_summary_rows(db, values)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            write_summary_rows(db, values)
+            db.commit()
+
+        written += len(rows)
+        last_order_id = rows[-1].order_id
+
+    db.execute(delete(OrderSummaryModel).where(
+        ~exists().where(OrderModel.order_id == OrderSummaryModel.order_id)
+    ))
+    db.commit()
+
+    return written
+
+
+if __name__ == "__main__":
+    # python -m app.services.order_summary
+    from app.db.session import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(f"Rebuilt order_summary with {rebuild_order_summary(session)} rows")
+    finally:
+        session.close()
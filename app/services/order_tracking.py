@@ -1,31 +1,151 @@
 from sqlalchemy.orm import Session
 import json
+from datetime import datetime
 from fastapi import HTTPException,status
-# from typing import Optional
+from typing import Optional
+from sqlalchemy import and_, select
 from app.models.user import User
+from app.models.branch import Branch
 from app.models.order_tracking import OrderTrackingModel
 from app.schemas.order_tracking import CreateOrderTrackingSchema,UpdateOrderTrackingSchema
 from app.models.order import OrderModel
+from app.utils.user_names import attach_user_names
+from app.utils.reference_cache import get_reference_name, SHIPMENT_STATUS
+from app.services.order_events import order_changes_committed
+from app.services.tracking_archive import load_archived_events, order_month
+from app.utils.status_transitions import closed_status_ids
+
+
+def tracking_event_values(event: Optional[CreateOrderTrackingSchema], shipment_status_id: Optional[int], current_user: User, remark: Optional[str] = None) -> dict:
+    """
+    Column values of a tracking event recording that an order reached `shipment_status_id`.
+
+    `event` is the optional order_trackings part of a request; it may add a
+    location, branch, remark and event time. Every key is always present, so
+    rows built here can go out as one executemany.
+    """
+    values = event.dict(exclude_unset=True) if event else {}
+    is_active = values.get("is_active")
+    return {
+        "shipment_status_id": shipment_status_id,
+        "branch_id": values.get("branch_id") or current_user.branch_id,
+        "location": values.get("location"),
+        "remark": values.get("remark") or remark,
+        "event_time": values.get("event_time") or datetime.utcnow(),
+        "is_active": True if is_active is None else is_active,
+        "created_by": current_user.user_id,
+    }
+
+
+def get_order_timeline(db: Session, order_id: int):
+    """
+    Tracking events of one order, oldest first, from a single query.
+
+    The order is outer joined with its events, so an order without events still
+    returns one row and an unknown or deleted order returns none. Status names
+    come from the reference cache. Closed orders, and orders whose events are
+    all gone from order_tracking, also read their archived events from the
+    partition of the month they were booked in.
+    """
+    rows = db.execute(
+        select(
+            OrderModel.docket_no,
+            OrderModel.created_at.label("order_created_at"),
+            OrderModel.shipment_status_id.label("current_status_id"),
+            OrderTrackingModel.order_tracking_id,
+            OrderTrackingModel.shipment_status_id,
+            OrderTrackingModel.branch_id,
+            Branch.name.label("branch_name"),
+            OrderTrackingModel.location,
+            OrderTrackingModel.remark,
+            OrderTrackingModel.event_time,
+            OrderTrackingModel.created_by,
+            User.first_name.label("created_by_name"),
+        )
+        .select_from(OrderModel)
+        .outerjoin(
+            OrderTrackingModel,
+            and_(OrderTrackingModel.order_id == OrderModel.order_id, OrderTrackingModel.is_deleted == False),
+        )
+        .outerjoin(Branch, Branch.id == OrderTrackingModel.branch_id)
+        .outerjoin(User, User.user_id == OrderTrackingModel.created_by)
+        .where(OrderModel.order_id == order_id, OrderModel.is_deleted == False)
+        .order_by(OrderTrackingModel.event_time, OrderTrackingModel.order_tracking_id)
+    ).all()
+
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+
+    events = [
+        {
+            "order_tracking_id": row.order_tracking_id,
+            "shipment_status_id": row.shipment_status_id,
+            "shipment_status_name": get_reference_name(db, SHIPMENT_STATUS, row.shipment_status_id),
+            "branch_id": row.branch_id,
+            "branch_name": row.branch_name,
+            "location": row.location,
+            "remark": row.remark,
+            "event_time": row.event_time,
+            "created_by": row.created_by,
+            "created_by_name": row.created_by_name,
+        }
+        for row in rows if row.order_tracking_id is not None
+    ]
+
+    if not events or rows[0].current_status_id in closed_status_ids(db):
+        archived = load_archived_events(db, [order_id], {order_id: order_month(rows[0].order_created_at)})
+        events = [
+            {
+                "order_tracking_id": event["order_tracking_id"],
+                "shipment_status_id": event["shipment_status_id"],
+                "shipment_status_name": get_reference_name(db, SHIPMENT_STATUS, event["shipment_status_id"]),
+                "branch_id": event["branch_id"],
+                "branch_name": event["branch_name"],
+                "location": event["location"],
+                "remark": event["remark"],
+                "event_time": event["event_time"],
+                "created_by": event["created_by"],
+                "created_by_name": event["created_by_name"],
+            }
+            for event in archived.get(order_id, [])
+        ] + events
+
+    return {
+        "message": "Order timeline retrieved successfully",
+        "order_id": order_id,
+        "docket_no": rows[0].docket_no,
+        "shipment_status_id": rows[0].current_status_id,
+        "shipment_status_name": get_reference_name(db, SHIPMENT_STATUS, rows[0].current_status_id),
+        "total": len(events),
+        "events": events
+    }
 
 
 def get_all_order_tracking(db: Session , current_user:User):
 
     try:
-        query = db.query(OrderTrackingModel).filter(OrderTrackingModel.is_deleted == False)
-
-        order_tracking_data = query.all()
+        # The order columns come from the same query instead of three lookups per row
+        rows = (
+            db.query(OrderTrackingModel, OrderModel.docket_no, OrderModel.comment, OrderModel.pod)
+            .outerjoin(OrderModel, OrderModel.order_id == OrderTrackingModel.order_id)
+            .filter(OrderTrackingModel.is_deleted == False)
+            .all()
+        )
 
-        if not order_tracking_data:
+        if not rows:
             raise HTTPException(
                 status_code = status.HTTP_404_NOT_FOUND ,
                 detail = "No Order tracking found"
             )
         
 
-        for orderTracking in order_tracking_data:
-            orderTracking.docket = db.query(OrderModel.docket_no).filter(OrderModel.order_id == orderTracking.order_id).scalar()  
-            orderTracking.comment = db.query(OrderModel.comment).filter(OrderModel.order_id == orderTracking.order_id).scalar()  
-            orderTracking.pod = db.query(OrderModel.pod).filter(OrderModel.order_id == orderTracking.order_id).scalar()  
+        order_tracking_data = []
+        for orderTracking, docket_no, comment, pod in rows:
+            orderTracking.docket = docket_no
+            orderTracking.comment = comment
+            orderTracking.pod = pod
+            orderTracking.shipment_status_name = get_reference_name(db, SHIPMENT_STATUS, orderTracking.shipment_status_id)
+            order_tracking_data.append(orderTracking)
 
 
         return {
@@ -48,9 +168,7 @@ def get_order_tracking_by_id(db: Session, order_tracking_id: int, current_user:
             detail="Order tracking not found"
         )
     
-    user_dict = {user.user_id: user.first_name for user in db.query(User).all()}
-    get_orderTracking.created_by_name = user_dict.get(get_orderTracking.created_by, 'Unknown')
-    get_orderTracking.updated_by_name = user_dict.get(get_orderTracking.updated_by, 'Unknown')
+    attach_user_names(db, [get_orderTracking], default='Unknown')
 
 
     return {
@@ -64,13 +182,21 @@ def create_order_tracking(db: Session, order_tracking_service_data: CreateOrderT
     
     try:
 
-        order_tracking_dict = order_tracking_service_data.dict(exclude_unset=True)
-        order_tracking_dict["created_by"] = current_user.user_id
+        shipment_status_id = order_tracking_service_data.shipment_status_id
+        if shipment_status_id is None and order_tracking_service_data.order_id:
+            # An event without a status records the order's current one
+            shipment_status_id = db.query(OrderModel.shipment_status_id).filter(
+                OrderModel.order_id == order_tracking_service_data.order_id
+            ).scalar()
+
+        order_tracking_dict = tracking_event_values(order_tracking_service_data, shipment_status_id, current_user)
+        order_tracking_dict["order_id"] = order_tracking_service_data.order_id
         new_order_tracking = OrderTrackingModel(**order_tracking_dict)
     
     # Add the new order_tracking to the database session and commit the changes
         db.add(new_order_tracking)
         db.commit()
+        order_changes_committed(db, [new_order_tracking.order_id], current_user)
         db.refresh(new_order_tracking)
         
         # Return the newly created order_tracking
@@ -7,6 +7,8 @@ from fastapi import Query
 from typing import Optional
 from app.models.parcel_type import ParcelType as ParcelModel
 from app.schemas.parcel_type import CreateParcelType, GetParcelType, UpdateParcelType
+from app.services.order_summary import refresh_summary_name
+from app.utils.reference_cache import invalidate_reference_cache, PARCEL_TYPE
 
 
 
@@ -52,6 +54,7 @@ def create_parcel_type(db: Session, parcel_data_service: CreateParcelType, curre
     db.add(new_parcel_type)
     db.commit()
     db.refresh(new_parcel_type)
+    invalidate_reference_cache(PARCEL_TYPE)
     
     # Return the newly created parcel_type
     return new_parcel_type
@@ -70,10 +73,14 @@ def update_parcel_type(db: Session, parcel_id: int,update_parcel_data_service :
     
     if db_parcel_type:
         # Use company.dict() to get only the fields that were updated (exclude_unset=True)
-        for key, value in update_parcel_data_service.dict(exclude_unset=True).items():
+        update_data = update_parcel_data_service.dict(exclude_unset=True)
+        for key, value in update_data.items():
             setattr(db_parcel_type, key, value)
+        if "parcel_name" in update_data:
+            refresh_summary_name(db, "parcel_type_name", parcel_id, db_parcel_type.parcel_name)
         db.commit()  # Commit the changes
         db.refresh(db_parcel_type)  # Refresh to reflect the updates
+        invalidate_reference_cache(PARCEL_TYPE)
         return db_parcel_type
     # return None
     
@@ -95,6 +102,7 @@ def delete_parcel_type(db: Session, parcel_id: int):
     db_parcel_type.is_active = False
     db.commit()  # Commit the changes
     db.refresh(db_parcel_type)  # Refresh to update the state
+    invalidate_reference_cache(PARCEL_TYPE)
     
     return db_parcel_type
 
@@ -7,6 +7,8 @@ from datetime import datetime
 from app.utils.auth import get_current_user
 from app.services.common_validate_data import get_user_name, validate_payment_name
 from app.models.payment_mode import PaymentMode as PaymentModel
+from app.services.order_summary import refresh_summary_name
+from app.utils.reference_cache import invalidate_reference_cache, PAYMENT_MODE
 
 
 
@@ -56,6 +58,7 @@ def create_payment_mode(db: Session, payment_create_service_data: CreatePaymentM
     db.add(new_payment_mode)
     db.commit()
     db.refresh(new_payment_mode)
+    invalidate_reference_cache(PAYMENT_MODE)
 
     return new_payment_mode
 
@@ -76,6 +79,7 @@ def delete_payment(db: Session, payment_id: int):
     db_payment.is_active = False
     db.commit()
     db.refresh(db_payment)
+    invalidate_reference_cache(PAYMENT_MODE)
     
     # Return the soft-deleted payment
     return db_payment
@@ -109,9 +113,12 @@ def update_payment(db: Session, payment_id: int, payment_data: UpdatePaymentMode
     update_data = payment_data.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_payment, key, value)
+    if "payment_name" in update_data:
+        refresh_summary_name(db, "payment_mode_name", payment_id, db_payment.payment_name)
 
     db.commit()
     db.refresh(db_payment)
+    invalidate_reference_cache(PAYMENT_MODE)
     
     # Return the updated payment
     return db_payment
@@ -0,0 +1,157 @@
+from typing import Dict, Iterable
+
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models.order import OrderModel
+from app.models.branch import Branch
+from app.models.order_tracking import OrderTrackingModel
+from app.services.order_listing import format_display_docket
+from app.services.tracking_archive import load_archived_events, order_month
+from app.utils.status_transitions import closed_status_ids
+from app.utils.reference_cache import get_reference_name, SHIPMENT_STATUS
+from app.utils.tracking_cache import (
+    TrackingSnapshot,
+    cached_tracking_order_ids,
+    drop_tracking_snapshots,
+    get_tracking_snapshot,
+    put_tracking_snapshot,
+)
+
+
+def load_tracking_snapshots(db: Session, condition) -> Dict[int, TrackingSnapshot]:
+    """
+    Build the public snapshot of every live order matching `condition`.
+
+    One query reads the orders with their events and branch names, and one more
+    the archived events of closed orders. Only what a customer may see goes in:
+    no names of staff, remarks or addresses.
+    """
+    rows = db.execute(
+        select(
+            OrderModel.order_id,
+            OrderModel.docket_no,
+            OrderModel.manual_docket,
+            OrderModel.is_docket_auto,
+            OrderModel.created_at.label("order_created_at"),
+            OrderModel.shipment_status_id.label("current_status_id"),
+            OrderModel.version,
+            OrderTrackingModel.order_tracking_id,
+            OrderTrackingModel.shipment_status_id,
+            OrderTrackingModel.location,
+            OrderTrackingModel.event_time,
+            Branch.name.label("branch_name"),
+        )
+        .select_from(OrderModel)
+        .outerjoin(
+            OrderTrackingModel,
+            and_(OrderTrackingModel.order_id == OrderModel.order_id, OrderTrackingModel.is_deleted == False),
+        )
+        .outerjoin(Branch, Branch.id == OrderTrackingModel.branch_id)
+        .where(condition, OrderModel.is_deleted == False)
+        .order_by(OrderModel.order_id, OrderTrackingModel.event_time, OrderTrackingModel.order_tracking_id)
+    ).all()
+
+    orders = {}
+    for row in rows:
+        order = orders.get(row.order_id)
+        if order is None:
+            order = orders[row.order_id] = {"row": row, "events": [], "last_event_id": 0}
+        if row.order_tracking_id is not None:
+            order["last_event_id"] = max(order["last_event_id"], row.order_tracking_id)
+            order["events"].append({
+                "shipment_status": get_reference_name(db, SHIPMENT_STATUS, row.shipment_status_id),
+                "location": row.location,
+                "branch": row.branch_name,
+                "event_time": row.event_time,
+            })
+
+    closed = closed_status_ids(db)
+    archive_months = {
+        order_id: order_month(order["row"].order_created_at)
+        for order_id, order in orders.items()
+        if not order["events"] or order["row"].current_status_id in closed
+    }
+    for order_id, events in load_archived_events(db, archive_months, archive_months).items():
+        order = orders[order_id]
+        order["last_event_id"] = max([order["last_event_id"]] + [event["order_tracking_id"] for event in events])
+        order["events"][:0] = [
+            {
+                "shipment_status": get_reference_name(db, SHIPMENT_STATUS, event["shipment_status_id"]),
+                "location": event["location"],
+                "branch": event["branch_name"],
+                "event_time": event["event_time"],
+            }
+            for event in events
+        ]
+
+    snapshots = {}
+    for order_id, order in orders.items():
+        row = order["row"]
+        keys = [str(row.docket_no)] if row.docket_no is not None else []
+        if row.manual_docket:
+            keys.append(row.manual_docket)
+        body = {
+            "docket": format_display_docket(row.is_docket_auto, row.manual_docket, row.docket_no),
+            "shipment_status": get_reference_name(db, SHIPMENT_STATUS, row.current_status_id),
+            "last_updated": order["events"][-1]["event_time"] if order["events"] else None,
+            "events": order["events"],
+        }
+        snapshots[order_id] = TrackingSnapshot(
+            order_id=order_id,
+            keys=keys,
+            # The version moves with every write to the order, the last event id with every new event
+            etag=f'"{order_id}-{row.version}-{order["last_event_id"]}"',
+            body=orjson.dumps(body),
+        )
+
+    return snapshots
+
+
+def get_public_tracking(db: Session, docket: str) -> TrackingSnapshot:
+    """Snapshot of the order with this docket_no or manual docket, from the cache when it is there."""
+    docket = docket.strip()
+    snapshot = get_tracking_snapshot(docket)
+    if snapshot is not None:
+        return snapshot
+
+    condition = OrderModel.manual_docket == docket
+    if docket.isdecimal() and docket.isascii():
+        condition = or_(OrderModel.docket_no == int(docket), condition)
+
+    snapshots = load_tracking_snapshots(db, condition)
+    if not snapshots:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Docket not found")
+
+    # A docket_no can equal another order's manual docket; the docket_no wins and
+    # is stored last, so the cache answers the next poll the same way
+    found = sorted(snapshots.values(), key=lambda snapshot: snapshot.keys[:1] == [docket])
+    for snapshot in found:
+        put_tracking_snapshot(snapshot)
+    return found[-1]
+
+
+def refresh_tracking_cache(db: Session, order_ids: Iterable[int]):
+    """
+    Write committed changes of `order_ids` through to the snapshots this worker holds.
+
+    Orders nobody is polling are skipped, so bulk updates only reload the hot
+    ones, with one query. Orders that are gone or deleted lose their snapshot.
+    """
+    hot_order_ids = cached_tracking_order_ids(order_ids)
+    if not hot_order_ids:
+        return
+
+    try:
+        snapshots = load_tracking_snapshots(db, OrderModel.order_id.in_(hot_order_ids))
+    except SQLAlchemyError:
+        # The change is already committed; a stale snapshot must not outlive it
+        drop_tracking_snapshots(hot_order_ids)
+        return
+
+    drop_tracking_snapshots(order_id for order_id in hot_order_ids if order_id not in snapshots)
+    for snapshot in snapshots.values():
+        put_tracking_snapshot(snapshot)
@@ -5,6 +5,8 @@ from app.models.user import User
 
 from app.schemas.service_type import CreateServiceType, UpdateServiceType
 from fastapi import HTTPException
+from app.services.order_summary import refresh_summary_name
+from app.utils.reference_cache import invalidate_reference_cache, SERVICE_TYPE
 
 
 def create_service_type(db: Session, service_type: CreateServiceType, current_user: User):
@@ -28,6 +30,7 @@ def create_service_type(db: Session, service_type: CreateServiceType, current_us
     db.add(new_service_type)
     db.commit()
     db.refresh(new_service_type)
+    invalidate_reference_cache(SERVICE_TYPE)
     
     # Return the newly created role
     return new_service_type
@@ -86,10 +89,13 @@ def update_service_type(db: Session, service_id: int, service_type_data: UpdateS
     update_data = service_type_data.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_service_type, key, value)
+    if "name" in update_data:
+        refresh_summary_name(db, "service_type_name", service_id, db_service_type.name)
 
     # Commit and refresh
     db.commit()
     db.refresh(db_service_type)
+    invalidate_reference_cache(SERVICE_TYPE)
 
     return db_service_type
     
@@ -113,6 +119,7 @@ def delete_service_type(db: Session, service_id: int):
     service_type.is_active = False
     db.commit()
     db.refresh(service_type)
+    invalidate_reference_cache(SERVICE_TYPE)
     
     # Return the soft-deleted role
     return service_type
\ No newline at end of file
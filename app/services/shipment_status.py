@@ -5,8 +5,11 @@ from fastapi import HTTPException,status
 from app.utils.auth import get_current_user
 from fastapi import Query
 from typing import Optional
-from app.models.shipment_status import ShipmentStatusModel
-from app.schemas.shipment_status import CreateShipmentStatusSchema, UpdateShipmentStatusSchema
+from app.models.shipment_status import ShipmentStatusModel, ShipmentStatusTransitionModel
+from app.schemas.shipment_status import CreateShipmentStatusSchema, UpdateShipmentStatusSchema, UpdateStatusTransitionsSchema
+from app.services.order_summary import refresh_summary_name
+from app.utils.reference_cache import invalidate_reference_cache, get_reference_by_id, SHIPMENT_STATUS
+from app.utils.status_transitions import invalidate_status_transitions, compile_status_transitions
 
 
 def get_all_shipment_status(db: Session, current_user: User):
@@ -56,6 +59,7 @@ def create_shipment_status(db: Session, create_shipment_service_data: CreateShip
         db.add(new_shipment_status)
         db.commit()
         db.refresh(new_shipment_status)
+        invalidate_reference_cache(SHIPMENT_STATUS)
         
         # Return the newly created shipment_status
         return {
@@ -90,9 +94,12 @@ def update_shipment_status(db: Session, shipment_status_id: int,update_shipment_
         for key, value in update_data.items():
             setattr(db_shipment_status, key, value)
 
+        if "shipment_status_name" in update_data:
+            refresh_summary_name(db, "shipment_status_name", shipment_status_id, db_shipment_status.shipment_status_name)
 
         db.commit()  # Commit the changes
         db.refresh(db_shipment_status)  # Refresh to reflect the updates
+        invalidate_reference_cache(SHIPMENT_STATUS)
             
         return {
             "message": "Shipment status updated successfully",
@@ -122,7 +129,53 @@ def delete_shipment_status(db: Session, shipment_status_id: int):
     db_shipment_status.is_active = False
     db.commit()  # Commit the changes
     db.refresh(db_shipment_status)  # Refresh to update the state
+    invalidate_reference_cache(SHIPMENT_STATUS)
+    invalidate_status_transitions()
     
     return db_shipment_status
 
 
+def get_shipment_status_transitions(db: Session):
+    """The allowed transitions as a list of from status id and the ids it may move to."""
+    graph = compile_status_transitions(db)
+    return [
+        {"from_status_id": from_status_id, "to_status_ids": sorted(to_status_ids)}
+        for from_status_id, to_status_ids in sorted(graph.items())
+    ]
+
+
+def update_shipment_status_transitions(db: Session, shipment_status_id: int, transitions: UpdateStatusTransitionsSchema, current_user: User):
+    """
+    Replace the statuses an order in `shipment_status_id` may move to.
+    """
+    to_status_ids = set(transitions.to_status_ids)
+    unknown = []
+    for status_id in [shipment_status_id, *sorted(to_status_ids)]:
+        entry = get_reference_by_id(db, SHIPMENT_STATUS, status_id)
+        if entry is None or entry.is_deleted:
+            unknown.append(status_id)
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Shipment status not found: {', '.join(map(str, unknown))}")
+
+    try:
+        db.query(ShipmentStatusTransitionModel).filter(
+            ShipmentStatusTransitionModel.from_status_id == shipment_status_id
+        ).delete(synchronize_session=False)
+        db.add_all(
+            ShipmentStatusTransitionModel(from_status_id=shipment_status_id, to_status_id=to_status_id, created_by=current_user.user_id)
+            for to_status_id in to_status_ids if to_status_id != shipment_status_id
+        )
+        db.commit()
+        invalidate_status_transitions()
+
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Error updating shipment status transitions: {str(e)}")
+
+    return {
+        "message": "Shipment status transitions updated successfully",
+        "from_status_id": shipment_status_id,
+        "to_status_ids": sorted(to_status_ids - {shipment_status_id})
+    }
+
+
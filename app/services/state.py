@@ -3,6 +3,7 @@ from app.models.state import State
 from app.models.city import City
 from app.schemas.state import StateCreate, StateUpdate, StateResponse
 from app.services.common_validate_data import get_user_name
+from app.utils.user_names import attach_user_names
 from typing import Optional
 
 # Create a new State
@@ -77,9 +78,7 @@ def get_state_list(db: Session, skip: int, limit: int, city_id: Optional[int] =
     states = query.offset(skip).limit(limit).all()
 
     # Enrich states with created_by_name and updated_by_name
-    for state in states:
-        state.created_by_name = get_user_name(db, state.created_by) if state.created_by else None
-        state.updated_by_name = get_user_name(db, state.updated_by) if state.updated_by else None
+    attach_user_names(db, states)
     return states
 
 
@@ -0,0 +1,229 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import orjson
+from sqlalchemy import delete, exists, insert, or_, select, text, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.branch import Branch
+from app.models.order import OrderModel
+from app.models.order_tracking import OrderTrackingModel
+from app.models.order_tracking_archive import OrderTrackingArchiveModel
+from app.utils.status_transitions import closed_status_ids
+from app.utils.user_names import resolve_user_names
+
+
+# Order of the values of one archived event; the names are only stored once, here
+ARCHIVED_EVENT_FIELDS = (
+    "order_tracking_id",
+    "shipment_status_id",
+    "branch_id",
+    "location",
+    "remark",
+    "event_time",
+    "created_by",
+)
+
+
+def order_month(created_at: Optional[datetime]) -> int:
+    """The archive partition key of an order booked at `created_at`, as yyyymm."""
+    return created_at.year * 100 + created_at.month if created_at else 0
+
+
+def _next_month(month: int) -> int:
+    year, month_of_year = divmod(month, 100)
+    return (year + 1) * 100 + 1 if month_of_year >= 12 else month + 1
+
+
+def _pack_events(events: List[dict]) -> str:
+    return orjson.dumps([[event[field] for field in ARCHIVED_EVENT_FIELDS] for event in events]).decode("utf-8")
+
+
+def _unpack_events(packed: str) -> List[dict]:
+    events = []
+    for values in orjson.loads(packed):
+        event = dict(zip(ARCHIVED_EVENT_FIELDS, values))
+        event["event_time"] = datetime.fromisoformat(event["event_time"]) if event["event_time"] else None
+        events.append(event)
+    return events
+
+
+def load_archived_events(db: Session, order_ids: Iterable[int], order_months: Optional[Dict[int, int]] = None) -> Dict[int, List[dict]]:
+    """
+    Archived events of `order_ids`, oldest first, with branch and creator names.
+
+    `order_months` maps order ids to `order_month` of their booking; with it the
+    lookup only reads those partitions, without it it probes the order_id index
+    of every partition. One query reads the archive, plus one for the names of
+    branches; creator names come from the user name LRU.
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return {}
+
+    query = select(OrderTrackingArchiveModel.order_id, OrderTrackingArchiveModel.events)
+    if order_months:
+        pairs = [(order_months[order_id], order_id) for order_id in order_ids]
+        query = query.where(
+            OrderTrackingArchiveModel.order_month.in_({month for month, _ in pairs}),
+            tuple_(OrderTrackingArchiveModel.order_month, OrderTrackingArchiveModel.order_id).in_(pairs),
+        )
+    else:
+        query = query.where(OrderTrackingArchiveModel.order_id.in_(order_ids))
+
+    events_by_order = {row.order_id: _unpack_events(row.events) for row in db.execute(query).all()}
+    events = [event for order_events in events_by_order.values() for event in order_events]
+    if not events:
+        return events_by_order
+
+    branch_ids = {event["branch_id"] for event in events if event["branch_id"]}
+    branch_names = dict(db.execute(select(Branch.id, Branch.name).where(Branch.id.in_(branch_ids))).all()) if branch_ids else {}
+    user_names = resolve_user_names(db, [event["created_by"] for event in events])
+    for event in events:
+        event["branch_name"] = branch_names.get(event["branch_id"])
+        event["created_by_name"] = user_names.get(event["created_by"])
+
+    return events_by_order
+
+
+def ensure_tracking_archive_partitions(db: Session, months: Iterable[int]):
+    """
+    Split a partition per month in `months` off the catch-all pmax partition.
+
+    Only on MySQL, and only for months past the last monthly partition; older
+    months already fall into one. Run before rows of those months are written,
+    since the ALTER commits implicitly and copies whatever is in pmax.
+    """
+    if db.get_bind().dialect.name != "mysql":
+        return
+
+    partitions = db.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name"
+    ), {"table_name": OrderTrackingArchiveModel.__tablename__}).all()
+    if not any(name == "pmax" for name, _ in partitions):
+        # Created before the table was partitioned; nothing to split
+        return
+
+    bounds = [int(description) for name, description in partitions if name != "pmax"]
+    highest_bound = max(bounds, default=0)
+    new_months = sorted(month for month in set(months) if month >= highest_bound)
+    if not new_months:
+        return
+
+    definitions = ", ".join(f"PARTITION p{month} VALUES LESS THAN ({_next_month(month)})" for month in new_months)
+    db.execute(text(
+        f"ALTER TABLE {OrderTrackingArchiveModel.__tablename__} REORGANIZE PARTITION pmax INTO "
+        f"({definitions}, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+    ))
+
+
+def archive_closed_tracking(db: Session, older_than_days: Optional[int] = None, batch_size: int = 500) -> int:
+    """
+    Move the tracking events of closed orders from order_tracking into the archive.
+
+    An order is closed once deleted or in a status it cannot leave, and is only
+    archived when neither it nor any of its events changed in the last
+    `older_than_days` days. Soft-deleted events are dropped on the way. Each
+    batch is one transaction: a select of the orders, one of their events and
+    one of existing archive rows, then an executemany insert and one delete per
+    table. Returns how many orders were archived.
+    """
+    if older_than_days is None:
+        older_than_days = settings.tracking_archive_after_days
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    closed = or_(OrderModel.is_deleted == True, OrderModel.shipment_status_id.in_(closed_status_ids(db)))
+
+    archived = 0
+    last_order_id = 0
+
+    while True:
+        orders = db.execute(
+            select(OrderModel.order_id, OrderModel.created_at)
+            .where(
+                OrderModel.order_id > last_order_id,
+                closed,
+                OrderModel.updated_at < cutoff,
+                exists().where(OrderTrackingModel.order_id == OrderModel.order_id),
+            )
+            .order_by(OrderModel.order_id)
+            .limit(batch_size)
+        ).all()
+        if not orders:
+            break
+        last_order_id = orders[-1].order_id
+
+        rows = db.execute(
+            select(
+                OrderTrackingModel.order_id,
+                *[getattr(OrderTrackingModel, field) for field in ARCHIVED_EVENT_FIELDS],
+                OrderTrackingModel.is_deleted,
+                OrderTrackingModel.created_at,
+                OrderTrackingModel.updated_at,
+            )
+            .where(OrderTrackingModel.order_id.in_([order.order_id for order in orders]))
+            .order_by(OrderTrackingModel.order_id, OrderTrackingModel.event_time, OrderTrackingModel.order_tracking_id)
+        ).all()
+
+        rows_by_order = defaultdict(list)
+        for row in rows:
+            rows_by_order[row.order_id].append(row)
+
+        months = {
+            order.order_id: order_month(order.created_at)
+            for order in orders
+            # An event added after the order last changed keeps it live a while longer
+            if all((row.updated_at or row.created_at or datetime.min) < cutoff for row in rows_by_order[order.order_id])
+        }
+        if not months:
+            continue
+
+        ensure_tracking_archive_partitions(db, months.values())
+        existing = load_archived_events(db, months, months)
+
+        archive_rows = []
+        for order_id, month in months.items():
+            events = existing.get(order_id, []) + [
+                {field: getattr(row, field) for field in ARCHIVED_EVENT_FIELDS}
+                for row in rows_by_order[order_id] if not row.is_deleted
+            ]
+            events.sort(key=lambda event: (event["event_time"] or datetime.min, event["order_tracking_id"]))
+            archive_rows.append({
+                "order_month": month,
+                "order_id": order_id,
+                "event_count": len(events),
+                "first_event_time": events[0]["event_time"] if events else None,
+                "last_event_time": events[-1]["event_time"] if events else None,
+                "events": _pack_events(events),
+                "archived_at": datetime.utcnow(),
+            })
+
+        if existing:
+            db.execute(delete(OrderTrackingArchiveModel).where(
+                tuple_(OrderTrackingArchiveModel.order_month, OrderTrackingArchiveModel.order_id).in_(
+                    [(months[order_id], order_id) for order_id in existing]
+                )
+            ))
+        db.execute(insert(OrderTrackingArchiveModel), archive_rows)
+        # By id, so an event written since the select stays live for the next run
+        db.execute(delete(OrderTrackingModel).where(OrderTrackingModel.order_tracking_id.in_(
+            [row.order_tracking_id for order_id in months for row in rows_by_order[order_id]]
+        )))
+        db.commit()
+
+        archived += len(archive_rows)
+
+    return archived
+
+
+if __name__ == "__main__":
+    # python -m app.services.tracking_archive
+    from app.db.session import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(f"Archived the tracking events of {archive_closed_tracking(session)} closed orders")
+    finally:
+        session.close()
@@ -8,6 +8,8 @@ from pydantic import constr, Field
 from app.models.city import City
 from app.models.state import State
 from app.models.country import Country
+from app.services.order_summary import refresh_summary_name
+from app.utils.user_names import invalidate_user_name
 
 
 
@@ -52,13 +54,18 @@ def update_user_by_role(db: Session, user_id: int, updated_data: dict, current_u
         if not user_to_update:
             raise HTTPException(status_code=404, detail="User to update not found")
 
+        previous_first_name = user_to_update.first_name
+
         # Update the user with the new data only if the field is not None
         for key, value in updated_data.items():
             if hasattr(user_to_update, key) and value is not None:
                 setattr(user_to_update, key, value)
+        if user_to_update.first_name != previous_first_name:
+            refresh_summary_name(db, "customer_name", user_to_update.user_id, user_to_update.first_name)
 
         db.commit()
         db.refresh(user_to_update)
+        invalidate_user_name(user_to_update.user_id)
         return user_to_update
     else:
         raise HTTPException(status_code=403, detail="You do not have permission to update this user")
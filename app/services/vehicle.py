@@ -4,6 +4,7 @@ from app.models.user import User
 from app.models.vehicle import VehicleModel, VehicleTypeEnum
 from sqlalchemy.orm import joinedload
 from app.schemas.vehicle import CreateVehicleSchema,UpdateVehicleSchema
+from app.services.order_summary import refresh_summary_name
 
 
 
@@ -87,10 +88,13 @@ def update_vehicle(db: Session, id: int,vehicle_service_data : UpdateVehicleSche
     
 
 
-    for key, value in vehicle_service_data.dict(exclude_unset=True).items():
+    update_data = vehicle_service_data.dict(exclude_unset=True)
+    for key, value in update_data.items():
         if key == 'vehicle_type' and value:
             value = VehicleTypeEnum(value)  # Convert to Enum if it's a vehicle_type field
         setattr(db_vehicle, key, value)
+    if "name" in update_data:
+        refresh_summary_name(db, "vehicle_name", id, db_vehicle.name)
         
     db.commit()
     db.refresh(db_vehicle)
@@ -0,0 +1,57 @@
+"""
+Encode time of one page of 1,000 orders, before and after the precompiled path.
+
+"before" is what FastAPI does with ORM objects: jsonable_encoder, then json.dumps.
+"after" is serialize_orders through ORDER_LIST_ADAPTER, then orjson.dumps.
+
+    python -m app.tests.bench_order_serialization
+"""
+import json
+import time
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.services.order_listing import list_orders, serialize_orders
+from app.tests.conftest import seed_orders
+
+ORDER_COUNT = 1000
+ROUNDS = 5
+
+
+def _best_of(encode) -> float:
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        encode()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run_benchmark(order_count: int = ORDER_COUNT) -> dict:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        seed_orders(db, order_count)
+        orders, _ = list_orders(db, limit=order_count)
+
+        before = _best_of(lambda: json.dumps(jsonable_encoder({"orders": orders})).encode("utf-8"))
+        after = _best_of(lambda: orjson.dumps({"orders": serialize_orders(orders)}))
+    finally:
+        db.close()
+        engine.dispose()
+
+    per_thousand = 1000 / order_count
+    return {"before_ms": before * per_thousand * 1000, "after_ms": after * per_thousand * 1000}
+
+
+if __name__ == "__main__":
+    result = run_benchmark()
+    print(f"jsonable_encoder + json: {result['before_ms']:.1f} ms per 1,000 orders")
+    print(f"TypeAdapter + orjson:    {result['after_ms']:.1f} ms per 1,000 orders")
+    print(f"speedup:                 {result['before_ms'] / result['after_ms']:.1f}x")
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.main  # registers every model on Base.metadata
+from app.db.base import Base
+from app.models.user import User
+from app.models.order import OrderModel
+from app.models.order_item import OrderItemModel
+from app.models.order_tracking import OrderTrackingModel
+from app.models.address_book import AddressBookModel
+from app.models.shipment_status import ShipmentStatusModel
+from app.models.service_type import ServiceType
+from app.models.payment_mode import PaymentMode
+from app.models.parcel_type import ParcelType
+from app.models.drivers import DriverModel
+from app.models.vehicle import VehicleModel, VehicleTypeEnum
+from app.services.order_summary import refresh_order_summary
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def statements(engine):
+    """SQL statements sent to the database; clear it before the part under test."""
+    sent = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: sent.append(statement))
+    return sent
+
+
+def seed_orders(db, count: int):
+    """Add `count` orders with two items, two tracking rows and their own addresses each."""
+    if not db.get(User, 1):
+        db.add(User(user_id=1, first_name="Ann", license_no="L1", email="ann@example.com", password_hash="x"))
+        for status_id, name in enumerate(("Booked", "Pending Pickup", "In Transit", "Delivered"), 1):
+            db.add(ShipmentStatusModel(shipment_status_id=status_id, shipment_status_name=name))
+        db.add(ServiceType(service_id=1, name="Express"))
+        db.add(PaymentMode(payment_id=1, payment_name="Cash"))
+        db.add(ParcelType(parcel_id=1, parcel_name="Box"))
+        db.add(DriverModel(driver_id=1, user_id=1, name="Dave", license_no="D1", created_by=1))
+        db.add(VehicleModel(id=1, name="Van 1", vehicle_number="V1", vehicle_type=VehicleTypeEnum.VAN))
+        db.commit()
+
+    first = db.query(OrderModel).count()
+    order_ids = []
+    for k in range(first, first + count):
+        sender = AddressBookModel(company_name=f"Sender {k}", pincode=str(400000 + k % 3))
+        receiver = AddressBookModel(company_name=f"Receiver {k}", pincode=str(500000 + k % 3))
+        db.add_all([sender, receiver])
+        db.flush()
+        order = OrderModel(
+            docket_no=202100000 + k, customer_id=1, service_type_id=1, payment_mode_id=1, parcel_type_id=1,
+            shipment_status_id=1, driver_id=1, vehicle_id=1, created_by=1, invoice_no=1000 + k,
+            sender_address_book_id=sender.address_book_id, receiver_address_book_id=receiver.address_book_id,
+            created_at=datetime(2025, 1, 1) + timedelta(minutes=k),
+        )
+        db.add(order)
+        db.flush()
+        db.add_all([OrderItemModel(order_id=order.order_id, number_of_box=box) for box in (1, 2)])
+        db.add_all([OrderTrackingModel(order_id=order.order_id, shipment_status_id=1, created_by=1) for _ in range(2)])
+        order_ids.append(order.order_id)
+
+    refresh_order_summary(db, order_ids)
+    db.commit()
+    db.expunge_all()
+    return order_ids
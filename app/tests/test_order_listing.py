@@ -0,0 +1,21 @@
+from app.services.order_listing import MAX_PAGE_LIMIT, list_orders
+from app.tests.conftest import seed_orders
+
+
+def test_list_orders_statement_count_does_not_grow_with_orders(db, statements):
+    seed_orders(db, 20)
+    statements.clear()
+    orders, _ = list_orders(db, limit=MAX_PAGE_LIMIT)
+    small = len(statements)
+    assert len(orders) == 20
+
+    seed_orders(db, 180)
+    statements.clear()
+    orders, _ = list_orders(db, limit=MAX_PAGE_LIMIT)
+    assert len(orders) == 200
+    assert len(statements) == small
+
+    # Every relation is there without lazy loads after the fact
+    statements.clear()
+    assert all(len(order.order_items) == 2 and order.order_trackings and order.sender_address for order in orders)
+    assert statements == []
@@ -0,0 +1,186 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.order import OrderModel
+from app.models.docket_counter import DocketCounterModel
+
+
+# A docket is its range prefix followed by seven digits, so prefix 20 covers
+# 200000000-209999999 and the largest prefix that fits order.docket_no is 213.
+DOCKET_SEQUENCE_SPAN = 10 ** 7
+
+DEFAULT_DOCKET_COUNTER = "default"
+DEFAULT_DOCKET_PREFIX = 20
+FIRST_DEFAULT_DOCKET = 202100000
+
+# How long a branch without its own counter keeps using the default range
+# before this worker checks again
+BRANCH_COUNTER_RECHECK_SECONDS = 300
+
+_lock = threading.Lock()
+# counter key -> [next docket, end of the reserved block)
+_blocks: Dict[str, List[int]] = {}
+# branch id -> time it was found to have no counter
+_branches_without_counter: Dict[int, float] = {}
+
+
+def branch_counter_key(branch_id: int) -> str:
+    return f"branch:{branch_id}"
+
+
+def _get_engine(db: Session):
+    # Blocks are reserved on their own connection so the counter row is only
+    # locked for the reservation, never for the booking that triggered it
+    bind = db.get_bind()
+    return getattr(bind, "engine", bind)
+
+
+def _create_default_counter(engine):
+    range_start = DEFAULT_DOCKET_PREFIX * DOCKET_SEQUENCE_SPAN
+    with engine.begin() as conn:
+        latest = conn.execute(
+            select(func.max(OrderModel.docket_no)).where(
+                OrderModel.docket_no >= range_start,
+                OrderModel.docket_no < range_start + DOCKET_SEQUENCE_SPAN,
+            )
+        ).scalar()
+        try:
+            conn.execute(
+                insert(DocketCounterModel).values(
+                    counter_key=DEFAULT_DOCKET_COUNTER,
+                    prefix=DEFAULT_DOCKET_PREFIX,
+                    next_value=max(FIRST_DEFAULT_DOCKET, (latest or 0) + 1),
+                )
+            )
+        except IntegrityError:
+            # Another worker created it first
+            pass
+
+
+def _reserve_block(engine, counter_key: str, block_size: int) -> Optional[List[int]]:
+    """Move the counter forward by `block_size` in one atomic UPDATE; None if there is no such counter."""
+    with engine.begin() as conn:
+        reserved = conn.execute(
+            update(DocketCounterModel)
+            .where(DocketCounterModel.counter_key == counter_key)
+            .values(next_value=DocketCounterModel.next_value + block_size)
+        ).rowcount
+        if not reserved:
+            return None
+
+        # Still inside the transaction that holds the row lock
+        end, prefix = conn.execute(
+            select(DocketCounterModel.next_value, DocketCounterModel.prefix).where(
+                DocketCounterModel.counter_key == counter_key
+            )
+        ).one()
+
+    range_end = (prefix + 1) * DOCKET_SEQUENCE_SPAN
+    start = end - block_size
+    if start >= range_end:
+        raise ValueError(f"Docket numbers with prefix {prefix} are exhausted")
+
+    return [start, min(end, range_end)]
+
+
+def _next_from_block(engine, counter_key: str) -> Optional[int]:
+    with _lock:
+        block = _blocks.get(counter_key)
+        if block and block[0] < block[1]:
+            block[0] += 1
+            return block[0] - 1
+
+    block = _reserve_block(engine, counter_key, settings.docket_block_size)
+    if block is None:
+        return None
+
+    with _lock:
+        docket_no = block[0]
+        block[0] += 1
+        # A block reserved concurrently by another thread of this worker is
+        # dropped; that only leaves a gap in the numbering
+        _blocks[counter_key] = block
+        return docket_no
+
+
+def _should_try_branch(branch_id: Optional[int]) -> bool:
+    if not branch_id:
+        return False
+    checked_at = _branches_without_counter.get(branch_id)
+    return checked_at is None or time.monotonic() - checked_at >= BRANCH_COUNTER_RECHECK_SECONDS
+
+
+def allocate_docket_no(db: Session, branch_id: Optional[int] = None) -> int:
+    """
+    Hand out the next docket number for a booking made at `branch_id`.
+
+    Branches with their own counter get numbers from their prefix, every other
+    booking from the default range. Numbers come from a block reserved by this
+    worker, so most calls never touch the database. Blocks left unused when a
+    worker stops become gaps in the numbering, but no number is handed out twice.
+    """
+    engine = _get_engine(db)
+
+    if _should_try_branch(branch_id):
+        docket_no = _next_from_block(engine, branch_counter_key(branch_id))
+        if docket_no is not None:
+            return docket_no
+        _branches_without_counter[branch_id] = time.monotonic()
+
+    docket_no = _next_from_block(engine, DEFAULT_DOCKET_COUNTER)
+    if docket_no is None:
+        _create_default_counter(engine)
+        docket_no = _next_from_block(engine, DEFAULT_DOCKET_COUNTER)
+
+    return docket_no
+
+
+def allocate_docket_nos(db: Session, count: int, branch_id: Optional[int] = None) -> List[int]:
+    """Reserve `count` consecutive docket numbers with a single UPDATE, for bulk bookings."""
+    engine = _get_engine(db)
+    block = None
+
+    if _should_try_branch(branch_id):
+        block = _reserve_block(engine, branch_counter_key(branch_id), count)
+        if block is None:
+            _branches_without_counter[branch_id] = time.monotonic()
+
+    if block is None:
+        block = _reserve_block(engine, DEFAULT_DOCKET_COUNTER, count)
+        if block is None:
+            _create_default_counter(engine)
+            block = _reserve_block(engine, DEFAULT_DOCKET_COUNTER, count)
+
+    if block[1] - block[0] < count:
+        raise ValueError("Not enough docket numbers left in the range")
+
+    return list(range(block[0], block[1]))
+
+
+def create_branch_docket_counter(db: Session, branch_id: int, prefix: int) -> DocketCounterModel:
+    """
+    Give `branch_id` its own docket range, numbered from `prefix` followed by zeros.
+
+    Raises ValueError for a prefix that does not fit or is the default one;
+    prefixes already used by another counter fail on the unique constraint.
+    """
+    if prefix == DEFAULT_DOCKET_PREFIX or not 1 <= prefix <= 213:
+        raise ValueError(f"prefix must be between 1 and 213 and not {DEFAULT_DOCKET_PREFIX}")
+
+    counter = DocketCounterModel(
+        counter_key=branch_counter_key(branch_id),
+        branch_id=branch_id,
+        prefix=prefix,
+        next_value=prefix * DOCKET_SEQUENCE_SPAN,
+    )
+    db.add(counter)
+    db.commit()
+
+    _branches_without_counter.pop(branch_id, None)
+    return counter
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 from app.models.globle_status import GlobleStatus
+from app.utils.reference_cache import invalidate_reference_cache, GLOBLE_STATUS
 
 def create_default_status(db: Session):
     statuses = [
@@ -11,3 +12,4 @@ def create_default_status(db: Session):
         if not db.query(GlobleStatus).filter(GlobleStatus.name == status['name'], GlobleStatus.category == status['category']).first():
             db.add(GlobleStatus(**status, created_by=1))
     db.commit()
+    invalidate_reference_cache(GLOBLE_STATUS)
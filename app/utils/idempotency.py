@@ -0,0 +1,305 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+import orjson
+from fastapi import Header, HTTPException, Response, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User
+from app.models.idempotency_key import IdempotencyKeyModel
+
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+# Completed responses kept in memory by each worker, least recently used evicted first
+IDEMPOTENCY_MEMORY_ENTRIES = 10000
+
+DATABASE_STORE = "database"
+
+# A response replayed from the store rather than produced by running the request
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# `committed` marks a request whose changes were committed but whose response was never stored
+StoredResponse = namedtuple("StoredResponse", ["request_hash", "status_code", "body", "committed"], defaults=(False,))
+
+_lock = threading.Lock()
+# scoped key -> (expires at, StoredResponse, or None while the first request runs)
+_entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+
+def get_idempotency_key(idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")) -> Optional[str]:
+    """The Idempotency-Key header of the request, if any."""
+    if idempotency_key is None:
+        return None
+    idempotency_key = idempotency_key.strip()
+    if not idempotency_key or len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters"
+        )
+    return idempotency_key
+
+
+def request_hash(*parts) -> str:
+    """Fingerprint of a request, so a key reused for a different request can be refused."""
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _uses_database() -> bool:
+    return settings.idempotency_store == DATABASE_STORE
+
+
+def _get_engine(db: Session):
+    # Keys are claimed and stored on their own connection, so the request's own
+    # commits and rollbacks never take the stored response with them
+    bind = db.get_bind()
+    return getattr(bind, "engine", bind)
+
+
+def _memory_get(scoped_key: str):
+    with _lock:
+        entry = _entries.get(scoped_key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del _entries[scoped_key]
+            return None
+        _entries.move_to_end(scoped_key)
+        return entry
+
+
+def _memory_claim(scoped_key: str):
+    """Mark `scoped_key` as running; returns the existing entry instead if there is one."""
+    with _lock:
+        entry = _entries.get(scoped_key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry
+        _entries[scoped_key] = (time.monotonic() + settings.idempotency_lease_seconds, None)
+        return None
+
+
+def _memory_store(scoped_key: str, stored: StoredResponse, expires_in: float):
+    with _lock:
+        _entries[scoped_key] = (time.monotonic() + expires_in, stored)
+        _entries.move_to_end(scoped_key)
+        while len(_entries) > IDEMPOTENCY_MEMORY_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def _memory_release(scoped_key: str):
+    with _lock:
+        entry = _entries.get(scoped_key)
+        if entry is not None and entry[1] is None:
+            del _entries[scoped_key]
+
+
+def _database_claim(engine, scoped_key: str, fingerprint: str) -> Optional[StoredResponse]:
+    """
+    Insert the running marker for `scoped_key`.
+
+    Returns None when this request holds the key, otherwise what the first one
+    left: its stored response, or a StoredResponse without a status code while
+    it is still running. A marker whose lease ran out, because its worker died
+    mid-request, is deleted with the expired rows and the key taken over. A
+    request that committed has its marker extended to the full TTL by
+    _mark_committed, so it is never taken over and run a second time.
+    """
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(
+            delete(IdempotencyKeyModel).where(
+                IdempotencyKeyModel.idempotency_key == scoped_key,
+                IdempotencyKeyModel.expires_at <= now,
+            )
+        )
+        try:
+            with conn.begin_nested():
+                conn.execute(
+                    insert(IdempotencyKeyModel).values(
+                        idempotency_key=scoped_key,
+                        request_hash=fingerprint,
+                        created_at=now,
+                        expires_at=now + timedelta(seconds=settings.idempotency_lease_seconds),
+                    )
+                )
+            return None
+        except IntegrityError:
+            row = conn.execute(
+                select(
+                    IdempotencyKeyModel.request_hash,
+                    IdempotencyKeyModel.status_code,
+                    IdempotencyKeyModel.response_body,
+                    IdempotencyKeyModel.committed_at,
+                    IdempotencyKeyModel.expires_at,
+                ).where(IdempotencyKeyModel.idempotency_key == scoped_key)
+            ).one()
+
+    stored = StoredResponse(row.request_hash, row.status_code, row.response_body, row.committed_at is not None)
+    if row.status_code is not None:
+        # Completed responses never change, so this worker can answer the next retry from memory
+        _memory_store(scoped_key, stored, (row.expires_at - now).total_seconds())
+    return stored
+
+
+def _mark_committed(db: Session, scoped_key: str):
+    """Record in the request's own transaction that its changes are about to be committed."""
+    now = datetime.utcnow()
+    db.execute(
+        update(IdempotencyKeyModel)
+        .where(IdempotencyKeyModel.idempotency_key == scoped_key, IdempotencyKeyModel.committed_at.is_(None))
+        .values(committed_at=now, expires_at=now + timedelta(seconds=settings.idempotency_ttl_seconds))
+    )
+
+
+def _database_store(engine, scoped_key: str, stored: StoredResponse):
+    with engine.begin() as conn:
+        conn.execute(
+            update(IdempotencyKeyModel)
+            .where(IdempotencyKeyModel.idempotency_key == scoped_key)
+            .values(
+                status_code=stored.status_code,
+                response_body=stored.body,
+                expires_at=datetime.utcnow() + timedelta(seconds=settings.idempotency_ttl_seconds),
+            )
+        )
+
+
+def _database_release(engine, scoped_key: str):
+    with engine.begin() as conn:
+        conn.execute(
+            delete(IdempotencyKeyModel).where(
+                IdempotencyKeyModel.idempotency_key == scoped_key,
+                IdempotencyKeyModel.status_code.is_(None),
+                IdempotencyKeyModel.committed_at.is_(None),
+            )
+        )
+
+
+def _replay(stored: StoredResponse, fingerprint: str) -> Response:
+    if stored.request_hash != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used for a different request"
+        )
+    if stored.status_code is None and stored.committed:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key was already applied but its response was lost; "
+                   "read the current state instead of retrying"
+        )
+    if stored.status_code is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still being processed"
+        )
+    return Response(
+        content=stored.body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def run_idempotent(
+    db: Session,
+    idempotency_key: Optional[str],
+    current_user: User,
+    fingerprint: str,
+    handler: Callable[[], Any],
+    status_code: int = status.HTTP_200_OK,
+):
+    """
+    Run `handler` once per Idempotency-Key and user.
+
+    Without a key this is just `handler()`. With one, the first request runs the
+    handler and its JSON response is kept for `settings.idempotency_ttl_seconds`;
+    retries get that response back without running anything. Requests that
+    fail before committing anything are not kept, so they can be retried with
+    the same key. A key reused for a different request is refused with 422, and
+    a retry arriving while the first request still runs with 409. The running
+    request only holds the key for `settings.idempotency_lease_seconds`, so a
+    worker that dies mid-request does not block the key for the whole TTL.
+
+    The response is stored after the handler commits, on another connection,
+    so a worker can die in between. To keep a retry from running the write a
+    second time, the handler's first commit marks the key as committed in the
+    same transaction; such a key is never taken over, and retries get 409
+    telling the client to read the current state instead.
+    """
+    if idempotency_key is None:
+        return handler()
+
+    scoped_key = f"{current_user.user_id}:{idempotency_key}"
+
+    entry = _memory_get(scoped_key)
+    if entry is not None:
+        return _replay(entry[1] or StoredResponse(fingerprint, None, None), fingerprint)
+
+    engine = _get_engine(db) if _uses_database() else None
+    if engine is not None:
+        stored = _database_claim(engine, scoped_key, fingerprint)
+        if stored is not None:
+            return _replay(stored, fingerprint)
+        _memory_claim(scoped_key)
+    else:
+        entry = _memory_claim(scoped_key)
+        if entry is not None:
+            return _replay(entry[1] or StoredResponse(fingerprint, None, None), fingerprint)
+
+    committed = []
+
+    def before_commit(session):
+        if not committed:
+            committed.append(True)
+            if engine is not None:
+                _mark_committed(session, scoped_key)
+
+    event.listen(db, "before_commit", before_commit)
+    try:
+        body = orjson.dumps(jsonable_encoder(handler()))
+    except BaseException:
+        if committed:
+            # Part of the request is in; a retry must not run it again
+            _memory_store(scoped_key, StoredResponse(fingerprint, None, None, True), settings.idempotency_ttl_seconds)
+        else:
+            _memory_release(scoped_key)
+            if engine is not None:
+                _database_release(engine, scoped_key)
+        raise
+    finally:
+        event.remove(db, "before_commit", before_commit)
+
+    stored = StoredResponse(fingerprint, status_code, body.decode("utf-8"))
+    _memory_store(scoped_key, stored, settings.idempotency_ttl_seconds)
+    if engine is not None:
+        _database_store(engine, scoped_key, stored)
+
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+def purge_expired_idempotency_keys(db: Session) -> int:
+    """Delete the expired rows of the database store; returns how many were removed."""
+    result = db.execute(delete(IdempotencyKeyModel).where(IdempotencyKeyModel.expires_at <= datetime.utcnow()))
+    db.commit()
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    # python -m app.utils.idempotency
+    from app.db.session import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(f"Removed {purge_expired_idempotency_keys(session)} expired idempotency keys")
+    finally:
+        session.close()
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.shipment_status import ShipmentStatusModel
+from app.models.service_type import ServiceType
+from app.models.payment_mode import PaymentMode
+from app.models.parcel_type import ParcelType
+from app.models.globle_status import GlobleStatus
+
+
+# Upper bound on how stale a table can get when another worker writes it,
+# since invalidation only reaches the process that made the change.
+REFERENCE_CACHE_TTL_SECONDS = 300
+
+SHIPMENT_STATUS = "shipment_status"
+SERVICE_TYPE = "service_type"
+PAYMENT_MODE = "payment_mode"
+PARCEL_TYPE = "parcel_type"
+GLOBLE_STATUS = "globle_status"
+
+# table -> (model, id column, name column)
+REFERENCE_TABLES = {
+    SHIPMENT_STATUS: (ShipmentStatusModel, "shipment_status_id", "shipment_status_name"),
+    SERVICE_TYPE: (ServiceType, "service_id", "name"),
+    PAYMENT_MODE: (PaymentMode, "payment_id", "payment_name"),
+    PARCEL_TYPE: (ParcelType, "parcel_id", "parcel_name"),
+    GLOBLE_STATUS: (GlobleStatus, "id", "name"),
+}
+
+ReferenceEntry = namedtuple("ReferenceEntry", ["id", "name", "is_active", "is_deleted"])
+
+
+class _Snapshot:
+    def __init__(self, version: int, entries):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.by_id: Dict[int, ReferenceEntry] = {entry.id: entry for entry in entries}
+        self.by_name: Dict[str, ReferenceEntry] = {
+            entry.name.lower(): entry for entry in entries if entry.name and not entry.is_deleted
+        }
+
+
+_lock = threading.Lock()
+_versions: Dict[str, int] = {table: 0 for table in REFERENCE_TABLES}
+_snapshots: Dict[str, _Snapshot] = {}
+
+
+def invalidate_reference_cache(table: str):
+    """Drop the cached copy of `table`; the next lookup reloads it."""
+    with _lock:
+        _versions[table] += 1
+        _snapshots.pop(table, None)
+
+
+def _get_snapshot(db: Session, table: str) -> _Snapshot:
+    snapshot = _snapshots.get(table)
+    if (
+        snapshot is not None
+        and snapshot.version == _versions[table]
+        and time.monotonic() - snapshot.loaded_at < REFERENCE_CACHE_TTL_SECONDS
+    ):
+        return snapshot
+
+    model, id_column, name_column = REFERENCE_TABLES[table]
+    version = _versions[table]
+    rows = db.query(
+        getattr(model, id_column), getattr(model, name_column), model.is_active, model.is_deleted
+    ).all()
+    snapshot = _Snapshot(version, [ReferenceEntry(*row) for row in rows])
+
+    with _lock:
+        # Only publish if nothing was invalidated while the table was loading
+        if _versions[table] == version:
+            _snapshots[table] = snapshot
+
+    return snapshot
+
+
+def get_reference_by_id(db: Session, table: str, reference_id: Optional[int]) -> Optional[ReferenceEntry]:
+    """Look up a reference row by primary key, including soft-deleted rows."""
+    if reference_id is None:
+        return None
+    return _get_snapshot(db, table).by_id.get(reference_id)
+
+
+def get_reference_by_name(db: Session, table: str, name: str) -> Optional[ReferenceEntry]:
+    """Case-insensitive lookup of a non-deleted reference row by name."""
+    return _get_snapshot(db, table).by_name.get(name.lower())
+
+
+def get_reference_name(db: Session, table: str, reference_id: Optional[int]) -> Optional[str]:
+    entry = get_reference_by_id(db, table, reference_id)
+    return entry.name if entry else None
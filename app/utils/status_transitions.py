@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+from typing import Dict, FrozenSet, Optional, Union
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, aliased
+
+from app.models.shipment_status import ShipmentStatusModel, ShipmentStatusTransitionModel
+from app.utils.reference_cache import REFERENCE_CACHE_TTL_SECONDS, SHIPMENT_STATUS, get_reference_by_id, get_reference_by_name
+
+
+logger = logging.getLogger(__name__)
+
+# Status every new order starts in, whatever it is called; see create_order and book_chunk
+INITIAL_SHIPMENT_STATUS_ID = 1
+
+# Seeded when the transition table is empty. A status is given by id or by
+# name; edges whose statuses do not exist are skipped with a warning. Any
+# other move has to be allowed through PUT /shipment_status/{id}/transitions.
+DEFAULT_STATUS_TRANSITIONS = (
+    (INITIAL_SHIPMENT_STATUS_ID, "Pending Pickup"),
+    ("Pending Pickup", "In Transit"),
+    ("In Transit", "Delivered"),
+)
+
+_lock = threading.Lock()
+_version = 0
+# (version, loaded at, from status id -> allowed status ids)
+_compiled: Optional[tuple] = None
+
+
+def invalidate_status_transitions():
+    """Drop the compiled graph; the next check recompiles it."""
+    global _version, _compiled
+    with _lock:
+        _version += 1
+        _compiled = None
+
+
+def compile_status_transitions(db: Session) -> Dict[int, FrozenSet[int]]:
+    """Load the allowed transitions between non-deleted statuses into an id -> allowed ids map."""
+    global _compiled
+    version = _version
+
+    from_status = aliased(ShipmentStatusModel)
+    to_status = aliased(ShipmentStatusModel)
+    rows = db.execute(
+        select(ShipmentStatusTransitionModel.from_status_id, ShipmentStatusTransitionModel.to_status_id)
+        .join(from_status, from_status.shipment_status_id == ShipmentStatusTransitionModel.from_status_id)
+        .join(to_status, to_status.shipment_status_id == ShipmentStatusTransitionModel.to_status_id)
+        .where(from_status.is_deleted == False, to_status.is_deleted == False)
+    ).all()
+
+    allowed = {}
+    for from_status_id, to_status_id in rows:
+        allowed.setdefault(from_status_id, set()).add(to_status_id)
+    graph = {from_status_id: frozenset(to_ids) for from_status_id, to_ids in allowed.items()}
+
+    with _lock:
+        # Only publish if nothing was invalidated while the graph was loading
+        if _version == version:
+            _compiled = (version, time.monotonic(), graph)
+
+    return graph
+
+
+def _get_graph(db: Session) -> Dict[int, FrozenSet[int]]:
+    compiled = _compiled
+    if (
+        compiled is not None
+        and compiled[0] == _version
+        and time.monotonic() - compiled[1] < REFERENCE_CACHE_TTL_SECONDS
+    ):
+        return compiled[2]
+    return compile_status_transitions(db)
+
+
+def is_transition_allowed(db: Session, from_status_id: Optional[int], to_status_id: int) -> bool:
+    """Whether an order in `from_status_id` may move to `to_status_id`. Staying in a status always is."""
+    if from_status_id is None or from_status_id == to_status_id:
+        return True
+    return to_status_id in _get_graph(db).get(from_status_id, frozenset())
+
+
+def closed_status_ids(db: Session) -> FrozenSet[int]:
+    """Statuses an order can reach but never leave, i.e. the ones that close a shipment."""
+    graph = _get_graph(db)
+    reachable = set().union(*graph.values()) if graph else set()
+    return frozenset(status_id for status_id in reachable if not graph.get(status_id))
+
+
+def create_default_status_transitions(db: Session):
+    """
+    Seed DEFAULT_STATUS_TRANSITIONS into an empty transition table, then compile the graph.
+
+    Runs at startup and logs a warning for every default edge it cannot seed,
+    and when new orders could not leave INITIAL_SHIPMENT_STATUS_ID at all.
+    """
+    if not db.query(ShipmentStatusTransitionModel.id).first():
+        for from_ref, to_ref in DEFAULT_STATUS_TRANSITIONS:
+            from_status = _resolve_status(db, from_ref)
+            to_status = _resolve_status(db, to_ref)
+            if not from_status or not to_status:
+                logger.warning(
+                    "Not seeding the status transition %r -> %r: shipment status %r does not exist",
+                    from_ref, to_ref, to_ref if from_status else from_ref
+                )
+            elif from_status.id != to_status.id:
+                db.add(ShipmentStatusTransitionModel(from_status_id=from_status.id, to_status_id=to_status.id, created_by=1))
+        db.commit()
+
+    invalidate_status_transitions()
+    graph = compile_status_transitions(db)
+    if not graph.get(INITIAL_SHIPMENT_STATUS_ID):
+        logger.warning(
+            "No status transition leaves shipment status %s, so new orders cannot be assigned, picked up "
+            "or moved; allow some with PUT /shipment_status/%s/transitions",
+            INITIAL_SHIPMENT_STATUS_ID, INITIAL_SHIPMENT_STATUS_ID
+        )
+
+
+def _resolve_status(db: Session, status: Union[int, str]):
+    if isinstance(status, int):
+        entry = get_reference_by_id(db, SHIPMENT_STATUS, status)
+        return entry if entry and not entry.is_deleted else None
+    return get_reference_by_name(db, SHIPMENT_STATUS, status)
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Dict, Iterable, List, Optional, Set
+
+
+# Most dockets being polled at once that one worker keeps in memory
+TRACKING_CACHE_SIZE = 50000
+
+# Upper bound on how stale a snapshot gets when another worker changes the order,
+# since write-through only reaches the process that made the change.
+TRACKING_CACHE_TTL_SECONDS = 60
+
+# Public view of one order, serialized once so repeat polls skip the encoder
+TrackingSnapshot = namedtuple("TrackingSnapshot", ["order_id", "keys", "etag", "body"])
+
+_lock = threading.Lock()
+# docket_no or manual docket -> (loaded at, snapshot)
+_snapshots: "OrderedDict[str, tuple]" = OrderedDict()
+# order id -> the keys its snapshot is stored under
+_keys_by_order: Dict[int, Set[str]] = {}
+
+
+def _drop(order_id: int):
+    for key in _keys_by_order.pop(order_id, ()):
+        _snapshots.pop(key, None)
+
+
+def get_tracking_snapshot(key: str) -> Optional[TrackingSnapshot]:
+    """The cached snapshot stored under a docket, if it is fresh."""
+    with _lock:
+        entry = _snapshots.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= TRACKING_CACHE_TTL_SECONDS:
+            _drop(entry[1].order_id)
+            return None
+        _snapshots.move_to_end(key)
+        return entry[1]
+
+
+def put_tracking_snapshot(snapshot: TrackingSnapshot):
+    """Store `snapshot` under each of its keys, evicting the least recently polled orders."""
+    loaded_at = time.monotonic()
+    with _lock:
+        _drop(snapshot.order_id)
+        for key in snapshot.keys:
+            _snapshots[key] = (loaded_at, snapshot)
+        _keys_by_order[snapshot.order_id] = set(snapshot.keys)
+
+        while len(_snapshots) > TRACKING_CACHE_SIZE:
+            _, (_, evicted) = _snapshots.popitem(last=False)
+            _drop(evicted.order_id)
+
+
+def cached_tracking_order_ids(order_ids: Iterable[int]) -> List[int]:
+    """The orders in `order_ids` that currently have a snapshot."""
+    with _lock:
+        return [order_id for order_id in order_ids if order_id in _keys_by_order]
+
+
+def drop_tracking_snapshots(order_ids: Iterable[int]):
+    with _lock:
+        for order_id in order_ids:
+            _drop(order_id)
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+from typing import Dict, FrozenSet, Iterable, Optional
+
+
+# Events a subscriber may fall behind by before the oldest ones are dropped
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class Subscription:
+    """
+    One connected client and the orders it wants to hear about.
+
+    Each filter is a set of accepted values and an empty one accepts anything,
+    so a subscription without filters sees every change. Events are queued on
+    the client's event loop; when the client cannot keep up the oldest events
+    are dropped and counted in `dropped`, so the publisher never waits.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        dockets: Iterable[str] = (),
+        driver_ids: Iterable[int] = (),
+        branch_ids: Iterable[int] = (),
+        shipment_status_ids: Iterable[int] = (),
+    ):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+        self.dockets: FrozenSet[str] = frozenset(dockets)
+        self.driver_ids: FrozenSet[int] = frozenset(driver_ids)
+        self.branch_ids: FrozenSet[int] = frozenset(branch_ids)
+        self.shipment_status_ids: FrozenSet[int] = frozenset(shipment_status_ids)
+
+    def matches(self, event: dict) -> bool:
+        if self.dockets and not self.dockets & {str(event.get("docket_no")), event.get("manual_docket")}:
+            return False
+        if self.driver_ids and event.get("driver_id") not in self.driver_ids:
+            return False
+        if self.branch_ids and event.get("branch_id") not in self.branch_ids:
+            return False
+        if self.shipment_status_ids and event.get("shipment_status_id") not in self.shipment_status_ids:
+            return False
+        return True
+
+    def _offer(self, event: dict):
+        # Runs on the subscriber's loop, so the queue is only touched from one thread
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def next_event(self, timeout: float) -> Optional[dict]:
+        """
+        The next event, or None after `timeout` seconds without one.
+
+        After events were dropped the next call returns a "lagged" event with
+        their number instead, telling the client to reload what it shows.
+        """
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            return {"type": "lagged", "dropped": dropped}
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+_lock = threading.Lock()
+_subscriptions: Dict[int, Subscription] = {}
+
+
+def subscribe(subscription: Subscription) -> Subscription:
+    with _lock:
+        _subscriptions[id(subscription)] = subscription
+    return subscription
+
+
+def unsubscribe(subscription: Subscription):
+    with _lock:
+        _subscriptions.pop(id(subscription), None)
+
+
+def has_subscribers() -> bool:
+    """Whether anyone listens, so publishers can skip building events nobody gets."""
+    return bool(_subscriptions)
+
+
+def publish(events: Iterable[dict]):
+    """
+    Hand `events` to every matching subscriber.
+
+    Safe to call from any thread, including the threadpool that runs the sync
+    services; it only schedules the hand-over on each subscriber's loop.
+    """
+    with _lock:
+        subscriptions = list(_subscriptions.values())
+
+    for event in events:
+        for subscription in subscriptions:
+            if subscription.matches(event):
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription._offer, event)
+                except RuntimeError:
+                    # The subscriber's loop is closed; it unsubscribes on its way out
+                    pass
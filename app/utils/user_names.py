@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+
+
+USER_NAME_CACHE_SIZE = 10000
+# Upper bound on how stale a name can get when another worker renames the user,
+# since invalidation only reaches the process that made the change.
+USER_NAME_CACHE_TTL_SECONDS = 300
+
+_lock = threading.Lock()
+# user_id -> (loaded_at, first name)
+_names: "OrderedDict[int, Tuple[float, str]]" = OrderedDict()
+# Bumped by every invalidation, so a lookup that raced one does not store what it read
+_generation = 0
+
+
+def invalidate_user_name(user_id: int):
+    """Forget the cached name of `user_id`, e.g. after the user is renamed."""
+    global _generation
+    with _lock:
+        _names.pop(user_id, None)
+        _generation += 1
+
+
+def resolve_user_names(db: Session, user_ids: Iterable[Optional[int]]) -> Dict[int, str]:
+    """
+    Map user ids to first names.
+
+    Ids loaded into the LRU less than USER_NAME_CACHE_TTL_SECONDS ago are served
+    from memory; the rest are resolved with a single IN query. Unknown ids are
+    left out of the result.
+    """
+    wanted = {user_id for user_id in user_ids if user_id}
+    resolved = {}
+    now = time.monotonic()
+
+    with _lock:
+        generation = _generation
+        for user_id in wanted:
+            entry = _names.get(user_id)
+            if entry is None:
+                continue
+            loaded_at, first_name = entry
+            if now - loaded_at >= USER_NAME_CACHE_TTL_SECONDS:
+                del _names[user_id]
+                continue
+            _names.move_to_end(user_id)
+            resolved[user_id] = first_name
+
+    missing = wanted - resolved.keys()
+    if missing:
+        rows = db.query(User.user_id, User.first_name).filter(User.user_id.in_(missing)).all()
+        with _lock:
+            for user_id, first_name in rows:
+                resolved[user_id] = first_name
+                if generation == _generation:
+                    _names[user_id] = (now, first_name)
+                    _names.move_to_end(user_id)
+            while len(_names) > USER_NAME_CACHE_SIZE:
+                _names.popitem(last=False)
+
+    return resolved
+
+
+def attach_user_names(db: Session, objects: Iterable, default: Optional[str] = None):
+    """
+    Set created_by_name and updated_by_name on every object from one lookup.
+
+    Collects the created_by/updated_by ids of the whole response first, so a
+    list costs at most one query however many rows it has.
+    """
+    objects = [obj for obj in objects if obj is not None]
+    names = resolve_user_names(
+        db, [getattr(obj, "created_by", None) for obj in objects] + [getattr(obj, "updated_by", None) for obj in objects]
+    )
+
+    for obj in objects:
+        obj.created_by_name = names.get(getattr(obj, "created_by", None), default)
+        obj.updated_by_name = names.get(getattr(obj, "updated_by", None), default)
+
+    return objects